@@ -13,13 +13,44 @@ CREATE TABLE documents (
     pdf_paths TEXT[],
     source_type TEXT DEFAULT 'web',
     metadata JSONB,
-    created_at TIMESTAMP DEFAULT NOW()
+    created_at TIMESTAMP DEFAULT NOW(),
+    -- Full-text vector maintained by Postgres; titles rank above body text
+    text_tsv TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', text), 'B')
+    ) STORED,
+    -- Crawl domain for scoped search; pages found outside a crawl fall back to their URL host
+    domain TEXT GENERATED ALWAYS AS (
+        COALESCE(metadata->>'domain', substring(url from '^[a-zA-Z]+://([^/:?#]+)'))
+    ) STORED
 );
 
 -- Indexes for documents
 CREATE INDEX idx_url ON documents(url);
 CREATE INDEX idx_keywords ON documents USING GIN(keywords);
-CREATE INDEX idx_embedding ON documents USING ivfflat (embedding vector_l2_ops) WITH (lists = 100);
+CREATE INDEX idx_text_tsv ON documents USING GIN(text_tsv);
+CREATE INDEX idx_domain ON documents(domain);
+CREATE INDEX idx_source_type ON documents(source_type);
+-- HNSW needs no training data, so it can be built on the empty table.
+-- Every search path uses cosine distance (<=>); keep the opclass in sync (see utils/vector_index.py).
+-- With VECTOR_QUANTIZATION=halfvec/binary the backend rebuilds these on a compact expression.
+CREATE INDEX idx_embedding ON documents USING hnsw (embedding vector_cosine_ops);
+-- Large domains also get partial indexes (idx_embedding_d_*), created by the backend as they grow.
+
+-- Chunk-level text and embeddings, re-embedded only when a chunk's hash changes
+CREATE TABLE document_chunks (
+    id SERIAL PRIMARY KEY,
+    document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    chunk_index INTEGER NOT NULL,
+    char_offset INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    text TEXT NOT NULL,
+    embedding VECTOR(384),
+    UNIQUE (document_id, content_hash)
+);
+
+CREATE INDEX idx_chunk_document ON document_chunks(document_id);
+CREATE INDEX idx_chunk_embedding ON document_chunks USING hnsw (embedding vector_cosine_ops);
 
 -- Users table with profile storage
 CREATE TABLE users (
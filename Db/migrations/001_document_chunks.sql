@@ -0,0 +1,17 @@
+-- Adds chunk-level storage to databases created before document_chunks existed.
+-- Fresh databases get this from init.sql.
+
+-- Chunk-level text and embeddings, re-embedded only when a chunk's hash changes
+CREATE TABLE IF NOT EXISTS document_chunks (
+    id SERIAL PRIMARY KEY,
+    document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    chunk_index INTEGER NOT NULL,
+    char_offset INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    text TEXT NOT NULL,
+    embedding VECTOR(384),
+    UNIQUE (document_id, content_hash)
+);
+
+CREATE INDEX IF NOT EXISTS idx_chunk_document ON document_chunks(document_id);
+CREATE INDEX IF NOT EXISTS idx_chunk_embedding ON document_chunks USING hnsw (embedding vector_cosine_ops);
@@ -0,0 +1,10 @@
+-- Adds the stored full-text column used by hybrid_search to databases created before it existed.
+-- Fresh databases get this from init.sql. Adding a stored generated column rewrites the table.
+
+-- Full-text vector maintained by Postgres; titles rank above body text
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS text_tsv TSVECTOR GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', text), 'B')
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_text_tsv ON documents USING GIN(text_tsv);
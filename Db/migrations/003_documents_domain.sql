@@ -0,0 +1,10 @@
+-- Adds the domain column and filter indexes used by scoped search to databases created before them.
+-- Fresh databases get this from init.sql. Adding a stored generated column rewrites the table.
+
+-- Crawl domain for scoped search; pages found outside a crawl fall back to their URL host
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS domain TEXT GENERATED ALWAYS AS (
+    COALESCE(metadata->>'domain', substring(url from '^[a-zA-Z]+://([^/:?#]+)'))
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_domain ON documents(domain);
+CREATE INDEX IF NOT EXISTS idx_source_type ON documents(source_type);
@@ -1,28 +1,32 @@
 from fastapi import FastAPI, HTTPException, Body, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 import os
+import asyncio
 import logging
-import threading
 import json
-import psycopg2
-from psycopg2.extras import Json
 
 # === Import Modules ===
-from crawler.scrapy_spider import run_crawler
-from processor.cleaner import extract_content
-from embedder.embedding_utils import embed_text
-from llm.pdf_form_filler import generate_with_mistral
-from utils.database import save_to_postgres, get_db
-from utils.user_utils import update_user_profile, get_user_profile
-from utils.web_search import simple_web_search
-from utils.quality_filter import is_quality_result
-from utils.delegation_model import should_delegate_query
-from utils.ontology_router import route_query_to_agent
-from utils.forwarder import forward_to_agent
+from crawler.engine import get_crawl_engine, TERMINAL_STATES
+from crawler.frontier import frontier_path
+from crawler.revisit_scheduler import RevisitScheduler
+from processor.ingest import start_streaming_ingest
+from embedder.embedding_cache import get_embedding_cache
+from embedder.embedding_utils import get_model
+from llm.ollama_client import get_ollama_client, close_ollama_client, LLMOverloaded, LLMTimeout
+from llm.prompt_cache import get_prompt_cache, close_prompt_cache
+from llm.ask_pipeline import answer_question, stream_answer, deferred_validations, BudgetExceeded, VALIDATION_MODES
+from utils.db_pool import get_pool
+from utils.async_database import close_async_pool, async_pool_stats
+from utils.bulk_writer import get_bulk_writer
+from utils.vector_index import start_index_maintenance
+from utils.retrieval_cache import get_retrieval_cache
+from utils.answer_cache import get_answer_cache
+from utils.query_router import get_query_router
+from utils.async_user_utils import update_user_profile, get_user_profile, delete_profile_key, create_user
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -50,30 +54,28 @@ debug_mode = os.getenv("DEBUG", "False").lower() == "true"
 os.makedirs("uploads", exist_ok=True)
 os.makedirs("graphs", exist_ok=True)
 
-# Global flag to control crawl
-crawl_stop_flag = threading.Event()
+@app.on_event("startup")
+def start_vector_index_maintenance():
+    # Builds missing/mismatched vector indexes and retunes IVFFlat as the corpus grows
+    start_index_maintenance()
 
-# Helper functions (unchanged)
-def has_changed(url, text, domain):
-    from processor.change_detector import has_changed as detector
-    return detector(url, text, domain)
+@app.on_event("startup")
+async def load_embedding_model():
+    # Loaded off the event loop so the first question does not pay for it
+    await asyncio.to_thread(get_model)
 
-def download_pdf(pdf_url):
-    from processor.pdf_downloader import download_pdf
-    return download_pdf(pdf_url)
+@app.on_event("startup")
+async def load_query_router():
+    # Embeds the agent exemplars once, off the event loop, before the first no-context question
+    await asyncio.to_thread(get_query_router)
 
-def analyze_pdf_form(pdf_path):
-    from processor.pdf_analyzer import analyze_pdf_form
-    return analyze_pdf_form(pdf_path)
-
-def fill_pdf_form(pdf_path, filled_path, field_data):
-    from llm.pdf_form_filler import fill_pdf_form
-    return fill_pdf_form(pdf_path, filled_path, field_data)
-
-def generate_field_value(name, field_type):
-    from llm.pdf_form_filler import generate_field_value
-    return generate_field_value(name, field_type)
+@app.on_event("shutdown")
+async def close_database_pools():
+    await close_async_pool()
+    close_ollama_client()
+    close_prompt_cache()
 
+# Helper functions
 def build_ontology(docs, domain):
     from graph.ontology_builder import build_ontology
     return build_ontology(docs, domain)
@@ -87,9 +89,32 @@ class CrawlRequest(BaseModel):
     domain: str
     depth: int = 2
 
+class StopCrawlRequest(BaseModel):
+    job_id: Optional[str] = None
+
 class AskQuestionRequest(BaseModel):
     question: str
     user_id: Optional[str] = None
+    # ANN recall knobs for retrieval (HNSW / IVFFlat); server defaults when unset
+    ef_search: Optional[int] = None
+    probes: Optional[int] = None
+    # Restrict retrieval to one crawled domain and/or source type ('web', 'pdf', ...)
+    domain: Optional[str] = None
+    source_type: Optional[str] = None
+    # "inline", "deferred" (poll /rag/validation/{id}) or "skip"; RAG_VALIDATION_MODE when unset
+    validation: Optional[str] = None
+    # Per-request latency budget; RAG_LATENCY_BUDGET_MS when unset
+    budget_ms: Optional[float] = None
+    # Serve semantically equivalent questions from the answer cache
+    use_cache: bool = True
+
+def retrieval_options(data: AskQuestionRequest) -> Dict[str, Any]:
+    return {
+        "ef_search": data.ef_search,
+        "probes": data.probes,
+        "domain": data.domain,
+        "source_type": data.source_type,
+    }
 
 class UserProfileRequest(BaseModel):
     user_id: str
@@ -118,142 +143,146 @@ async def home(request: Request):
 
 @app.post("/start-crawl")
 async def start_crawl(request: CrawlRequest):
-    global crawl_stop_flag
-    crawl_stop_flag.clear()
-    
-    def crawl_task():
-        try:
-            docs = run_crawler(request.domain, request.depth, stop_event=crawl_stop_flag)
-            updated_docs = []
-            for doc in docs:
-                if crawl_stop_flag.is_set():
-                    break
-                content = extract_content(doc['html'])
-                if not content:
-                    continue
-                if not has_changed(doc['url'], content['text'], request.domain):
-                    continue
-                pdf_paths = []
-                for pdf_url in doc.get('pdf_links', []):
-                    pdf_path = download_pdf(pdf_url)
-                    if pdf_path:
-                        analysis = analyze_pdf_form(pdf_path)
-                        if analysis['is_form']:
-                            field_data = {
-                                field['name']: generate_field_value(field['name'], field.get('type', ''))
-                                for field in analysis['fields']
-                                if generate_field_value(field['name'], field.get('type', ''))
-                            }
-                            filled_path = pdf_path.replace('.pdf', '_filled.pdf')
-                            fill_pdf_form(pdf_path, filled_path, field_data)
-                            pdf_paths.append(filled_path)
-                        else:
-                            pdf_paths.append(pdf_path)
-                embedding = embed_text(content['text'])
-                save_to_postgres(
-                    title=content['title'],
-                    description=content['description'],
-                    text=content['text'],
-                    url=doc['url'],
-                    embedding=embedding,
-                    pdf_paths=pdf_paths,
-                    source_type='web',
-                    metadata={'domain': request.domain}
-                )
-                updated_docs.append(doc)
-            if not crawl_stop_flag.is_set() and updated_docs:
-                build_ontology(updated_docs, request.domain)
-                export_graph_json(updated_docs, request.domain)
-        except Exception as e:
-            logger.error(f"Error during crawl: {e}")
-
-    crawl_thread = threading.Thread(target=crawl_task)
-    crawl_thread.start()
-    return {"status": "started", "domain": request.domain}
+    def on_complete(job, updated_docs):
+        if not job.stop_event.is_set() and updated_docs:
+            graph = build_ontology(updated_docs, request.domain)
+            export_graph_json(graph, request.domain)
+
+    job = start_streaming_ingest(request.domain, request.depth, on_complete=on_complete)
+    return {"status": "started", "domain": request.domain, "job_id": job.id}
 
 @app.post("/stop-crawl")
-async def stop_crawl():
-    global crawl_stop_flag
-    crawl_stop_flag.set()
-    return {"status": "stopping"}
+async def stop_crawl(data: Optional[StopCrawlRequest] = None):
+    engine = get_crawl_engine()
+    if data and data.job_id:
+        if not engine.cancel(data.job_id):
+            raise HTTPException(status_code=404, detail="Crawl job not found")
+        return {"status": "stopping", "job_ids": [data.job_id]}
+    job_ids = [job.id for job in engine.list_jobs() if job.state not in TERMINAL_STATES]
+    for job_id in job_ids:
+        engine.cancel(job_id)
+    return {"status": "stopping", "job_ids": job_ids}
+
+@app.get("/crawl/jobs")
+async def list_crawl_jobs():
+    return {"jobs": [job.progress() for job in get_crawl_engine().list_jobs()]}
+
+@app.get("/crawl/jobs/{job_id}")
+async def get_crawl_job(job_id: str):
+    job = get_crawl_engine().get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Crawl job not found")
+    return job.progress()
+
+@app.post("/crawl/jobs/{job_id}/pause")
+async def pause_crawl_job(job_id: str):
+    job = get_crawl_engine().pause(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Crawl job not found")
+    return {"status": "pausing", "job_id": job_id}
+
+@app.post("/crawl/jobs/{job_id}/resume")
+async def resume_crawl_job(job_id: str):
+    job = get_crawl_engine().resume(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Crawl job not found")
+    return {"status": "resuming", "job_id": job_id}
+
+@app.post("/crawl/jobs/{job_id}/cancel")
+async def cancel_crawl_job(job_id: str):
+    job = get_crawl_engine().cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Crawl job not found")
+    return {"status": "stopping", "job_id": job_id}
+
+@app.get("/crawl/schedule/{domain}")
+async def get_recrawl_schedule(domain: str, limit: int = 50):
+    if not os.path.exists(frontier_path(domain)):
+        raise HTTPException(status_code=404, detail="Domain has not been crawled")
+    scheduler = RevisitScheduler(domain)
+    try:
+        plan = scheduler.plan()
+    finally:
+        scheduler.close()
+    return {
+        "domain": domain,
+        "daily_budget": scheduler.daily_budget,
+        "due": len(plan),
+        "plan": plan[:limit],
+    }
 
 @app.post("/rag/ask")
 async def ask_question(data: AskQuestionRequest):
-    from langchain.prompts import ChatPromptTemplate
-    from llm.prompt_templates import RAG_PROMPT_TEMPLATE, QA_WITH_PROFILE_PROMPT
     query = data.question
-    user_id = data.user_id
-
     if not query:
         raise HTTPException(status_code=400, detail="Missing question")
 
     try:
-        from utils.hybrid_search import hybrid_search
-        context_docs = hybrid_search(query, limit=3)
-
-        if not context_docs:
-            if should_delegate_query(query):
-                target_agent = route_query_to_agent(query)
-                if target_agent:
-                    return forward_to_agent(target_agent, query)
-
-            search_urls = simple_web_search(query, max_results=5)
-            new_docs = [url for url in search_urls if is_quality_result(url)]
-            context_docs = hybrid_search(query, limit=3)
-
-        profile = get_user_profile(user_id) if user_id else {}
-
-        if user_id:
-            profile_prompt = QA_WITH_PROFILE_PROMPT.format(input=query)
-            profile_update_str = generate_with_mistral(profile_prompt)
-            try:
-                profile_update = json.loads(profile_update_str)
-                for key, value in profile_update.items():
-                    update_user_profile(user_id, {"key": key, "value": value})
-                profile.update(profile_update)
-            except Exception:
-                pass
-
-        context = "\n".join([f"{d['title']}\n{d['text'][:500]}" for d in context_docs])
-        full_prompt = RAG_PROMPT_TEMPLATE.format(context=context, question=query)
-        answer = generate_with_mistral(full_prompt)
-
-        validation_prompt = f"""
-        You are a quality assurance assistant.
-        The user asked: "{query}"
-        The system answered: "{answer}"
-        Based on the context below, is the answer accurate?
-        Context: {context}
-        Please respond with: 
-        - Yes/No for accuracy
-        - A corrected or improved version of the answer
-        - Suggested next steps
-        """
-        validation_response = generate_with_mistral(validation_prompt).strip().split('\n')
-        is_accurate = validation_response[0].lower().startswith("yes")
-        improved_answer = validation_response[2] if len(validation_response) > 2 else answer
-        next_steps = validation_response[3] if len(validation_response) > 3 else "No specific next steps."
-
-        return {
-            "original_query": query,
-            "initial_answer": answer,
-            "is_accurate": is_accurate,
-            "improved_answer": improved_answer,
-            "next_steps": next_steps,
-            "sources": [{"title": d["title"], "url": d.get("url")} for d in context_docs],
-            "profile_used": profile
-        }
-
+        return await answer_question(
+            query,
+            user_id=data.user_id,
+            search=retrieval_options(data),
+            validation=data.validation,
+            budget_ms=data.budget_ms,
+            use_cache=data.use_cache,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except LLMOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except (BudgetExceeded, LLMTimeout) as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         logger.error(f"Error in /rag/ask: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@app.post("/rag/ask/stream")
+async def ask_question_stream(data: AskQuestionRequest):
+    """
+    Server-Sent Events variant of /rag/ask: sources, then answer tokens, then
+    the answer, validation and timings as trailing events.
+    """
+    query = data.question
+    if not query:
+        raise HTTPException(status_code=400, detail="Missing question")
+    # Validation is a trailing event here, so waiting for it costs nothing visible
+    validation = data.validation or "inline"
+    if validation not in VALIDATION_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown validation mode: {validation}")
+
+    async def events():
+        async for event, payload in stream_answer(
+            query,
+            user_id=data.user_id,
+            search=retrieval_options(data),
+            validation=validation,
+            budget_ms=data.budget_ms,
+            use_cache=data.use_cache,
+        ):
+            yield sse_event(event, payload)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/rag/validation/{validation_id}")
+async def get_validation(validation_id: str):
+    result = deferred_validations.get(validation_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Validation not found")
+    return result
+
 @app.post("/user/profile")
 async def get_profile(data: UserProfileRequest):
     user_id = data.user_id
     if not user_id:
         raise HTTPException(status_code=400, detail="Missing user_id")
-    profile = get_user_profile(user_id)
+    profile = await get_user_profile(user_id)
     if profile:
         return {"profile": profile}
     else:
@@ -266,36 +295,27 @@ async def update_profile(data: ProfileUpdateRequest):
     value = data.value
     if not all([user_id, key, value]):
         raise HTTPException(status_code=400, detail="Missing user_id, key, or value")
-    try:
-        update_user_profile(user_id, {"key": key, "value": value})
-        return {"status": "success", "message": f"{key} updated", "key": key, "value": value}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    result = await update_user_profile(user_id, {"key": key, "value": value})
+    if "error" in result:
+        raise HTTPException(status_code=500, detail=result["error"])
+    return {"status": "success", "message": f"{key} updated", "key": key, "value": value}
 
 @app.post("/user/profile/delete")
-async def delete_profile_key(data: ProfileUpdateRequest):
+async def delete_profile(data: ProfileUpdateRequest):
     user_id = data.user_id
     key = data.key
     if not user_id or not key:
         raise HTTPException(status_code=400, detail="Missing user_id or key")
-    try:
-        conn = get_db()
-        cur = conn.cursor()
-        cur.execute("UPDATE users SET profile = profile #- %s::TEXT[] WHERE id = %s", ('{' + key + '}', user_id))
-        conn.commit()
-        cur.close()
-        conn.close()
-        return {"status": "deleted", "key": key}
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
+    result = await delete_profile_key(user_id, key)
+    if "error" in result:
+        raise HTTPException(status_code=500, detail=result["error"])
+    return {"status": "deleted", "key": key}
 
 @app.post("/auth/register")
 async def register(data: RegisterRequest):
     email = data.email
     password = data.password
-    # Assume create_user function exists
-    user_id = create_user(email, password)
+    user_id = await create_user(email, password)
     if user_id:
         return {"status": "registered", "user_id": user_id}
     else:
@@ -320,6 +340,20 @@ async def upload_files(files: List[str] = Body(...)):
         uploaded_paths.append(file_path)
     return {"status": "uploaded", "files": uploaded_paths}
 
+@app.get("/metrics")
+async def metrics():
+    return {
+        "embedding_cache": get_embedding_cache().stats(),
+        "db_pool": get_pool().stats(),
+        "async_db_pool": async_pool_stats(),
+        "bulk_writer": get_bulk_writer().stats(),
+        "retrieval_cache": get_retrieval_cache().stats(),
+        "llm": get_ollama_client().stats(),
+        "prompt_cache": get_prompt_cache().stats(),
+        "answer_cache": get_answer_cache().stats(),
+        "query_router": get_query_router().stats(),
+    }
+
 @app.get("/graph/{domain}")
 async def view_graph(domain: str):
     graph_file = f"graphs/{domain}.json"
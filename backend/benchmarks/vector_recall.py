@@ -0,0 +1,182 @@
+# backend/benchmarks/vector_recall.py
+"""
+Recall vs latency of the ANN vector index against exact search.
+
+Samples stored embeddings as queries, computes the exact top-k with index
+scans disabled, then repeats each query through the index for a sweep of
+``hnsw.ef_search`` (HNSW) or ``ivfflat.probes`` (IVFFlat) values.
+
+With ``--quantization`` it instead builds a temporary index per quantization
+mode (full vector, halfvec, binary), runs the over-fetch + full-precision
+rerank query for each, and reports recall, latency and index size, then
+drops the temporary indexes.
+
+Usage (from backend/):
+    python -m benchmarks.vector_recall --table documents --queries 100 --k 10
+    python -m benchmarks.vector_recall --quantization none,halfvec,binary --overfetch 4
+"""
+
+import time
+import argparse
+import statistics
+
+from utils.db_pool import db_connection
+from utils.vector_index import (
+    VECTOR_INDEXES, VECTOR_INDEX_TYPE, describe_index, apply_search_params, index_sql, ann_sql, prefetch_count
+)
+
+INDEX_BY_TABLE = {table: name for name, (table, _) in VECTOR_INDEXES.items()}
+
+
+def sample_queries(cur, table, count):
+    # Vectors come back in pgvector's text form and are passed back unchanged
+    cur.execute(f"SELECT embedding::text FROM {table} WHERE embedding IS NOT NULL ORDER BY random() LIMIT %s", (count,))
+    return [r[0] for r in cur.fetchall()]
+
+
+def top_k(cur, table, query, k, exact=False, ef_search=None, probes=None):
+    """Return (ids, seconds) for one query, inside its own transaction."""
+    cur.connection.rollback()
+    if exact:
+        cur.execute("SET LOCAL enable_indexscan = off")
+    else:
+        apply_search_params(cur, ef_search, probes, min_ef_search=k)
+    start = time.perf_counter()
+    cur.execute(f"SELECT id FROM {table} ORDER BY embedding <=> %s::vector LIMIT %s", (query, k))
+    ids = [r[0] for r in cur.fetchall()]
+    elapsed = time.perf_counter() - start
+    cur.connection.rollback()
+    return ids, elapsed
+
+
+def quantized_top_k(cur, table, query, k, quantization, overfetch=None, ef_search=None):
+    """Return (ids, seconds) for one query through the quantized over-fetch + rerank path."""
+    cur.connection.rollback()
+    params = {"embedding": query, "candidates": k, "prefetch": prefetch_count(k, quantization, overfetch)}
+    apply_search_params(cur, ef_search, min_ef_search=params["prefetch"])
+    start = time.perf_counter()
+    cur.execute(f"SELECT id FROM ({ann_sql(table, quantization=quantization)}) ann", params)
+    ids = [r[0] for r in cur.fetchall()]
+    elapsed = time.perf_counter() - start
+    cur.connection.rollback()
+    return ids, elapsed
+
+
+def summarize(label, recalls, latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+    return {
+        "setting": label,
+        "recall": round(statistics.mean(recalls), 4) if recalls else None,
+        "p50_ms": round(1000 * statistics.median(latencies), 2),
+        "p95_ms": round(1000 * p95, 2),
+    }
+
+
+def run(table, queries, k, sweep=None):
+    with db_connection() as conn, conn.cursor() as cur:
+        index = describe_index(cur, INDEX_BY_TABLE[table])
+        method = index["method"] if index else None
+        if method is None:
+            print(f"No vector index on {table}; every query is an exact scan.")
+        sweep = sweep or ([10, 20, 40, 80, 160, 320] if method == "hnsw" else [1, 2, 5, 10, 20, 50])
+        knob = "ef_search" if method == "hnsw" else "probes"
+
+        vectors = sample_queries(cur, table, queries)
+        if not vectors:
+            print(f"{table} has no embeddings to benchmark.")
+            return []
+
+        exact, exact_latency = {}, []
+        for i, query in enumerate(vectors):
+            exact[i], seconds = top_k(cur, table, query, k, exact=True)
+            exact_latency.append(seconds)
+        rows = [summarize("exact", [1.0] * len(vectors), exact_latency)]
+
+        for value in sweep:
+            recalls, latencies = [], []
+            for i, query in enumerate(vectors):
+                ids, seconds = top_k(cur, table, query, k, **{knob: value})
+                truth = exact[i]
+                recalls.append(len(set(ids) & set(truth)) / len(truth) if truth else 1.0)
+                latencies.append(seconds)
+            rows.append(summarize(f"{method} {knob}={value}", recalls, latencies))
+        return rows
+
+
+def run_quantization(table, queries, k, modes, overfetch=None, ef_search=None, index_type=VECTOR_INDEX_TYPE):
+    column = VECTOR_INDEXES[INDEX_BY_TABLE[table]][1]
+    with db_connection() as conn, conn.cursor() as cur:
+        vectors = sample_queries(cur, table, queries)
+        if not vectors:
+            print(f"{table} has no embeddings to benchmark.")
+            return []
+        cur.execute(f"SELECT count(*) FROM {table} WHERE {column} IS NOT NULL")
+        count = cur.fetchone()[0]
+
+        exact, exact_latency = {}, []
+        for i, query in enumerate(vectors):
+            exact[i], seconds = top_k(cur, table, query, k, exact=True)
+            exact_latency.append(seconds)
+        rows = [summarize("exact", [1.0] * len(vectors), exact_latency)]
+
+        for mode in modes:
+            name = f"bench_{table}_{mode}_idx"
+            conn.rollback()
+            conn.autocommit = True
+            try:
+                cur.execute(f"DROP INDEX IF EXISTS {name}")
+                start = time.perf_counter()
+                cur.execute(index_sql(name, table, column, index_type, count, quantization=mode, concurrently=False))
+                build_seconds = time.perf_counter() - start
+                cur.execute("SELECT pg_relation_size(%s::regclass)", (name,))
+                size = cur.fetchone()[0]
+            finally:
+                conn.autocommit = False
+
+            try:
+                recalls, latencies = [], []
+                for i, query in enumerate(vectors):
+                    ids, seconds = quantized_top_k(cur, table, query, k, mode, overfetch, ef_search)
+                    truth = exact[i]
+                    recalls.append(len(set(ids) & set(truth)) / len(truth) if truth else 1.0)
+                    latencies.append(seconds)
+                row = summarize(f"{index_type} {mode}", recalls, latencies)
+                row["index_mb"] = round(size / 2 ** 20, 2)
+                row["build_s"] = round(build_seconds, 2)
+                rows.append(row)
+            finally:
+                conn.rollback()
+                conn.autocommit = True
+                cur.execute(f"DROP INDEX IF EXISTS {name}")
+                conn.autocommit = False
+        return rows
+
+
+def print_table(rows):
+    sized = any("index_mb" in r for r in rows)
+    header = f"{'setting':<28}{'recall@k':>10}{'p50 ms':>10}{'p95 ms':>10}"
+    print(header + (f"{'index MB':>10}{'build s':>10}" if sized else ""))
+    for r in rows:
+        line = f"{r['setting']:<28}{r['recall']:>10}{r['p50_ms']:>10}{r['p95_ms']:>10}"
+        if sized:
+            line += f"{r.get('index_mb', ''):>10}{r.get('build_s', ''):>10}"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--table", choices=sorted(INDEX_BY_TABLE), default="documents")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--sweep", type=lambda s: [int(v) for v in s.split(",")], default=None,
+                        help="Comma-separated ef_search (HNSW) or probes (IVFFlat) values")
+    parser.add_argument("--quantization", type=lambda s: s.split(","), default=None,
+                        help="Compare quantization modes instead, e.g. none,halfvec,binary")
+    parser.add_argument("--overfetch", type=int, default=None, help="Candidates fetched per result before rerank")
+    parser.add_argument("--ef-search", type=int, default=None)
+    args = parser.parse_args()
+    if args.quantization:
+        print_table(run_quantization(args.table, args.queries, args.k, args.quantization, args.overfetch, args.ef_search))
+    else:
+        print_table(run(args.table, args.queries, args.k, args.sweep))
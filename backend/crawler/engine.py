@@ -0,0 +1,254 @@
+# crawler/engine.py
+
+import time
+import uuid
+import logging
+import threading
+
+from scrapy import signals
+from scrapy.crawler import CrawlerRunner
+from scrapy.utils.reactor import install_reactor
+
+from crawler.scrapy_spider import SiteSpider
+
+logger = logging.getLogger(__name__)
+
+REACTOR_PATH = 'twisted.internet.asyncioreactor.AsyncioSelectorReactor'
+
+ENGINE_SETTINGS = {
+    'TWISTED_REACTOR': REACTOR_PATH,
+    'ITEM_PIPELINES': {'crawler.pipelines.QueuePipeline': 300},
+    'LOG_LEVEL': 'ERROR',
+}
+
+# Job states
+PENDING = 'pending'
+RUNNING = 'running'
+PAUSED = 'paused'
+FINISHED = 'finished'
+CANCELLED = 'cancelled'
+FAILED = 'failed'
+
+TERMINAL_STATES = {FINISHED, CANCELLED, FAILED}
+
+
+class CrawlJob:
+    """A single domain crawl running inside the shared CrawlEngine."""
+
+    def __init__(self, domain, depth, item_queue=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.domain = domain
+        self.depth = depth
+        self.item_queue = item_queue
+        self.stop_event = threading.Event()
+        self.done = threading.Event()
+        self.state = PENDING
+        self.error = None
+        self.crawler = None
+
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.pages_fetched = 0
+        self.pages_not_modified = 0
+        self.bytes_downloaded = 0
+        self.items_scraped = 0
+        self.pages_ingested = 0
+        self._ingest_lock = threading.Lock()
+
+    # --- signal handlers (reactor thread) ---
+
+    def _on_response(self, response, request, spider):
+        self.pages_fetched += 1
+        self.bytes_downloaded += len(response.body)
+        if response.status == 304:
+            self.pages_not_modified += 1
+
+    def _on_item(self, item, response, spider):
+        self.items_scraped += 1
+
+    # --- called by ingestion workers ---
+
+    def record_ingested(self, count=1):
+        with self._ingest_lock:
+            self.pages_ingested += count
+
+    def queued(self):
+        """Requests waiting in the scheduler plus those being downloaded."""
+        try:
+            engine = self.crawler.engine
+            return len(engine.slot.scheduler) + len(engine.downloader.active)
+        except Exception:
+            return 0
+
+    def progress(self):
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        return {
+            'job_id': self.id,
+            'domain': self.domain,
+            'depth': self.depth,
+            'state': self.state,
+            'error': self.error,
+            'pages_fetched': self.pages_fetched,
+            'pages_not_modified': self.pages_not_modified,
+            'pages_queued': self.queued() if self.state in (RUNNING, PAUSED) else 0,
+            'items_scraped': self.items_scraped,
+            'pages_ingested': self.pages_ingested,
+            'ingest_backlog': self.item_queue.qsize() if self.item_queue is not None else 0,
+            'bytes_downloaded': self.bytes_downloaded,
+            'pages_per_sec': round(self.pages_fetched / elapsed, 2) if elapsed else 0.0,
+            'elapsed_sec': round(elapsed, 1),
+            'created_at': self.created_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class CrawlEngine:
+    """
+    Long-lived crawl service: one Twisted reactor in a background thread
+    running any number of concurrent SiteSpider crawls.
+
+    The reactor cannot be restarted once stopped, so it is started once and
+    kept alive for the life of the process. All Scrapy calls are marshalled
+    onto the reactor thread with ``callFromThread``.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = dict(ENGINE_SETTINGS, **(settings or {}))
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = None
+        self._reactor = None
+        self._runner = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run_reactor, name="crawl-reactor", daemon=True)
+                self._thread.start()
+        self._ready.wait()
+
+    def _run_reactor(self):
+        # Install inside this thread so the reactor gets its own asyncio loop
+        # instead of picking up the API server's running loop.
+        install_reactor(REACTOR_PATH)
+        from twisted.internet import reactor
+
+        self._reactor = reactor
+        self._runner = CrawlerRunner(self.settings)
+        reactor.callWhenRunning(self._ready.set)
+        reactor.run(installSignalHandlers=False)
+
+    # --- job control (any thread) ---
+
+    def submit(self, domain, depth, item_queue=None):
+        """Schedule a new crawl and return its CrawlJob."""
+        self.start()
+        job = CrawlJob(domain, depth, item_queue=item_queue)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._reactor.callFromThread(self._launch, job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.stop_event.set()
+        if job.state not in TERMINAL_STATES:
+            self._reactor.callFromThread(self._close, job)
+        return job
+
+    def pause(self, job_id):
+        job = self.get(job_id)
+        if job is None:
+            return None
+        if job.state == RUNNING:
+            self._reactor.callFromThread(self._pause, job)
+        return job
+
+    def resume(self, job_id):
+        job = self.get(job_id)
+        if job is None:
+            return None
+        if job.state == PAUSED:
+            self._reactor.callFromThread(self._unpause, job)
+        return job
+
+    # --- reactor thread ---
+
+    def _launch(self, job):
+        if job.stop_event.is_set():
+            self._finish(job, CANCELLED)
+            return
+
+        crawler = self._runner.create_crawler(SiteSpider)
+        crawler.signals.connect(job._on_response, signal=signals.response_received)
+        crawler.signals.connect(job._on_item, signal=signals.item_scraped)
+        job.crawler = crawler
+        job.state = RUNNING
+        job.started_at = time.time()
+
+        d = self._runner.crawl(
+            crawler,
+            domain=job.domain,
+            depth=job.depth,
+            stop_event=job.stop_event,
+            item_queue=job.item_queue,
+        )
+        d.addCallbacks(
+            lambda _: self._finish(job, CANCELLED if job.stop_event.is_set() else FINISHED),
+            lambda failure: self._finish(job, FAILED, failure.getErrorMessage()),
+        )
+
+    def _pause(self, job):
+        if job.crawler and job.crawler.engine and job.state == RUNNING:
+            job.crawler.engine.pause()
+            job.state = PAUSED
+
+    def _unpause(self, job):
+        if job.crawler and job.crawler.engine and job.state == PAUSED:
+            job.crawler.engine.unpause()
+            job.state = RUNNING
+
+    def _close(self, job):
+        engine = job.crawler.engine if job.crawler else None
+        if engine is None or engine.spider is None:
+            return
+        if job.state == PAUSED:
+            engine.unpause()
+        engine.close_spider(engine.spider, 'cancelled')
+
+    def _finish(self, job, state, error=None):
+        job.state = state
+        job.error = error
+        job.finished_at = time.time()
+        job.crawler = None
+        job.done.set()
+        if error:
+            logger.error(f"❌ Crawl job {job.id} ({job.domain}) failed: {error}")
+        else:
+            logger.info(f"✅ Crawl job {job.id} ({job.domain}) {state}")
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_crawl_engine():
+    """Return the process-wide CrawlEngine, creating it on first use."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = CrawlEngine()
+        return _engine
@@ -0,0 +1,273 @@
+# crawler/frontier.py
+
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+FRONTIER_DIR = os.getenv("FRONTIER_DIR", "frontier")
+# URLs fetched more recently than this are not fetched again on a recrawl
+CRAWL_FRESHNESS_HOURS = float(os.getenv("CRAWL_FRESHNESS_HOURS", "24"))
+# Crawl-time writes are committed after this many (and always on close)
+COMMIT_EVERY = 500
+
+# URL states
+QUEUED = 'queued'
+FETCHED = 'fetched'
+FAILED = 'failed'
+
+
+def frontier_path(domain):
+    """Path of the SQLite file holding a domain's frontier."""
+    return os.path.join(FRONTIER_DIR, f"{domain}.sqlite")
+
+
+def url_key(url):
+    """Compact 8-byte key for a URL."""
+    return hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest()
+
+
+class FrontierDB:
+    """
+    The SQLite connection for one frontier file, shared by every FrontierStore
+    and RevisitScheduler of that domain in this process.
+
+    SQLite allows one writer per file. Separate connections that each hold an
+    open write transaction fail one another with "database is locked" (after
+    blocking for the busy timeout), so all writers go through this single
+    connection and its lock instead. Use ``open_frontier_db`` / ``release``.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.RLock()
+        self.refs = 0
+        self._pending_writes = 0
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+
+    def wrote(self, n=1):
+        """Count writes made under ``lock``; commits every COMMIT_EVERY of them."""
+        self._pending_writes += n
+        if self._pending_writes >= COMMIT_EVERY:
+            self.commit()
+
+    def commit(self):
+        with self.lock:
+            self.conn.commit()
+            self._pending_writes = 0
+
+    def release(self):
+        with _dbs_lock:
+            self.refs -= 1
+            if self.refs > 0:
+                return
+            del _dbs[self.path]
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+
+
+_dbs = {}
+_dbs_lock = threading.Lock()
+
+
+def open_frontier_db(path):
+    """Return the process-wide FrontierDB for a file, opening it if needed. Call ``release()`` when done."""
+    path = os.path.abspath(path)
+    with _dbs_lock:
+        db = _dbs.get(path)
+        if db is None:
+            db = _dbs[path] = FrontierDB(path)
+        db.refs += 1
+        return db
+
+
+class FrontierStore:
+    """
+    Disk-backed crawl frontier and seen-URL set for one domain.
+
+    Every URL the spider discovers is recorded with its depth and state
+    (queued / fetched / failed) in ``frontier/{domain}.sqlite``. A crawl that
+    is interrupted resumes from the queued rows, and a recrawl only fetches
+    URLs whose last fetch is older than the freshness window.
+    """
+
+    def __init__(self, domain, path=None, freshness_hours=CRAWL_FRESHNESS_HOURS):
+        if path is None:
+            os.makedirs(FRONTIER_DIR, exist_ok=True)
+            path = frontier_path(domain)
+        self.domain = domain
+        self.freshness = freshness_hours * 3600
+        self.db = open_frontier_db(path)
+        self._lock = self.db.lock
+        self.conn = self.db.conn
+        with self._lock:
+            self._create_tables()
+
+    def _create_tables(self):
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS urls (
+                url_key BLOB PRIMARY KEY,
+                url TEXT NOT NULL,
+                depth INTEGER NOT NULL,
+                state TEXT NOT NULL,
+                discovered_at REAL NOT NULL,
+                fetched_at REAL,
+                etag TEXT,
+                last_modified TEXT
+            )
+        """)
+        # Frontiers created before validators were stored lack these columns
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(urls)")}
+        for column in ('etag', 'last_modified'):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE urls ADD COLUMN {column} TEXT")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_urls_state ON urls(state)")
+        self.conn.commit()
+
+    def is_fresh(self, fetched_at, now=None):
+        return fetched_at is not None and fetched_at >= (now or time.time()) - self.freshness
+
+    def add(self, url, depth, requeue_stale=True):
+        """
+        Record a discovered URL.
+
+        Args:
+            url (str): Discovered URL
+            depth (int): Link depth it was found at
+            requeue_stale (bool): Requeue a known URL whose last fetch is outside
+                the freshness window. Disabled when a RevisitScheduler decides
+                which known URLs to revisit.
+
+        Returns:
+            bool: True if the URL should be requested now, False if it is
+            already queued or should not be revisited yet
+        """
+        key = url_key(url)
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT state, fetched_at, depth FROM urls WHERE url_key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.conn.execute(
+                    "INSERT INTO urls (url_key, url, depth, state, discovered_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, url, depth, QUEUED, now)
+                )
+                self.db.wrote()
+                return True
+            state, fetched_at, old_depth = row
+            if state == QUEUED or (state == FETCHED and (not requeue_stale or self.is_fresh(fetched_at, now))):
+                return False
+            self.conn.execute(
+                "UPDATE urls SET state = ?, depth = ? WHERE url_key = ?",
+                (QUEUED, min(depth, old_depth), key)
+            )
+            self.db.wrote()
+            return True
+
+    def mark(self, url, state):
+        with self._lock:
+            self.conn.execute(
+                "UPDATE urls SET state = ?, fetched_at = ? WHERE url_key = ?",
+                (state, time.time(), url_key(url))
+            )
+            self.db.wrote()
+
+    def mark_fetched(self, url, etag=None, last_modified=None):
+        """
+        Record a successful fetch. Validators are only overwritten when given,
+        so a 304 keeps the stored ones.
+        """
+        with self._lock:
+            self.conn.execute(
+                "UPDATE urls SET state = ?, fetched_at = ?, "
+                "etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) "
+                "WHERE url_key = ?",
+                (FETCHED, time.time(), etag, last_modified, url_key(url))
+            )
+            self.db.wrote()
+
+    def save_validators(self, validators):
+        """
+        Store the ETag / Last-Modified of a page once its content is stored.
+
+        Args:
+            validators (dict): ``urls`` (the page URL and any redirects to it),
+                ``etag`` and ``last_modified`` as carried on the crawled item
+        """
+        with self._lock:
+            self.conn.executemany(
+                "UPDATE urls SET etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) "
+                "WHERE url_key = ?",
+                [(validators.get('etag'), validators.get('last_modified'), url_key(url))
+                 for url in validators['urls']]
+            )
+            self.db.commit()
+
+    def get_validators(self, url):
+        """Return (etag, last_modified) stored for a URL, or (None, None)."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT etag, last_modified FROM urls WHERE url_key = ?", (url_key(url),)
+            ).fetchone()
+        return row if row else (None, None)
+
+    def mark_failed(self, url):
+        self.mark(url, FAILED)
+
+    def requeue_stale(self):
+        """Queue every fetched or failed URL whose last fetch is outside the freshness window."""
+        with self._lock:
+            cur = self.conn.execute(
+                "UPDATE urls SET state = ? WHERE state != ? AND (fetched_at IS NULL OR fetched_at < ?)",
+                (QUEUED, QUEUED, time.time() - self.freshness)
+            )
+            self.db.commit()
+            return cur.rowcount
+
+    def requeue(self, urls):
+        """Queue the given known URLs (e.g. a RevisitScheduler plan)."""
+        with self._lock:
+            cur = self.conn.executemany(
+                "UPDATE urls SET state = ? WHERE url_key = ? AND state != ?",
+                [(QUEUED, url_key(url), QUEUED) for url in urls]
+            )
+            self.db.commit()
+            return cur.rowcount
+
+    def pending(self, batch_size=1000):
+        """
+        Yield (url, depth) for URLs queued when iteration starts, paging
+        through the table by rowid. URLs added afterwards are skipped; the
+        spider requests those itself as it discovers them.
+        """
+        with self._lock:
+            max_rowid = self.conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM urls").fetchone()[0]
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self.conn.execute(
+                    "SELECT rowid, url, depth FROM urls WHERE state = ? AND rowid > ? AND rowid <= ? "
+                    "ORDER BY rowid LIMIT ?",
+                    (QUEUED, last_rowid, max_rowid, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for rowid, url, depth in rows:
+                last_rowid = rowid
+                yield url, depth
+
+    def stats(self):
+        with self._lock:
+            rows = self.conn.execute("SELECT state, COUNT(*) FROM urls GROUP BY state").fetchall()
+        return dict(rows)
+
+    def close(self):
+        self.db.release()
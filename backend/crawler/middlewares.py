@@ -0,0 +1,24 @@
+# crawler/middlewares.py
+
+
+class ConditionalRequestMiddleware:
+    """
+    Downloader middleware that turns recrawls into conditional requests.
+
+    For URLs the spider's frontier has fetched before, the stored ``ETag`` and
+    ``Last-Modified`` validators are sent back as ``If-None-Match`` and
+    ``If-Modified-Since``. Unchanged pages then come back as an empty 304,
+    which SiteSpider records without extracting, embedding or saving.
+    """
+
+    def process_request(self, request, spider):
+        frontier = getattr(spider, 'frontier', None)
+        if frontier is None:
+            return None
+
+        etag, last_modified = frontier.get_validators(request.url)
+        if etag and b'If-None-Match' not in request.headers:
+            request.headers['If-None-Match'] = etag
+        if last_modified and b'If-Modified-Since' not in request.headers:
+            request.headers['If-Modified-Since'] = last_modified
+        return None
@@ -0,0 +1,40 @@
+# crawler/pipelines.py
+
+import queue
+import logging
+
+from scrapy.exceptions import DropItem
+from twisted.internet import reactor
+from twisted.internet.task import deferLater
+
+logger = logging.getLogger(__name__)
+
+# How long to wait before retrying a put into a full queue
+QUEUE_RETRY_DELAY = 0.05
+
+
+class QueuePipeline:
+    """
+    Hands scraped items to a bounded ``queue.Queue`` owned by the ingestion
+    workers instead of collecting them in a feed file.
+
+    When the queue is full, ``process_item`` returns a Deferred that retries
+    later without blocking the reactor. Scrapy keeps the response in its
+    scraper slot until the Deferred fires, so once the slot fills up the
+    engine stops scheduling new downloads: slow workers slow down the crawl.
+    """
+
+    def process_item(self, item, spider):
+        item_queue = getattr(spider, 'item_queue', None)
+        if item_queue is None:
+            return item
+
+        stop_event = getattr(spider, 'stop_event', None)
+        if stop_event is not None and stop_event.is_set():
+            raise DropItem("Crawl stopped")
+
+        try:
+            item_queue.put_nowait(dict(item))
+            return item
+        except queue.Full:
+            return deferLater(reactor, QUEUE_RETRY_DELAY, self.process_item, item, spider)
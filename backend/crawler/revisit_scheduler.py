@@ -0,0 +1,165 @@
+# crawler/revisit_scheduler.py
+
+import os
+import math
+import time
+import logging
+
+from crawler.frontier import frontier_path, url_key, open_frontier_db
+
+logger = logging.getLogger(__name__)
+
+# Fetches per domain per day spent on revisiting known URLs
+CRAWL_DAILY_BUDGET = int(os.getenv("CRAWL_DAILY_BUDGET", "5000"))
+# Bounds on how often a single URL is revisited
+MIN_REVISIT_HOURS = float(os.getenv("MIN_REVISIT_HOURS", os.getenv("CRAWL_FRESHNESS_HOURS", "24")))
+MAX_REVISIT_DAYS = float(os.getenv("MAX_REVISIT_DAYS", "30"))
+# Assumed change rate (changes/day) for URLs with a single observation
+PRIOR_CHANGES_PER_DAY = float(os.getenv("PRIOR_CHANGES_PER_DAY", "0.2"))
+
+DAY = 86400.0
+
+RECORD_SQL = """
+    INSERT INTO revisits (url_key, checks, changes, first_checked, last_checked)
+    VALUES (?, 1, 0, ?, ?)
+    ON CONFLICT (url_key) DO UPDATE SET
+        checks = checks + 1,
+        changes = changes + ?,
+        last_checked = excluded.last_checked,
+        last_changed = CASE WHEN ? THEN excluded.last_checked ELSE last_changed END
+"""
+
+
+def estimate_change_rate(checks, changes, observed_seconds):
+    """
+    Estimate a page's change rate (changes/day) from periodic checks.
+
+    Uses the Cho & Garcia-Molina estimator ``-log((n - X + 0.5) / (n + 0.5)) / I``
+    where n is the number of revisits, X the number that saw a change and I the
+    mean interval between them. Unlike ``X / T`` it does not saturate when the
+    page changes more than once between visits.
+    """
+    revisits = checks - 1
+    if revisits <= 0 or observed_seconds <= 0:
+        return PRIOR_CHANGES_PER_DAY
+    changes = min(changes, revisits)
+    mean_interval_days = observed_seconds / revisits / DAY
+    return -math.log((revisits - changes + 0.5) / (revisits + 0.5)) / mean_interval_days
+
+
+class RevisitScheduler:
+    """
+    Per-URL change history and recrawl planner for one domain.
+
+    Each check of a URL records whether its content changed. From that history
+    the scheduler estimates a change rate per URL and spreads the domain's
+    daily fetch budget over URLs in proportion to the square root of their
+    rate, so fast-changing pages are revisited often and static pages rarely.
+    History lives next to the frontier in ``frontier/{domain}.sqlite`` and is
+    written through the domain's shared FrontierDB connection.
+    """
+
+    def __init__(self, domain, path=None, daily_budget=CRAWL_DAILY_BUDGET):
+        self.domain = domain
+        self.daily_budget = daily_budget
+        if path is None:
+            path = frontier_path(domain)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = open_frontier_db(path)
+        self._lock = self.db.lock
+        self.conn = self.db.conn
+        with self._lock:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS revisits (
+                    url_key BLOB PRIMARY KEY,
+                    checks INTEGER NOT NULL DEFAULT 0,
+                    changes INTEGER NOT NULL DEFAULT 0,
+                    first_checked REAL NOT NULL,
+                    last_checked REAL NOT NULL,
+                    last_changed REAL
+                )
+            """)
+            self.db.commit()
+
+    def record(self, url, changed):
+        """
+        Record one check of a URL and whether its content had changed.
+        The first check only establishes a baseline and never counts as a change.
+        """
+        now = time.time()
+        with self._lock:
+            self.conn.execute(RECORD_SQL, (url_key(url), now, now, 1 if changed else 0, changed))
+            self.db.wrote()
+
+    def record_many(self, observations):
+        """Record ``{url: changed}`` for a batch of checks and commit them together."""
+        now = time.time()
+        with self._lock:
+            self.conn.executemany(RECORD_SQL, [
+                (url_key(url), now, now, 1 if changed else 0, changed) for url, changed in observations.items()
+            ])
+            self.db.commit()
+
+    def has_history(self):
+        with self._lock:
+            return self.conn.execute("SELECT 1 FROM revisits LIMIT 1").fetchone() is not None
+
+    def _fetches_last_day(self, now):
+        with self._lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM urls WHERE fetched_at >= ?", (now - DAY,)
+            ).fetchone()[0]
+
+    def plan(self, budget=None, now=None):
+        """
+        Decide which known URLs to revisit now.
+
+        Args:
+            budget (int, optional): Daily fetch budget; defaults to the scheduler's
+            now (float, optional): Planning time, for testing
+
+        Returns:
+            list: Dicts with url, depth, change rate and revisit interval for the
+            URLs that are due, most overdue first, capped by the remaining budget
+        """
+        now = now or time.time()
+        budget = budget or self.daily_budget
+        with self._lock:
+            rows = self.conn.execute("""
+                SELECT u.url, u.depth, u.fetched_at, r.checks, r.changes, r.first_checked, r.last_checked
+                FROM urls u LEFT JOIN revisits r ON r.url_key = u.url_key
+                WHERE u.fetched_at IS NOT NULL
+            """).fetchall()
+        if not rows:
+            return []
+
+        rates = [
+            estimate_change_rate(checks or 1, changes or 0, (last or 0) - (first or 0))
+            for _, _, _, checks, changes, first, last in rows
+        ]
+        # Square-root allocation: revisits/day per URL proportional to sqrt(rate)
+        total = sum(math.sqrt(r) for r in rates) or 1.0
+        min_interval = MIN_REVISIT_HOURS * 3600
+        max_interval = MAX_REVISIT_DAYS * DAY
+
+        due = []
+        for (url, depth, fetched_at, *_), rate in zip(rows, rates):
+            per_day = budget * math.sqrt(rate) / total
+            interval = DAY / per_day if per_day > 0 else max_interval
+            interval = min(max(interval, min_interval), max_interval)
+            age = now - fetched_at
+            if age >= interval:
+                due.append({
+                    'url': url,
+                    'depth': depth,
+                    'changes_per_day': round(rate, 4),
+                    'interval_hours': round(interval / 3600, 2),
+                    'overdue': age / interval,
+                })
+
+        due.sort(key=lambda d: d['overdue'], reverse=True)
+        remaining = max(budget - self._fetches_last_day(now), 0)
+        return due[:remaining]
+
+    def close(self):
+        self.db.release()
@@ -1,61 +1,153 @@
 import scrapy
-from scrapy.crawler import CrawlerProcess
+from scrapy.exceptions import CloseSpider
 from scrapy.linkextractors import LinkExtractor
-import json
-import os
+import queue
+
+from crawler.frontier import FrontierStore
+from crawler.revisit_scheduler import RevisitScheduler
 
 class SiteSpider(scrapy.Spider):
     name = 'site_spider'
     custom_settings = {
         'LOG_LEVEL': 'ERROR',
-        'FEED_FORMAT': 'json',
-        'FEED_URI': 'output.json'
+        'DOWNLOADER_MIDDLEWARES': {'crawler.middlewares.ConditionalRequestMiddleware': 590},
     }
+    # 304 Not Modified answers our conditional recrawl requests
+    handle_httpstatus_list = [304]
 
-    def __init__(self, *args, domain=None, depth=2, **kwargs):
-        self.start_urls = [f'https://{domain}'] 
+    def __init__(self, *args, domain=None, depth=2, stop_event=None, item_queue=None,
+                 freshness_hours=None, persist_frontier=True, daily_budget=None, **kwargs):
+        self.start_urls = [f'https://{domain}']
         self.allowed_domains = [domain]
         self.max_depth = int(depth)
+        self.stop_event = stop_event
+        self.item_queue = item_queue
+        self.frontier = None
+        self.scheduler = None
+        self.scheduled = False
+        if persist_frontier:
+            frontier_kwargs = {} if freshness_hours is None else {'freshness_hours': float(freshness_hours)}
+            self.frontier = FrontierStore(domain, **frontier_kwargs)
+            scheduler_kwargs = {} if daily_budget is None else {'daily_budget': int(daily_budget)}
+            self.scheduler = RevisitScheduler(domain, **scheduler_kwargs)
         super().__init__(*args, **kwargs)
 
+    def start_requests(self):
+        if self.frontier is None:
+            for url in self.start_urls:
+                yield scrapy.Request(url, callback=self.parse)
+            return
+
+        # Resume unfinished URLs and pick which known URLs to revisit: by the
+        # scheduler's plan once change history exists, else by freshness.
+        if self.scheduler.has_history():
+            self.scheduled = True
+            plan = self.scheduler.plan()
+            requeued = self.frontier.requeue([entry['url'] for entry in plan])
+        else:
+            requeued = self.frontier.requeue_stale()
+        for url in self.start_urls:
+            self.frontier.add(url, 0)
+        stats = self.frontier.stats()
+        self.logger.info(f"Frontier for {self.allowed_domains[0]}: {stats} ({requeued} requeued for revisit)")
+
+        for url, depth in self.frontier.pending():
+            if depth <= self.max_depth:
+                yield self._request(url, depth)
+
+    def _request(self, url, depth):
+        return scrapy.Request(url, callback=self.parse, errback=self.on_error, meta={'depth': depth})
+
+    def on_error(self, failure):
+        if self.frontier is not None:
+            self.frontier.mark_failed(failure.request.url)
+
     def parse(self, response):
-        yield {
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise CloseSpider('stopped')
+
+        validators = None
+        if self.frontier is not None:
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            validators = {
+                'urls': response.meta.get('redirect_urls', []) + [response.url],
+                'etag': etag.decode('latin-1') if etag else None,
+                'last_modified': last_modified.decode('latin-1') if last_modified else None,
+            }
+            for url in validators['urls']:
+                if response.status == 304:
+                    self.frontier.mark_fetched(url, etag=validators['etag'],
+                                               last_modified=validators['last_modified'])
+                else:
+                    # New validators are saved by ingest once the page is stored;
+                    # until then a recrawl must not get a 304 for it
+                    self.frontier.mark_fetched(url)
+
+        if response.status == 304:
+            # Unchanged since the last fetch: nothing to extract, embed or store.
+            # Its known links were already requeued from the frontier if due.
+            if self.scheduler is not None:
+                self.scheduler.record(response.url, changed=False)
+            return
+
+        links = LinkExtractor().extract_links(response)
+
+        item = {
             'url': response.url,
-            'html': response.text
+            'html': response.text,
+            'pdf_links': [link.url for link in links if link.url.lower().endswith('.pdf')]
         }
+        if validators and (validators['etag'] or validators['last_modified']):
+            item['validators'] = validators
+        yield item
 
-        if response.meta.get('depth', 0) < self.max_depth:
-            le = LinkExtractor()
-            for link in le.extract_links(response):
-                yield scrapy.Request(link.url, callback=self.parse)
-
-def run_crawler(domain, depth):
-    process = CrawlerProcess()
-    process.crawl(SiteSpider, domain=domain, depth=depth)
-    process.start()
-
-    try:
-        with open("output.json") as f:
-            return json.load(f)
-    except Exception as e:
-        print("No output file found:", e)
-        return []
+        depth = response.meta.get('depth', 0)
+        if depth < self.max_depth:
+            for link in LinkExtractor(allow_domains=self.allowed_domains).extract_links(response):
+                if link.url.lower().endswith('.pdf'):
+                    continue
+                if self.frontier is None:
+                    yield scrapy.Request(link.url, callback=self.parse)
+                elif self.frontier.add(link.url, depth + 1, requeue_stale=not self.scheduled):
+                    yield self._request(link.url, depth + 1)
 
-def parse(self, response):
-    yield {
-        'url': response.url,
-        'html': response.text,
-        'pdf_links': []
-    }
+    def closed(self, reason):
+        if self.frontier is not None:
+            self.frontier.close()
+        if self.scheduler is not None:
+            self.scheduler.close()
 
-    # Extract all links
-    le = LinkExtractor()
-    for link in le.extract_links(response):
-        if link.url.lower().endswith('.pdf'):
-            yield {
-                'url': response.url,
-                'html': response.text,
-                'pdf_links': [link.url]
-            }
-        else:
-            yield scrapy.Request(link.url, callback=self.parse)
+def run_crawler(domain, depth, stop_event=None, item_queue=None):
+    """
+    Crawl a domain with SiteSpider on the shared CrawlEngine and wait for it.
+
+    Args:
+        domain (str): Domain to crawl
+        depth (int): Maximum link depth
+        stop_event (threading.Event, optional): Set to stop the crawl early
+        item_queue (queue.Queue, optional): Bounded queue to stream items into.
+            When given, items are consumed by the caller as they are scraped.
+
+    Returns:
+        list: Crawled items when not streaming, otherwise an empty list
+    """
+    from crawler.engine import get_crawl_engine
+
+    streaming = item_queue is not None
+    if not streaming:
+        item_queue = queue.Queue()
+
+    engine = get_crawl_engine()
+    job = engine.submit(domain, depth, item_queue=item_queue)
+    while not job.done.wait(timeout=0.5):
+        if stop_event is not None and stop_event.is_set():
+            engine.cancel(job.id)
+
+    if streaming:
+        return []
+
+    items = []
+    while not item_queue.empty():
+        items.append(item_queue.get_nowait())
+    return items
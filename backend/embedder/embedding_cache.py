@@ -0,0 +1,141 @@
+# embedder/embedding_cache.py
+
+import os
+import array
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.getenv("CACHE_DIR", "cache")
+# Vectors kept in memory (384 floats ≈ 1.5 KB each)
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "20000"))
+# Set to "false" to keep only the in-memory tier
+EMBED_CACHE_PERSIST = os.getenv("EMBED_CACHE_PERSIST", "true").lower() == "true"
+LOOKUP_CHUNK = 500
+
+
+def normalize_text(text):
+    """Collapse whitespace so trivially different copies share a cache entry."""
+    return " ".join(text.split())
+
+
+def cache_key(text, model_id):
+    return hashlib.sha256(f"{model_id}\0{normalize_text(text)}".encode('utf-8')).digest()
+
+
+def _pack(vector):
+    return array.array('f', vector).tobytes()
+
+
+def _unpack(blob):
+    vector = array.array('f')
+    vector.frombytes(blob)
+    return vector.tolist()
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache keyed by hash(model id + normalized text).
+
+    A bounded in-memory LRU sits in front of an optional SQLite store
+    (``cache/embeddings.sqlite``) that survives restarts. Vectors are stored
+    as float32, which is the precision the model produces.
+    """
+
+    def __init__(self, max_size=EMBED_CACHE_SIZE, path=None, persist=EMBED_CACHE_PERSIST):
+        self.max_size = max_size
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.conn = None
+        if persist:
+            if path is None:
+                os.makedirs(CACHE_DIR, exist_ok=True)
+                path = os.path.join(CACHE_DIR, "embeddings.sqlite")
+            self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL) WITHOUT ROWID")
+            self.conn.commit()
+
+    def _remember(self, key, vector):
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_size:
+            self._lru.popitem(last=False)
+
+    def get_many(self, keys):
+        """Return {key: vector} for the keys found in either tier."""
+        found = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                vector = self._lru.get(key)
+                if vector is None:
+                    missing.append(key)
+                else:
+                    self._lru.move_to_end(key)
+                    found[key] = vector
+            self.memory_hits += len(found)
+
+            if missing and self.conn is not None:
+                for i in range(0, len(missing), LOOKUP_CHUNK):
+                    chunk = missing[i:i + LOOKUP_CHUNK]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows = self.conn.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                    ).fetchall()
+                    for key, blob in rows:
+                        vector = _unpack(blob)
+                        found[key] = vector
+                        self._remember(key, vector)
+                        self.disk_hits += 1
+
+            self.misses += len(set(keys) - found.keys())
+        return found
+
+    def put_many(self, items):
+        """Store {key: vector} in both tiers."""
+        if not items:
+            return
+        with self._lock:
+            for key, vector in items.items():
+                self._remember(key, vector)
+            if self.conn is not None:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(key, _pack(vector)) for key, vector in items.items()]
+                )
+                self.conn.commit()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._lru),
+                "memory_capacity": self.max_size,
+                "persistent": self.conn is not None,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache():
+    """Return the process-wide EmbeddingCache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache()
+        return _cache
@@ -1,6 +1,171 @@
+import os
+import time
+import queue
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
 from sentence_transformers import SentenceTransformer
 
-model = SentenceTransformer('all-MiniLM-L6-v2')
+from embedder.embedding_cache import get_embedding_cache, cache_key
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# Batch size for bulk (ingestion) encoding
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+# Micro-batching of concurrent single-text requests
+MICROBATCH_MAX_SIZE = int(os.getenv("EMBED_MICROBATCH_MAX_SIZE", "32"))
+MICROBATCH_WAIT_MS = float(os.getenv("EMBED_MICROBATCH_WAIT_MS", "5"))
+# How long embed_text waits for the batcher before giving up
+EMBED_TIMEOUT_SECS = float(os.getenv("EMBED_TIMEOUT_SECS", "30"))
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    """Return the process-wide SentenceTransformer, loading it on first use."""
+    global _model
+    with _model_lock:
+        if _model is None:
+            _model = SentenceTransformer(MODEL_NAME)
+            logger.info(f"✅ Embedding model {MODEL_NAME} loaded.")
+        return _model
+
+
+def _encode(texts, batch_size=EMBED_BATCH_SIZE):
+    """Run the model on a list of texts. Bypasses the cache."""
+    return get_model().encode(list(texts), batch_size=batch_size).tolist()
+
+
+def embed_batch(texts, batch_size=EMBED_BATCH_SIZE):
+    """
+    Embed many texts, encoding only cache misses in one batched model call.
+    Returns a list of vectors in input order.
+    """
+    texts = list(texts)
+    if not texts:
+        return []
+    cache = get_embedding_cache()
+    keys = [cache_key(text, MODEL_NAME) for text in texts]
+    cached = cache.get_many(keys)
+
+    misses = {}
+    for key, text in zip(keys, texts):
+        if key not in cached:
+            misses.setdefault(key, text)
+    if misses:
+        encoded = dict(zip(misses, _encode(list(misses.values()), batch_size=batch_size)))
+        cache.put_many(encoded)
+        cached.update(encoded)
+    return [cached[key] for key in keys]
+
+
+class MicroBatcher:
+    """
+    Collects embedding requests from concurrent callers and encodes them together.
+
+    A single background thread takes the first waiting request, keeps
+    gathering for up to ``max_wait_ms`` or until ``max_batch_size`` texts are
+    waiting, then runs one batched encode and hands each caller its vector
+    through a Future.
+
+    Callers may cancel their Future (``aembed_text`` does when its await is
+    cancelled); cancelled requests are dropped before encoding, and no
+    failure in one batch stops the thread serving the next.
+    """
+
+    def __init__(self, encode=_encode, max_batch_size=MICROBATCH_MAX_SIZE, max_wait_ms=MICROBATCH_WAIT_MS):
+        self.encode = encode
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="embed-microbatcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, text):
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._resolve(batch)
+            except Exception as e:
+                logger.error(f"❌ Embedding batch of {len(batch)} could not be resolved: {e}")
+
+    def _resolve(self, batch):
+        # Marks live futures running, so a late cancel can no longer race set_result
+        batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        texts = [text for text, _ in batch]
+        try:
+            vectors = self.encode(texts)
+        except Exception as e:
+            logger.error(f"❌ Embedding batch of {len(texts)} failed: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), vector in zip(batch, vectors):
+            future.set_result(vector)
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_micro_batcher():
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = MicroBatcher()
+        return _batcher
+
 
 def embed_text(text):
-    return model.encode(text).tolist()  # Convert numpy to list for JSON/pgvector
+    """
+    Embed one text. Cached vectors are returned directly; misses from
+    concurrent callers are batched together by the MicroBatcher.
+
+    Raises:
+        TimeoutError: The batcher did not answer within EMBED_TIMEOUT_SECS
+    """
+    cache = get_embedding_cache()
+    key = cache_key(text, MODEL_NAME)
+    vector = cache.get_many([key]).get(key)
+    if vector is None:
+        future = get_micro_batcher().submit(text)
+        try:
+            vector = future.result(timeout=EMBED_TIMEOUT_SECS)
+        except FutureTimeoutError:
+            future.cancel()
+            raise TimeoutError(f"Embedding not ready after {EMBED_TIMEOUT_SECS:.0f}s")
+        cache.put_many({key: vector})
+    return vector
+
+
+async def aembed_text(text):
+    """Async variant of embed_text that does not block the event loop."""
+    # The disk tier is SQLite, so keep it off the event loop
+    cache = await asyncio.to_thread(get_embedding_cache)
+    key = cache_key(text, MODEL_NAME)
+    vector = (await asyncio.to_thread(cache.get_many, [key])).get(key)
+    if vector is None:
+        vector = await asyncio.wrap_future(get_micro_batcher().submit(text))
+        await asyncio.to_thread(cache.put_many, {key: vector})
+    return vector
@@ -4,16 +4,19 @@ import json
 
 def build_ontology(crawled_docs, domain):
     G = nx.DiGraph()
+    crawled_urls = {d['url'] for d in crawled_docs}
     
     for doc in crawled_docs:
         url = doc['url']
         title = doc.get('title', url)
         G.add_node(url, title=title)
 
-        # Extract internal links from text or HTML
-        links = extract_internal_links(doc['html'], domain)
+        # Use pre-extracted links when available (streaming ingest drops the HTML)
+        links = doc.get('links')
+        if links is None:
+            links = extract_internal_links(doc['html'], domain)
         for link in links:
-            if link in [d['url'] for d in crawled_docs]:
+            if link in crawled_urls:
                 G.add_edge(url, link)
 
     # Save as GraphML
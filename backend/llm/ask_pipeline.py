@@ -0,0 +1,454 @@
+# llm/ask_pipeline.py
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List
+
+from llm.pdf_form_filler import agenerate_with_mistral, astream_with_mistral
+from llm.ollama_client import LLMTimeout
+from llm.prompt_templates import RAG_PROMPT_TEMPLATE, ADDRESS_EXTRACTION_PROMPT
+from utils.async_database import hybrid_search
+from utils.answer_cache import get_answer_cache
+from utils.async_user_utils import get_user_profile, update_user_profile
+from utils.bulk_writer import get_bulk_writer
+from utils.web_search import simple_web_search
+from utils.quality_filter import is_quality_result
+from utils.query_router import get_query_router
+from utils.forwarder import forward_to_agent
+
+logger = logging.getLogger(__name__)
+
+# Whole-request budget for /rag/ask
+RAG_LATENCY_BUDGET_MS = float(os.getenv("RAG_LATENCY_BUDGET_MS", "60000"))
+# "inline" waits for validation, "deferred" runs it after responding, "skip" never runs it
+RAG_VALIDATION_MODE = os.getenv("RAG_VALIDATION_MODE", "deferred")
+VALIDATION_MODES = ("inline", "deferred", "skip")
+# Deferred validation results kept for GET /rag/validation/{id}
+DEFERRED_VALIDATION_LIMIT = int(os.getenv("DEFERRED_VALIDATION_LIMIT", "1000"))
+CONTEXT_DOCS = 3
+
+VALIDATION_PROMPT = """
+You are a quality assurance assistant.
+The user asked: "{question}"
+The system answered: "{answer}"
+Based on the context below, is the answer accurate?
+Context: {context}
+Please respond with:
+- Yes/No for accuracy
+- A corrected or improved version of the answer
+- Suggested next steps
+"""
+
+
+class BudgetExceeded(Exception):
+    """A required stage did not finish within the request's latency budget."""
+
+
+def parse_validation(response: str, answer: str) -> Dict[str, Any]:
+    lines = response.strip().split('\n')
+    return {
+        "is_accurate": lines[0].lower().startswith("yes"),
+        "improved_answer": lines[2] if len(lines) > 2 else answer,
+        "next_steps": lines[3] if len(lines) > 3 else "No specific next steps.",
+    }
+
+
+class StageRunner:
+    """
+    Runs named pipeline stages against one request deadline and records
+    their wall-clock time in ``timings`` (ms).
+
+    Required stages raise BudgetExceeded when the deadline passes; optional
+    ones return ``default`` and are reported as "timeout" in ``timings``.
+    Either way the late task is cancelled, so a discarded generation does not
+    keep holding an LLM slot, unless it is a fire-and-forget stage waited on
+    with ``keep_running=True``.
+    """
+
+    def __init__(self, budget_ms: float):
+        self.started = time.monotonic()
+        self.deadline = self.started + budget_ms / 1000.0
+        self.timings = {}
+        self.status = {}
+
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - time.monotonic())
+
+    def start(self, name: str, coro) -> asyncio.Task:
+        """Start a stage now; its timing covers start to completion."""
+        async def timed():
+            begin = time.monotonic()
+            try:
+                return await coro
+            finally:
+                self.timings[name] = round(1000 * (time.monotonic() - begin), 1)
+        return asyncio.ensure_future(timed())
+
+    async def wait(self, name: str, task: asyncio.Task, required: bool = True, default=None,
+                   keep_running: bool = False):
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout=self.remaining())
+        except asyncio.TimeoutError:
+            self.status[name] = "timeout"
+            if not keep_running:
+                task.cancel()
+            if required:
+                raise BudgetExceeded(f"Stage '{name}' exceeded the latency budget")
+            return default
+
+    async def run(self, name: str, coro, required: bool = True, default=None):
+        return await self.wait(name, self.start(name, coro), required, default)
+
+    def total_ms(self) -> float:
+        return round(1000 * (time.monotonic() - self.started), 1)
+
+    def report(self) -> Dict[str, Any]:
+        """Per-stage timings and timeouts plus the total, for ``timings_ms``."""
+        return {**self.timings, **self.status, "total": self.total_ms()}
+
+
+class DeferredValidations:
+    """Bounded store of validations that finish after the response was sent."""
+
+    def __init__(self, limit: int = DEFERRED_VALIDATION_LIMIT):
+        self.limit = limit
+        self._results = OrderedDict()
+
+    def start(self, question: str, answer: str, context: str) -> str:
+        validation_id = uuid.uuid4().hex
+        self._results[validation_id] = {"status": "pending"}
+        while len(self._results) > self.limit:
+            self._results.popitem(last=False)
+        asyncio.ensure_future(self._run(validation_id, question, answer, context))
+        return validation_id
+
+    async def _run(self, validation_id, question, answer, context):
+        begin = time.monotonic()
+        try:
+            response = await agenerate_with_mistral(VALIDATION_PROMPT.format(question=question, answer=answer, context=context))
+            result = {"status": "done", **parse_validation(response, answer)}
+        except Exception as e:
+            logger.error(f"❌ Deferred validation failed: {e}")
+            result = {"status": "error", "error": str(e)}
+        result["validation_ms"] = round(1000 * (time.monotonic() - begin), 1)
+        if validation_id in self._results:
+            self._results[validation_id] = result
+
+    def get(self, validation_id: str) -> Optional[Dict[str, Any]]:
+        return self._results.get(validation_id)
+
+
+deferred_validations = DeferredValidations()
+
+
+async def _extract_profile(user_id: str, query: str) -> Dict[str, Any]:
+    """Pull personal details out of the question and store them on the profile."""
+    response = await agenerate_with_mistral(ADDRESS_EXTRACTION_PROMPT.format(input=query))
+    try:
+        profile_update = json.loads(response)
+    except (TypeError, ValueError):
+        return {}
+    if not isinstance(profile_update, dict):
+        return {}
+    await asyncio.gather(*[
+        update_user_profile(user_id, {"key": key, "value": value}) for key, value in profile_update.items()
+    ])
+    return profile_update
+
+
+async def _web_fallback(query: str, search: Dict[str, Any], runner: StageRunner) -> List[Dict[str, Any]]:
+    """Search the web, ingest the good pages and retrieve again."""
+    urls = await runner.run("web_search", asyncio.to_thread(simple_web_search, query, max_results=5))
+    checks = await runner.run("quality_filter", asyncio.gather(
+        *[asyncio.to_thread(is_quality_result, url) for url in urls]
+    ))
+    if any(checks):
+        # Make the new pages searchable before retrieving again
+        await runner.run("flush", asyncio.to_thread(get_bulk_writer().flush))
+    return await runner.run("retrieve_again", hybrid_search(query, **search))
+
+
+def _start_profile(user_id, query, runner):
+    if not user_id:
+        return None
+    return (
+        runner.start("profile_load", get_user_profile(user_id)),
+        runner.start("profile_extract", _extract_profile(user_id, query)),
+    )
+
+
+def _cache_scope(search) -> tuple:
+    return (search.get("domain"), search.get("source_type"))
+
+
+async def _cached_answer(query, search, use_cache, runner):
+    """
+    Embed the question and look it up in the answer cache.
+
+    Returns:
+        tuple: (embedding, hit); ``hit`` is None on a miss or when the cache is bypassed
+    """
+    from embedder.embedding_utils import aembed_text
+    embedding = await runner.run("embed_question", aembed_text(query))
+    if not use_cache:
+        return embedding, None
+    begin = time.monotonic()
+    hit = get_answer_cache().lookup(embedding, _cache_scope(search))
+    runner.timings["answer_cache"] = round(1000 * (time.monotonic() - begin), 1)
+    return embedding, hit
+
+
+def _cache_info(hit) -> Dict[str, Any]:
+    if hit is None:
+        return {"hit": False}
+    return {
+        "hit": True,
+        "similarity": hit["similarity"],
+        "matched_question": hit["question"],
+        "age_secs": hit["age_secs"],
+        "corpus_version": hit["corpus_version"],
+    }
+
+
+def _remember_answer(query, embedding, search, result):
+    """Cache the reusable part of an answer (not the per-request fields)."""
+    cached = {k: v for k, v in result.items()
+              if k not in ("original_query", "profile_used", "validation_id", "timings_ms", "cache")}
+    get_answer_cache().put(query, embedding, cached, [s.get("url") for s in result["sources"]],
+                           _cache_scope(search))
+
+
+async def _gather_context(query, embedding, search, runner):
+    """
+    Front half shared by answer_question and stream_answer: retrieval, then
+    routing to an agent or the web fallback when nothing local matches.
+
+    Routing compares the question embedding with the agents' exemplars; only
+    ambiguous scores cost an LLM call, which runs alongside the web fallback.
+
+    Returns:
+        tuple: (context_docs, forwarded); ``forwarded`` is the agent response
+        when the question was delegated, else None
+    """
+    retrieve = runner.start("retrieve", hybrid_search(query, **search))
+    context_docs = await runner.wait("retrieve", retrieve)
+    if not context_docs:
+        router = get_query_router()
+        decision = router.classify(embedding)
+        runner.timings["route"] = decision["elapsed_ms"]
+        fallback = None if decision["agent"] else runner.start("web_fallback", _web_fallback(query, search, runner))
+        if decision["ambiguous"]:
+            decision = await runner.run("route_llm", router.aroute(query, embedding), required=False, default=decision)
+        else:
+            router.settle(decision)
+        if decision["url"]:
+            if fallback is not None:
+                fallback.cancel()
+            forwarded = await runner.run("forward", asyncio.to_thread(forward_to_agent, decision["url"], query))
+            return [], forwarded
+        context_docs = await runner.wait("web_fallback", fallback)
+    return context_docs, None
+
+
+async def _collect_profile(profile_tasks, runner, wait_extract: bool = True) -> Dict[str, Any]:
+    """Stored profile plus what was extracted from this question; extraction keeps running if not awaited."""
+    if not profile_tasks:
+        return {}
+    load, extract = profile_tasks
+    profile = dict(await runner.wait("profile_load", load, required=False, default={}) or {})
+    if wait_extract:
+        # Extraction updates the stored profile, so it may finish after the response
+        profile.update(await runner.wait("profile_extract", extract, required=False, default={},
+                                         keep_running=True) or {})
+    return profile
+
+
+def _delegated(forwarded, runner) -> Dict[str, Any]:
+    """Agent response with this request's ``timings_ms``, like every other /rag/ask response."""
+    if not isinstance(forwarded, dict):
+        forwarded = {"response": forwarded}
+    return {**forwarded, "timings_ms": runner.report()}
+
+
+def _context(context_docs) -> str:
+    return "\n".join([f"{d['title']}\n{d['snippet']}" for d in context_docs])
+
+
+def _sources(context_docs) -> List[Dict[str, Any]]:
+    return [{"title": d["title"], "url": d.get("url")} for d in context_docs]
+
+
+def _options(search, validation):
+    validation = validation or RAG_VALIDATION_MODE
+    if validation not in VALIDATION_MODES:
+        raise ValueError(f"Unknown validation mode: {validation}")
+    return {"limit": CONTEXT_DOCS, **(search or {})}, validation
+
+
+async def answer_question(
+    query: str,
+    user_id: Optional[str] = None,
+    search: Optional[Dict[str, Any]] = None,
+    validation: Optional[str] = None,
+    budget_ms: Optional[float] = None,
+    use_cache: bool = True
+) -> Dict[str, Any]:
+    """
+    Answer a question as a dependency graph of async stages.
+
+    - a semantically equivalent question answered before is served from the answer cache
+    - retrieval, profile load and profile extraction start together
+    - with no local context, the question is routed to an agent by embedding or falls back to web search
+    - the answer waits only for retrieval
+    - validation runs inline, after the response (deferred) or not at all
+
+    Optional stages that miss the budget are dropped and marked "timeout";
+    a required stage missing it raises BudgetExceeded.
+
+    Args:
+        query (str): The user's question
+        user_id (str, optional): Profile to load and update
+        search (dict, optional): Extra hybrid_search arguments (filters, recall knobs)
+        validation (str, optional): One of VALIDATION_MODES; defaults to RAG_VALIDATION_MODE
+        budget_ms (float, optional): Latency budget; defaults to RAG_LATENCY_BUDGET_MS
+        use_cache (bool): Look the question up in the answer cache first
+
+    Returns:
+        dict: The /rag/ask response, including ``cache`` and ``timings_ms`` per stage
+    """
+    search, validation = _options(search, validation)
+    runner = StageRunner(budget_ms or RAG_LATENCY_BUDGET_MS)
+
+    profile_tasks = _start_profile(user_id, query, runner)
+    embedding, hit = await _cached_answer(query, search, use_cache, runner)
+    if hit is not None:
+        return {
+            **hit["result"],
+            "original_query": query,
+            "profile_used": await _collect_profile(profile_tasks, runner, wait_extract=False),
+            "cache": _cache_info(hit),
+            "timings_ms": runner.report(),
+        }
+
+    context_docs, forwarded = await _gather_context(query, embedding, search, runner)
+    if forwarded is not None:
+        return _delegated(forwarded, runner)
+
+    context = _context(context_docs)
+    answer = await runner.run("answer", agenerate_with_mistral(
+        RAG_PROMPT_TEMPLATE.format(context=context, question=query), timeout=runner.remaining()
+    ))
+    profile = await _collect_profile(profile_tasks, runner)
+
+    result = {
+        "original_query": query,
+        "initial_answer": answer,
+        "is_accurate": None,
+        "improved_answer": answer,
+        "next_steps": None,
+        "validation": validation,
+        "sources": _sources(context_docs),
+        "profile_used": profile,
+    }
+
+    if validation == "inline":
+        response = await runner.run(
+            "validation", agenerate_with_mistral(VALIDATION_PROMPT.format(question=query, answer=answer, context=context)),
+            required=False
+        )
+        if response is not None:
+            result.update(parse_validation(response, answer))
+    elif validation == "deferred":
+        result["validation_id"] = deferred_validations.start(query, answer, context)
+
+    _remember_answer(query, embedding, search, result)
+    result["cache"] = _cache_info(None)
+    result["timings_ms"] = runner.report()
+    return result
+
+
+async def stream_answer(
+    query: str,
+    user_id: Optional[str] = None,
+    search: Optional[Dict[str, Any]] = None,
+    validation: Optional[str] = "inline",
+    budget_ms: Optional[float] = None,
+    use_cache: bool = True
+):
+    """
+    Streaming variant of answer_question. Yields ``(event, data)`` pairs:
+
+    - ``sources``: retrieved sources, as soon as retrieval finishes
+    - ``token``: answer chunks as the model produces them (none on a cache hit)
+    - ``answer``: the complete answer, the profile used and the cache outcome
+    - ``validation``: inline result, deferred id, skipped, or the cached result
+    - ``done``: per-stage timings
+    - ``delegated`` replaces all of the above when an agent answered
+    - ``error``: a stage failed or the budget ran out
+    """
+    try:
+        search, validation = _options(search, validation)
+        runner = StageRunner(budget_ms or RAG_LATENCY_BUDGET_MS)
+
+        profile_tasks = _start_profile(user_id, query, runner)
+        embedding, hit = await _cached_answer(query, search, use_cache, runner)
+        if hit is not None:
+            cached = hit["result"]
+            yield "sources", {"sources": cached["sources"]}
+            yield "answer", {"answer": cached["initial_answer"],
+                             "profile_used": await _collect_profile(profile_tasks, runner, wait_extract=False),
+                             "cache": _cache_info(hit)}
+            yield "validation", {"mode": "cached", "status": "done", "is_accurate": cached["is_accurate"],
+                                 "improved_answer": cached["improved_answer"], "next_steps": cached["next_steps"]}
+            yield "done", {"timings_ms": runner.report()}
+            return
+
+        context_docs, forwarded = await _gather_context(query, embedding, search, runner)
+        if forwarded is not None:
+            yield "delegated", _delegated(forwarded, runner)
+            return
+        yield "sources", {"sources": _sources(context_docs)}
+
+        context = _context(context_docs)
+        begin = time.monotonic()
+        parts = []
+        prompt = RAG_PROMPT_TEMPLATE.format(context=context, question=query)
+        async for chunk in astream_with_mistral(prompt, timeout=runner.remaining()):
+            if not parts:
+                runner.timings["first_token"] = round(1000 * (time.monotonic() - runner.started), 1)
+            parts.append(chunk)
+            yield "token", {"text": chunk}
+        runner.timings["answer"] = round(1000 * (time.monotonic() - begin), 1)
+        answer = "".join(parts).strip()
+
+        profile = await _collect_profile(profile_tasks, runner)
+        yield "answer", {"answer": answer, "profile_used": profile, "cache": _cache_info(None)}
+
+        result = {"initial_answer": answer, "is_accurate": None, "improved_answer": answer, "next_steps": None,
+                  "validation": validation, "sources": _sources(context_docs)}
+        if validation == "inline":
+            response = await runner.run(
+                "validation", agenerate_with_mistral(VALIDATION_PROMPT.format(question=query, answer=answer, context=context)),
+                required=False
+            )
+            if response is None:
+                yield "validation", {"mode": validation, "status": "timeout"}
+            else:
+                result.update(parse_validation(response, answer))
+                yield "validation", {"mode": validation, "status": "done", **parse_validation(response, answer)}
+        elif validation == "deferred":
+            yield "validation", {"mode": validation, "status": "pending",
+                                 "validation_id": deferred_validations.start(query, answer, context)}
+        else:
+            yield "validation", {"mode": validation, "status": "skipped"}
+
+        _remember_answer(query, embedding, search, result)
+        yield "done", {"timings_ms": runner.report()}
+    except Exception as e:
+        logger.error(f"❌ Streaming answer failed: {e}")
+        yield "error", {"error": str(e), "budget_exceeded": isinstance(e, (BudgetExceeded, LLMTimeout))}
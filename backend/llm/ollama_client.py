@@ -0,0 +1,291 @@
+# llm/ollama_client.py
+
+import os
+import json
+import asyncio
+import logging
+import threading
+from typing import Optional, Dict, Any
+
+import httpx
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "mistral")
+# Generations Ollama runs at once; further calls queue for a slot
+OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "2"))
+# Calls allowed to wait for a slot before new ones are rejected with LLMOverloaded
+OLLAMA_MAX_QUEUE = int(os.getenv("OLLAMA_MAX_QUEUE", "32"))
+# Default deadline for one call, queueing included
+OLLAMA_TIMEOUT_SECS = float(os.getenv("OLLAMA_TIMEOUT_SECS", "120"))
+OLLAMA_CONNECT_TIMEOUT_SECS = float(os.getenv("OLLAMA_CONNECT_TIMEOUT_SECS", "5"))
+
+
+class LLMOverloaded(Exception):
+    """The generation queue is full; the caller should back off."""
+
+
+class LLMTimeout(Exception):
+    """A generation did not finish before its deadline."""
+
+
+class _Flight:
+    """One generation shared by every caller that asked for the same prompt."""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class OllamaClient:
+    """
+    Async client for Ollama's /api/generate over one keep-alive HTTP pool.
+
+    - at most ``max_concurrency`` generations run at once; up to ``max_queue``
+      more wait for a slot and anything beyond that fails fast with LLMOverloaded
+    - every call has a deadline (queueing included) and raises LLMTimeout past it
+    - identical prompts in flight at the same time share one generation; it is
+      cancelled only when every caller sharing it has gone
+
+    The client runs on its own event loop in a daemon thread, so the HTTP
+    pool, the slots and the in-flight table are shared by async routes and
+    by sync callers in worker threads alike. ``transport`` is passed to
+    httpx, so tests can point the client at a fake Ollama.
+    """
+
+    def __init__(
+        self,
+        base_url: str = OLLAMA_HOST,
+        model: str = OLLAMA_MODEL,
+        max_concurrency: int = OLLAMA_MAX_CONCURRENCY,
+        max_queue: int = OLLAMA_MAX_QUEUE,
+        timeout: float = OLLAMA_TIMEOUT_SECS,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.base_url = base_url
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._transport = transport
+        self._inflight: Dict[tuple, _Flight] = {}
+        self._active = 0
+        self._queued = 0
+        self.requests = 0
+        self.generations = 0
+        self.coalesced = 0
+        self.overloaded = 0
+        self.timeouts = 0
+        self.errors = 0
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="ollama-client", daemon=True)
+        self._thread.start()
+        self._slots = None
+        self._http = None
+        self._call(self._open()).result()
+
+    async def _open(self):
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._http = httpx.AsyncClient(
+            base_url=self.base_url,
+            transport=self._transport,
+            # Deadlines are enforced per call; httpx only bounds connecting
+            timeout=httpx.Timeout(None, connect=OLLAMA_CONNECT_TIMEOUT_SECS),
+            limits=httpx.Limits(max_connections=self.max_concurrency,
+                                max_keepalive_connections=self.max_concurrency),
+        )
+
+    def _call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    # --- Client loop ---
+
+    async def _slot(self):
+        """Acquire a generation slot, failing fast when the queue is full."""
+        if self._slots.locked():
+            if self._queued >= self.max_queue:
+                self.overloaded += 1
+                raise LLMOverloaded(f"Ollama queue full ({self._queued} waiting)")
+            self._queued += 1
+            try:
+                await self._slots.acquire()
+            finally:
+                self._queued -= 1
+        else:
+            await self._slots.acquire()
+        self._active += 1
+
+    def _release(self):
+        self._active -= 1
+        self._slots.release()
+
+    async def _generate_once(self, payload: Dict[str, Any]) -> str:
+        await self._slot()
+        try:
+            self.generations += 1
+            response = await self._http.post("/api/generate", json=payload)
+            response.raise_for_status()
+            return response.json().get("response", "").strip()
+        finally:
+            self._release()
+
+    async def _generate(self, prompt: str, timeout: float, options: Dict[str, Any]) -> str:
+        self.requests += 1
+        payload = {"model": self.model, "prompt": prompt, "stream": False}
+        if options:
+            payload["options"] = options
+        key = (self.model, prompt, json.dumps(options, sort_keys=True))
+
+        flight = self._inflight.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(self._generate_once(payload)))
+            self._inflight[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(flight.task), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise LLMTimeout(f"Ollama generation exceeded {timeout:.1f}s")
+        except (LLMOverloaded, asyncio.CancelledError):
+            raise
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Unlist it now, so a caller arriving before the cancel lands starts afresh
+                self._forget(key, flight)
+                flight.task.cancel()
+
+    def _forget(self, key: tuple, flight: _Flight):
+        """Drop a flight from the in-flight table unless a newer one replaced it."""
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+
+    async def _stream(self, prompt: str, timeout: float, options: Dict[str, Any], emit):
+        self.requests += 1
+        payload = {"model": self.model, "prompt": prompt, "stream": True}
+        if options:
+            payload["options"] = options
+
+        async def run():
+            await self._slot()
+            try:
+                self.generations += 1
+                async with self._http.stream("POST", "/api/generate", json=payload) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line:
+                            continue
+                        chunk = json.loads(line)
+                        if chunk.get("response"):
+                            emit(chunk["response"])
+                        if chunk.get("done"):
+                            break
+            finally:
+                self._release()
+
+        try:
+            await asyncio.wait_for(run(), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise LLMTimeout(f"Ollama generation exceeded {timeout:.1f}s")
+
+    # --- Public API, callable from any thread or event loop ---
+
+    def _deadline(self, timeout: Optional[float]) -> float:
+        return self.timeout if timeout is None else timeout
+
+    async def generate(self, prompt: str, timeout: Optional[float] = None, **options) -> str:
+        """
+        Generate a completion.
+
+        Args:
+            prompt (str): Prompt text
+            timeout (float, optional): Deadline in seconds; defaults to the client timeout
+            **options: Ollama model options (temperature, num_predict, ...)
+
+        Returns:
+            str: The stripped completion
+        """
+        return await asyncio.wrap_future(self._call(self._generate(prompt, self._deadline(timeout), options)))
+
+    def generate_sync(self, prompt: str, timeout: Optional[float] = None, **options) -> str:
+        """Blocking generate() for sync code; must not be called on the client's own loop."""
+        return self._call(self._generate(prompt, self._deadline(timeout), options)).result()
+
+    async def stream(self, prompt: str, timeout: Optional[float] = None, **options):
+        """Async iterator over completion chunks. Streams are never coalesced."""
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+        done = object()
+
+        def emit(chunk):
+            loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+
+        future = self._call(self._stream(prompt, self._deadline(timeout), options, emit))
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(chunks.put_nowait, done))
+        try:
+            while True:
+                chunk = await chunks.get()
+                if chunk is done:
+                    break
+                yield chunk
+            future.result()
+        finally:
+            # Stops the generation if the consumer went away early
+            future.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self._active,
+            "queued": self._queued,
+            "in_flight_prompts": len(self._inflight),
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "requests": self.requests,
+            "generations": self.generations,
+            "coalesced": self.coalesced,
+            "overloaded": self.overloaded,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+        }
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+        self._call(self._http.aclose()).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_ollama_client() -> OllamaClient:
+    """Return the process-wide OllamaClient."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OllamaClient()
+            logger.info(f"✅ Ollama client ready ({OLLAMA_HOST}, model={OLLAMA_MODEL}, "
+                        f"concurrency={OLLAMA_MAX_CONCURRENCY}, queue={OLLAMA_MAX_QUEUE}).")
+        return _client
+
+
+def close_ollama_client():
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
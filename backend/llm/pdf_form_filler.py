@@ -1,21 +1,147 @@
 import os
-from langchain_community.llms import Ollama
+import json
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
 
-# Get host from env var or default to localhost
-OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+from llm.ollama_client import get_ollama_client, LLMOverloaded, LLMTimeout
+from llm.prompt_cache import get_prompt_cache, prompt_key
+from llm.prompt_templates import FORM_FIELDS_PROMPT
 
-# Initialize Ollama with custom host and model
-llm = Ollama(
-    model="mistral",
-    base_url=OLLAMA_HOST
-)
+logger = logging.getLogger(__name__)
 
-def generate_with_mistral(prompt):
-    return llm.invoke(prompt).strip()
+# Fields sent in one prompt; bigger forms are split and the parts generated concurrently
+FORM_BATCH_FIELDS = int(os.getenv("FORM_BATCH_FIELDS", "40"))
+FIELD_TYPES = {'/Tx': 'text', '/Btn': 'checkbox', '/Ch': 'choice', '/Sig': 'signature'}
+
+# All generations go through the shared client (connection pool, concurrency
+# limit, deadlines, coalescing of identical prompts); see llm/ollama_client.py.
+# cache=True serves repeated prompts from the persistent prompt cache; use it
+# only where the completion should depend on the prompt alone.
+
+# Model options for cached prompts, so the stored completion is the one the model would give anyway
+DETERMINISTIC = {"temperature": 0}
+
+def generate_with_mistral(prompt, timeout=None, cache=False, **options):
+    client = get_ollama_client()
+    if not cache:
+        return client.generate_sync(prompt, timeout=timeout, **options)
+    key = prompt_key(prompt, client.model, options)
+    completion = get_prompt_cache().get(key)
+    if completion is None:
+        completion = client.generate_sync(prompt, timeout=timeout, **options)
+        get_prompt_cache().put(key, client.model, completion)
+    return completion
+
+async def agenerate_with_mistral(prompt, timeout=None, cache=False, **options):
+    client = get_ollama_client()
+    if not cache:
+        return await client.generate(prompt, timeout=timeout, **options)
+    key = prompt_key(prompt, client.model, options)
+    # SQLite blocks, so keep it off the event loop
+    cache_store = await asyncio.to_thread(get_prompt_cache)
+    completion = await asyncio.to_thread(cache_store.get, key)
+    if completion is None:
+        completion = await client.generate(prompt, timeout=timeout, **options)
+        await asyncio.to_thread(cache_store.put, key, client.model, completion)
+    return completion
+
+def astream_with_mistral(prompt, timeout=None):
+    """Async iterator over completion chunks as Ollama produces them."""
+    return get_ollama_client().stream(prompt, timeout=timeout)
 
 def generate_field_value(name, field_type):
     prompt = f"Generate realistic value for field '{name}' ({field_type})"
-    return generate_with_mistral(prompt)
+    return generate_with_mistral(prompt, cache=True, **DETERMINISTIC)
+
+def parse_form_values(response):
+    """Parse the JSON object in a completion into {field name: value}; non-scalar and empty values are dropped."""
+    start, end = response.find('{'), response.rfind('}')
+    if start < 0 or end < start:
+        return {}
+    try:
+        values = json.loads(response[start:end + 1])
+    except ValueError:
+        return {}
+    if not isinstance(values, dict):
+        return {}
+    return {
+        str(name): str(value) for name, value in values.items()
+        if isinstance(value, (str, int, float, bool)) and str(value).strip()
+    }
+
+def _generate_batch(fields):
+    """
+    Values for one batch of fields, or None if the batch failed.
+
+    LLMOverloaded and LLMTimeout are raised: Ollama is saturated, and retrying
+    field by field would only add load.
+    """
+    lines = "\n".join(
+        json.dumps([str(f['name']), FIELD_TYPES.get(str(f.get('type', '')), 'text'), str(f.get('value') or '')])
+        for f in fields
+    )
+    try:
+        response = generate_with_mistral(FORM_FIELDS_PROMPT.format(fields=lines), cache=True, **DETERMINISTIC)
+    except (LLMOverloaded, LLMTimeout):
+        raise
+    except Exception as e:
+        logger.error(f"❌ Batched form field generation failed: {e}")
+        return None
+    values = parse_form_values(response)
+    if not values:
+        logger.error(f"❌ Batched form field generation returned no usable values for {len(fields)} fields.")
+        return None
+    return values
+
+def _generate_field(field):
+    """generate_field_value for one field the batch missed; None if it fails."""
+    try:
+        return generate_field_value(field['name'], field.get('type', ''))
+    except Exception as e:
+        logger.error(f"❌ Form field generation failed for {field['name']}: {e}")
+        return None
+
+def generate_form_values(fields):
+    """
+    Generate values for all fields of a form with one prompt per FORM_BATCH_FIELDS
+    fields. Fields left out of an otherwise parsed batch are retried one by one
+    with generate_field_value; a batch that failed outright is not.
+
+    Args:
+        fields (list[dict]): Fields as returned by analyze_pdf_form (name, type, value)
+
+    Returns:
+        dict: {field name: value} for every field a value was generated for
+
+    Raises:
+        LLMOverloaded, LLMTimeout: Ollama could not take the batches
+    """
+    fields = [f for f in fields if f.get('name')]
+    if not fields:
+        return {}
+    batches = [fields[i:i + FORM_BATCH_FIELDS] for i in range(0, len(fields), FORM_BATCH_FIELDS)]
+    values = {}
+    missing = []
+    # Calls share the Ollama client's concurrency limit, so extra threads only queue
+    with ThreadPoolExecutor(max_workers=max(len(batches), get_ollama_client().max_concurrency)) as pool:
+        try:
+            results = list(pool.map(_generate_batch, batches))
+        except (LLMOverloaded, LLMTimeout):
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        for batch, batch_values in zip(batches, results):
+            if batch_values is None:
+                continue
+            values.update(batch_values)
+            missing.extend(f for f in batch if str(f['name']) not in batch_values)
+
+        if missing:
+            logger.info(f"✅ Batched {len(values)}/{len(fields)} form fields; retrying {len(missing)} one by one.")
+            for field, value in zip(missing, pool.map(_generate_field, missing)):
+                if value:
+                    values[str(field['name'])] = value
+    return values
 
 def fill_pdf_form(pdf_path, filled_path, field_data):
     from pypdf import PdfWriter, PdfReader
@@ -23,7 +149,9 @@ def fill_pdf_form(pdf_path, filled_path, field_data):
     reader = PdfReader(pdf_path)
     writer = PdfWriter()
     writer.append(reader)
-    writer.update_page_form_field_values(writer.pages[0], field_data)
+    # Fields may sit on any page
+    for page in writer.pages:
+        writer.update_page_form_field_values(page, field_data)
 
     with open(filled_path, "wb") as output_stream:
         writer.write(output_stream)
\ No newline at end of file
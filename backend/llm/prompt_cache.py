@@ -0,0 +1,197 @@
+# llm/prompt_cache.py
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+from embedder.embedding_cache import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+# Completions kept on disk; least recently used ones go first past either bound
+PROMPT_CACHE_MAX_ENTRIES = int(os.getenv("PROMPT_CACHE_MAX_ENTRIES", "50000"))
+PROMPT_CACHE_MAX_BYTES = int(os.getenv("PROMPT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Share of the bound freed per eviction pass, so eviction does not run on every put
+PROMPT_CACHE_EVICT_FRACTION = 0.1
+# Hits are recorded in memory and written to last_used in one transaction per
+# this many distinct keys or seconds, whichever comes first
+PROMPT_CACHE_TOUCH_BATCH = int(os.getenv("PROMPT_CACHE_TOUCH_BATCH", "256"))
+PROMPT_CACHE_TOUCH_SECS = float(os.getenv("PROMPT_CACHE_TOUCH_SECS", "30"))
+
+
+def prompt_key(prompt, model, options=None):
+    """Hash of model + options + prompt; options are canonicalized so their order does not matter."""
+    canonical = json.dumps(options or {}, sort_keys=True)
+    return hashlib.sha256(f"{model}\0{canonical}\0{prompt}".encode('utf-8')).digest()
+
+
+class PromptCache:
+    """
+    Persistent prompt → completion cache for prompts whose answer depends
+    only on their input (form field values, delegation decisions, ...).
+
+    Entries live in SQLite (``cache/llm_prompts.sqlite``) and survive
+    restarts. A hit is a single read: its ``last_used`` refresh is buffered
+    and written in batches (every ``touch_batch`` keys or ``touch_secs``
+    seconds, before eviction and on close). Once the store exceeds
+    ``max_entries`` or ``max_bytes`` the least recently used entries are
+    evicted until it is back under both bounds with some headroom.
+    """
+
+    def __init__(self, path=None, max_entries=PROMPT_CACHE_MAX_ENTRIES, max_bytes=PROMPT_CACHE_MAX_BYTES,
+                 touch_batch=PROMPT_CACHE_TOUCH_BATCH, touch_secs=PROMPT_CACHE_TOUCH_SECS):
+        if path is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            path = os.path.join(CACHE_DIR, "llm_prompts.sqlite")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.touch_batch = touch_batch
+        self.touch_secs = touch_secs
+        self._lock = threading.Lock()
+        # key -> [last_used, hits] not yet written
+        self._touched = {}
+        self._touched_at = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS completions (
+                key BLOB PRIMARY KEY,
+                model TEXT NOT NULL,
+                completion TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_completions_last_used ON completions (last_used)")
+        self.conn.commit()
+        self._entries, self._bytes = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions"
+        ).fetchone()
+
+    def get(self, key):
+        """Return the cached completion for a key, or None."""
+        with self._lock:
+            row = self.conn.execute("SELECT completion FROM completions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            touch = self._touched.setdefault(key, [0.0, 0])
+            touch[0] = time.time()
+            touch[1] += 1
+            if (len(self._touched) >= self.touch_batch
+                    or time.monotonic() - self._touched_at >= self.touch_secs):
+                self._write_touches()
+                self.conn.commit()
+            return row[0]
+
+    def _write_touches(self):
+        """Apply buffered hits to last_used/hits; the caller commits."""
+        if self._touched:
+            self.conn.executemany(
+                "UPDATE completions SET last_used = MAX(last_used, ?), hits = hits + ? WHERE key = ?",
+                [(last_used, hits, key) for key, (last_used, hits) in self._touched.items()]
+            )
+            self._touched.clear()
+        self._touched_at = time.monotonic()
+
+    def put(self, key, model, completion):
+        size = len(completion.encode('utf-8'))
+        now = time.time()
+        with self._lock:
+            old = self.conn.execute("SELECT size FROM completions WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO completions (key, model, completion, size, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, completion, size, now, now)
+            )
+            if old is None:
+                self._entries += 1
+            self._bytes += size - (old[0] if old else 0)
+            self._touched.pop(key, None)
+            if self._entries > self.max_entries or self._bytes > self.max_bytes:
+                # Recent hits must count before picking the least recently used
+                self._write_touches()
+                self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        target_entries = int(self.max_entries * (1 - PROMPT_CACHE_EVICT_FRACTION))
+        target_bytes = int(self.max_bytes * (1 - PROMPT_CACHE_EVICT_FRACTION))
+        rows = self.conn.execute("SELECT key, size FROM completions ORDER BY last_used").fetchall()
+        evicted = []
+        for key, size in rows:
+            if self._entries <= target_entries and self._bytes <= target_bytes:
+                break
+            evicted.append((key,))
+            self._entries -= 1
+            self._bytes -= size
+        self.conn.executemany("DELETE FROM completions WHERE key = ?", evicted)
+        self.evictions += len(evicted)
+        logger.info(f"✅ Prompt cache evicted {len(evicted)} completions.")
+
+    def flush(self):
+        """Write buffered hits now."""
+        with self._lock:
+            self._write_touches()
+            self.conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._touched.clear()
+            self.conn.execute("DELETE FROM completions")
+            self.conn.commit()
+            self._entries, self._bytes = 0, 0
+
+    def close(self):
+        with self._lock:
+            self._write_touches()
+            self.conn.commit()
+            self.conn.close()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": self._entries,
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "pending_touches": len(self._touched),
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_prompt_cache():
+    """Return the process-wide PromptCache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = PromptCache()
+        return _cache
+
+
+def close_prompt_cache():
+    """Write buffered hits and close the process-wide PromptCache."""
+    global _cache
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+            _cache = None
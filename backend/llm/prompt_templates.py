@@ -24,6 +24,17 @@ Input: "{input}"
 Output only the extracted values in JSON format.
 """
 
+FORM_FIELDS_PROMPT = """
+You are filling in a PDF form.
+Generate a realistic value for every field below. Keep a field's current value if it has one.
+
+Fields (name, type, current value):
+{fields}
+
+Output only a JSON object mapping each field name to its value, for example:
+{{"First Name": "Jane", "Date of Birth": "04/12/1985"}}
+"""
+
 QA_WITH_PROFILE_PROMPT = """
 You are answering based on knowledge and user profile.
 
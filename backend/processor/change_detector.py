@@ -1,29 +1,109 @@
 import hashlib
 import os
-import json
+import sqlite3
+import time
+import threading
+
+HISTORY_DIR = os.getenv("HISTORY_DIR", "history")
+# SQLite caps bound parameters per statement; look URLs up in chunks
+LOOKUP_CHUNK = 500
+
 
 def get_hash(text):
-    return hashlib.md5(text.encode('utf-8')).hexdigest()
+    # blake2b is faster than MD5 on 64-bit CPUs and 16 bytes is plenty for change detection
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class ChangeStore:
+    """
+    Content hashes of ingested pages, indexed by (domain, url).
+
+    Replaces the per-domain ``history/{domain}.json`` files, which were parsed
+    and rewritten in full for every URL checked. Lookups and upserts work on
+    whole batches, and SQLite's WAL mode lets concurrent crawls of the same
+    domain read and write safely.
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            os.makedirs(HISTORY_DIR, exist_ok=True)
+            path = os.path.join(HISTORY_DIR, "changes.sqlite")
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS page_hashes (
+                domain TEXT NOT NULL,
+                url TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (domain, url)
+            ) WITHOUT ROWID
+        """)
+        self.conn.commit()
+
+    def get_hashes(self, domain, urls):
+        """Return {url: content_hash} for the URLs that have a stored hash."""
+        urls = list(urls)
+        found = {}
+        with self._lock:
+            for i in range(0, len(urls), LOOKUP_CHUNK):
+                chunk = urls[i:i + LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(self.conn.execute(
+                    f"SELECT url, content_hash FROM page_hashes WHERE domain = ? AND url IN ({placeholders})",
+                    (domain, *chunk)
+                ).fetchall())
+        return found
+
+    def changed(self, domain, hashes):
+        """
+        Compare new content hashes against the stored ones.
+
+        Args:
+            domain (str): Domain the URLs belong to
+            hashes (dict): {url: new content hash}
+
+        Returns:
+            set: URLs that are new or whose hash differs
+        """
+        stored = self.get_hashes(domain, hashes.keys())
+        return {url for url, h in hashes.items() if stored.get(url) != h}
+
+    def upsert_hashes(self, domain, hashes):
+        """Store {url: content_hash} for a domain in a single transaction."""
+        if not hashes:
+            return
+        now = time.time()
+        with self._lock:
+            self.conn.executemany("""
+                INSERT INTO page_hashes (domain, url, content_hash, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (domain, url) DO UPDATE SET
+                    content_hash = excluded.content_hash,
+                    updated_at = excluded.updated_at
+            """, [(domain, url, h, now) for url, h in hashes.items()])
+            self.conn.commit()
+
+
+_store = None
+_store_lock = threading.Lock()
+
 
-def load_history(domain):
-    history_file = f"history/{domain}.json"
-    if not os.path.exists("history"):
-        os.makedirs("history")
-    if os.path.exists(history_file):
-        with open(history_file, 'r') as f:
-            return json.load(f)
-    return {}
+def get_change_store():
+    """Return the process-wide ChangeStore."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ChangeStore()
+        return _store
 
-def save_history(domain, data):
-    with open(f"history/{domain}.json", 'w') as f:
-        json.dump(data, f)
 
 def has_changed(url, current_text, domain):
-    history = load_history(domain)
-    old_hash = history.get(url)
+    store = get_change_store()
     new_hash = get_hash(current_text)
-    if old_hash == new_hash:
+    if url not in store.changed(domain, {url: new_hash}):
         return False
-    history[url] = new_hash
-    save_history(domain, history)
+    store.upsert_hashes(domain, {url: new_hash})
     return True
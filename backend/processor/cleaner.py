@@ -12,6 +12,22 @@ logger = logging.getLogger(__name__)
 # Initialize splitter
 splitter = RecursiveCharacterTextSplitter(chunk_size=512, chunk_overlap=50)
 
+
+def chunk_offsets(text: str, chunks):
+    """
+    Character offset of each chunk within the text it was split from.
+    Chunks overlap, so each search starts just after the previous chunk's start.
+    """
+    offsets = []
+    start = 0
+    for chunk in chunks:
+        pos = text.find(chunk, start)
+        if pos == -1:
+            pos = start
+        offsets.append(pos)
+        start = pos + 1
+    return offsets
+
 def extract_content(html: str, url: str = None, force_language: str = 'en'):
     """
     Extracts clean, LLM-ready content from HTML or raw text.
@@ -55,6 +71,7 @@ def extract_content(html: str, url: str = None, force_language: str = 'en'):
             'description': description,
             'text': full_text,
             'chunks': chunks,
+            'chunk_offsets': chunk_offsets(full_text, chunks),
             'url': url or result.get('url'),
             'pub_date': pub_date,
             'language': detected_lang,
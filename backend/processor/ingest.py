@@ -0,0 +1,272 @@
+# processor/ingest.py
+
+import os
+import queue
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from crawler.engine import get_crawl_engine
+from crawler.frontier import FrontierStore
+from crawler.revisit_scheduler import RevisitScheduler
+from processor.cleaner import extract_content
+from processor.change_detector import get_hash, get_change_store
+from processor.pdf_downloader import download_pdf
+from processor.pdf_analyzer import analyze_pdf_form
+from embedder.embedding_utils import embed_text, embed_batch
+from llm.pdf_form_filler import generate_form_values, fill_pdf_form
+from utils.database import get_chunk_hashes
+from utils.bulk_writer import BulkDocumentWriter
+from graph.ontology_builder import extract_internal_links
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Streaming defaults (override with env vars)
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "64"))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "4"))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "16"))
+# PDFs per page downloaded and filled at once; generation is bounded by the Ollama client
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "4"))
+
+
+def process_pdf(pdf_url):
+    """Download one linked PDF and fill its AcroForm if it has one. Returns the local path or None."""
+    pdf_path = download_pdf(pdf_url)
+    if not pdf_path:
+        return None
+    analysis = analyze_pdf_form(pdf_path)
+    if not analysis['is_form']:
+        return pdf_path
+    try:
+        field_data = generate_form_values(analysis['fields'])
+        filled_path = pdf_path.replace('.pdf', '_filled.pdf')
+        fill_pdf_form(pdf_path, filled_path, field_data)
+        return filled_path
+    except Exception as e:
+        logger.error(f"❌ Failed to fill form {pdf_url}: {e}")
+        return pdf_path
+
+
+def process_pdf_links(pdf_links):
+    """Download linked PDFs and fill any AcroForms found, several at a time. Returns local paths."""
+    if not pdf_links:
+        return []
+    with ThreadPoolExecutor(max_workers=min(len(pdf_links), PDF_WORKERS)) as pool:
+        return [path for path in pool.map(process_pdf, pdf_links) if path]
+
+
+def build_chunks(content):
+    """Chunk records (index, offset, hash, text) for a page, without embeddings."""
+    chunks = []
+    seen = set()
+    for index, (text, offset) in enumerate(zip(content['chunks'], content['chunk_offsets'])):
+        chunk_hash = get_hash(text)
+        if chunk_hash in seen:
+            continue
+        seen.add(chunk_hash)
+        chunks.append({'index': index, 'offset': offset, 'hash': chunk_hash, 'text': text, 'embedding': None})
+    return chunks
+
+
+def embed_new_chunks(chunks_by_url):
+    """
+    Embed, in one batched call, every chunk whose hash is not already stored
+    for its page. Chunks that are already stored keep embedding=None.
+    """
+    known_hashes = get_chunk_hashes(list(chunks_by_url))
+    new_chunks = []
+    for url, chunks in chunks_by_url.items():
+        new_chunks.extend(c for c in chunks if c['hash'] not in known_hashes[url])
+    for chunk, embedding in zip(new_chunks, embed_batch([c['text'] for c in new_chunks])):
+        chunk['embedding'] = embedding
+
+
+def store_document(doc, content, domain, chunks, writer):
+    """Process PDFs and queue one changed page with its chunks for writing. Returns its ontology record."""
+    pdf_paths = process_pdf_links(doc.get('pdf_links', []))
+    # The document vector is the mean of its chunk vectors (see save_to_postgres)
+    embedding = None if chunks else embed_text(content['text'])
+    writer.add(
+        title=content['title'],
+        description=content['description'],
+        text=content['text'],
+        url=doc['url'],
+        embedding=embedding,
+        pdf_paths=pdf_paths,
+        source_type='web',
+        metadata={'domain': domain},
+        chunks=chunks
+    )
+    return {
+        'url': doc['url'],
+        'title': content['title'],
+        'links': extract_internal_links(doc['html'], domain),
+    }
+
+
+def ingest_batch(docs, domain, writer, scheduler=None, on_queued=None, on_unchanged=None):
+    """
+    Extract, embed and queue a batch of crawled pages for writing.
+
+    Content hashes for the whole batch are checked against the ChangeStore in
+    one lookup. Changed pages are handed to ``writer`` (a BulkDocumentWriter);
+    their new hashes are not stored here but passed to ``on_queued`` just
+    before each page is queued, so the caller can record them once the
+    writer reports a successful flush, together with the page's ETag /
+    Last-Modified. A page whose processing or write fails keeps its old hash
+    and validators, so the next crawl fetches it in full and retries it.
+
+    Args:
+        docs (list): Crawled items with 'url', 'html' and optional 'pdf_links' / 'validators'
+        domain (str): Domain the pages were crawled from
+        writer (BulkDocumentWriter): Receives the changed pages
+        scheduler (RevisitScheduler, optional): Receives the changed/unchanged
+            observation for each page
+        on_queued (callable, optional): Called as ``on_queued(url, content_hash, doc)``
+        on_unchanged (callable, optional): Called as ``on_unchanged(doc)`` for pages
+            whose stored content is already current
+
+    Returns:
+        list: Lightweight records (url, title, internal links) of the pages
+        that were queued, for the ontology builder
+    """
+    extracted = {}
+    for doc in docs:
+        content = extract_content(doc['html'])
+        if content:
+            extracted[doc['url']] = (doc, content)
+    if not extracted:
+        return []
+
+    hashes = {url: get_hash(content['text']) for url, (_, content) in extracted.items()}
+    changed = get_change_store().changed(domain, hashes)
+    if scheduler is not None:
+        try:
+            scheduler.record_many({url: url in changed for url in hashes})
+        except Exception as e:
+            # Revisit statistics only tune scheduling; never drop the batch for them
+            logger.error(f"❌ Failed to record revisits for {domain}: {e}")
+
+    if on_unchanged:
+        for url in hashes.keys() - changed:
+            on_unchanged(extracted[url][0])
+
+    # Embed the new chunks of every changed page in the batch together
+    chunks_by_url = {url: build_chunks(extracted[url][1]) for url in changed}
+    embed_new_chunks(chunks_by_url)
+
+    records = []
+    for url in changed:
+        doc, content = extracted[url]
+        try:
+            if on_queued:
+                on_queued(url, hashes[url], doc)
+            records.append(store_document(doc, content, domain, chunks_by_url[url], writer))
+        except Exception as e:
+            logger.error(f"❌ Failed to ingest {url}: {e}")
+    return records
+
+
+def start_streaming_ingest(domain, depth, workers=INGEST_WORKERS, queue_size=INGEST_QUEUE_SIZE,
+                           batch_size=INGEST_BATCH_SIZE, on_complete=None):
+    """
+    Start a crawl job on the shared CrawlEngine and ingest pages while the
+    crawl is still running.
+
+    The spider pushes items into a bounded queue (see crawler.pipelines) and
+    ``workers`` threads consume it in small batches. Only a queue's worth of
+    raw HTML is ever held in memory; when the workers fall behind, the full
+    queue pushes back on the crawler.
+
+    Args:
+        domain (str): Domain to crawl
+        depth (int): Maximum link depth
+        workers (int): Number of ingestion worker threads
+        queue_size (int): Maximum number of pages buffered between crawl and ingest
+        batch_size (int): Maximum number of pages a worker ingests at once
+        on_complete (callable, optional): Called as ``on_complete(job, updated_docs)``
+            once the crawl has ended and the queue has been drained
+
+    Returns:
+        CrawlJob: The running job (see crawler.engine)
+    """
+    item_queue = queue.Queue(maxsize=queue_size)
+    job = get_crawl_engine().submit(domain, depth, item_queue=item_queue)
+    scheduler = RevisitScheduler(domain)
+    frontier = FrontierStore(domain)
+    updated_docs = []
+    updated_lock = threading.Lock()
+    # Content hash and HTTP validators of pages queued in the writer, stored once their batch commits
+    pending = {}
+
+    def save_validators(doc):
+        # Only for stored pages: a recrawl then gets a 304 and skips them
+        if doc.get('validators'):
+            try:
+                frontier.save_validators(doc['validators'])
+            except Exception as e:
+                logger.error(f"❌ Failed to save validators for {doc['url']}: {e}")
+
+    def on_flush(result):
+        with updated_lock:
+            flushed = {url: pending.pop(url) for url in result['urls'] if url in pending}
+        if result['ok']:
+            get_change_store().upsert_hashes(domain, {url: content_hash for url, (content_hash, _) in flushed.items()})
+            for _, doc in flushed.values():
+                save_validators(doc)
+            job.record_ingested(len(flushed))
+
+    def on_queued(url, content_hash, doc):
+        with updated_lock:
+            pending[url] = (content_hash, {'url': url, 'validators': doc.get('validators')})
+
+    writer = BulkDocumentWriter(on_flush=on_flush)
+
+    def work():
+        while not job.stop_event.is_set():
+            try:
+                batch = [item_queue.get(timeout=0.5)]
+            except queue.Empty:
+                if job.done.is_set():
+                    break
+                continue
+            # Take whatever else is already waiting, up to one batch
+            while len(batch) < batch_size:
+                try:
+                    batch.append(item_queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                records = ingest_batch(batch, domain, writer, scheduler=scheduler, on_queued=on_queued,
+                                       on_unchanged=save_validators)
+                with updated_lock:
+                    updated_docs.extend(records)
+            except Exception as e:
+                logger.error(f"❌ Failed to ingest batch from {domain}: {e}")
+            finally:
+                for _ in batch:
+                    item_queue.task_done()
+                batch = None
+
+    def supervise():
+        worker_threads = [
+            threading.Thread(target=work, name=f"ingest-{job.id}-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for t in worker_threads:
+            t.start()
+        for t in worker_threads:
+            t.join()
+        writer.close()
+        scheduler.close()
+        frontier.close()
+        if on_complete:
+            try:
+                on_complete(job, updated_docs)
+            except Exception as e:
+                logger.error(f"❌ Post-crawl step failed for {domain}: {e}")
+
+    threading.Thread(target=supervise, name=f"ingest-{job.id}", daemon=True).start()
+    return job
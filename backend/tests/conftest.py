@@ -0,0 +1,36 @@
+# tests/conftest.py
+
+import os
+import sys
+import time
+
+import pytest
+
+# Tests import backend modules the way the app does (llm.*, utils.*, ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeEncoder:
+    """Stands in for the embedding model: a text's vector is [len(text), 1.0], after ``delay`` seconds."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.batches = []
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        time.sleep(self.delay)
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+@pytest.fixture
+def encoder(monkeypatch):
+    """Routes embed_text/aembed_text through a real MicroBatcher over FakeEncoder and an in-memory cache."""
+    from embedder import embedding_utils
+    from embedder.embedding_cache import EmbeddingCache
+
+    encoder = FakeEncoder()
+    monkeypatch.setattr(embedding_utils, "_batcher", embedding_utils.MicroBatcher(encode=encoder, max_wait_ms=20))
+    monkeypatch.setattr(embedding_utils, "get_embedding_cache", lambda: EmbeddingCache(persist=False))
+    monkeypatch.setattr(embedding_utils, "EMBED_TIMEOUT_SECS", 2.0)
+    return encoder
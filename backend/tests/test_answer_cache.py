@@ -0,0 +1,77 @@
+# tests/test_answer_cache.py
+
+from utils.answer_cache import AnswerCache
+from utils.corpus_version import bump_documents
+
+RESULT = {"initial_answer": "Apply at city hall.", "sources": [{"title": "Permits", "url": "https://city.example/permits"}]}
+SOURCES = ["https://city.example/permits"]
+
+
+def test_similar_question_hits_and_dissimilar_misses():
+    cache = AnswerCache(threshold=0.9)
+    cache.put("How do I get a permit?", [1.0, 0.0], RESULT, SOURCES)
+
+    hit = cache.lookup([0.95, 0.1])
+    assert hit["result"] == RESULT
+    assert hit["question"] == "How do I get a permit?"
+    assert hit["similarity"] >= 0.9
+    # cos = 0.707
+    assert cache.lookup([1.0, 1.0]) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_hit_returns_a_copy():
+    cache = AnswerCache()
+    cache.put("q", [1.0, 0.0], RESULT, SOURCES)
+    cache.lookup([1.0, 0.0])["result"]["initial_answer"] = "changed"
+
+    assert cache.lookup([1.0, 0.0])["result"]["initial_answer"] == "Apply at city hall."
+
+
+def test_answers_are_only_reused_within_their_scope():
+    cache = AnswerCache()
+    cache.put("q", [1.0, 0.0], RESULT, SOURCES, scope=("city.example", None))
+
+    assert cache.lookup([1.0, 0.0], scope=("other.example", None)) is None
+    assert cache.lookup([1.0, 0.0]) is None
+    assert cache.lookup([1.0, 0.0], scope=("city.example", None)) is not None
+
+
+def test_write_to_a_source_url_invalidates_the_answer():
+    cache = AnswerCache()
+    cache.put("q", [1.0, 0.0], RESULT, SOURCES)
+    cache.put("other", [0.0, 1.0], RESULT, ["https://city.example/parking"])
+
+    bump_documents([{"url": "https://city.example/permits"}])
+
+    assert cache.lookup([1.0, 0.0]) is None
+    assert cache.lookup([0.0, 1.0]) is not None
+    assert cache.stats()["invalidated"] == 1
+
+
+def test_expired_answers_are_dropped():
+    cache = AnswerCache(ttl=0)
+    cache.put("q", [1.0, 0.0], RESULT, SOURCES)
+
+    assert cache.lookup([1.0, 0.0]) is None
+    assert cache.stats()["expired"] == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_answers_without_sources_are_not_cached():
+    cache = AnswerCache()
+    cache.put("q", [1.0, 0.0], RESULT, [None])
+
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_answer_is_evicted():
+    cache = AnswerCache(max_size=2)
+    cache.put("a", [1.0, 0.0, 0.0], RESULT, SOURCES)
+    cache.put("b", [0.0, 1.0, 0.0], RESULT, SOURCES)
+    cache.lookup([1.0, 0.0, 0.0])
+    cache.put("c", [0.0, 0.0, 1.0], RESULT, SOURCES)
+
+    assert cache.lookup([1.0, 0.0, 0.0])["question"] == "a"
+    assert cache.lookup([0.0, 1.0, 0.0]) is None
+    assert cache.stats()["evictions"] == 1
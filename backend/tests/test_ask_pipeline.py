@@ -0,0 +1,142 @@
+# tests/test_ask_pipeline.py
+
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+import app as api
+from llm import ask_pipeline
+from utils.answer_cache import AnswerCache
+
+DOCS = [{"title": "Permits", "snippet": "Apply for a permit at city hall.", "url": "https://city.example/permits"}]
+
+
+@pytest.fixture
+def backend(monkeypatch, encoder):
+    """
+    Replaces retrieval, the LLM and profile storage with in-process fakes.
+    Embedding runs through the real MicroBatcher (see the ``encoder`` fixture).
+    """
+    fake = SimpleNamespace(search_delay=0.0, profile_delay=0.0, profile_cancelled=False, prompts=[])
+
+    async def hybrid_search(query, **search):
+        await asyncio.sleep(fake.search_delay)
+        return list(DOCS)
+
+    async def generate(prompt, timeout=None, **options):
+        fake.prompts.append(prompt)
+        if prompt.lstrip().startswith("You are a quality assurance assistant"):
+            return "Yes\n\nApply at city hall.\nBring ID."
+        if prompt.lstrip().startswith("You are a profile assistant"):
+            return "{}"
+        return "Apply at city hall."
+
+    async def get_user_profile(user_id):
+        try:
+            await asyncio.sleep(fake.profile_delay)
+        except asyncio.CancelledError:
+            fake.profile_cancelled = True
+            raise
+        return {"city": "Springfield"}
+
+    async def update_user_profile(user_id, update):
+        return None
+
+    monkeypatch.setattr(ask_pipeline, "hybrid_search", hybrid_search)
+    monkeypatch.setattr(ask_pipeline, "agenerate_with_mistral", generate)
+    monkeypatch.setattr(ask_pipeline, "get_user_profile", get_user_profile)
+    monkeypatch.setattr(ask_pipeline, "update_user_profile", update_user_profile)
+    cache = AnswerCache()
+    monkeypatch.setattr(ask_pipeline, "get_answer_cache", lambda: cache)
+    return fake
+
+
+def ask(*requests):
+    """POST each body to /rag/ask in turn on one event loop; returns the responses."""
+    async def run():
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [await client.post("/rag/ask", json=body) for body in requests]
+    return asyncio.run(run())
+
+
+def test_answer_reports_stage_timings(backend):
+    [response] = ask({"question": "How do I get a permit?", "validation": "skip", "use_cache": False})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["improved_answer"] == "Apply at city hall."
+    assert body["sources"] == [{"title": "Permits", "url": "https://city.example/permits"}]
+    assert {"embed_question", "retrieve", "answer", "total"} <= body["timings_ms"].keys()
+
+
+def test_required_stage_timeout_returns_504(backend):
+    backend.search_delay = 1.0
+    [response] = ask({"question": "How do I get a permit?", "budget_ms": 100, "use_cache": False})
+
+    assert response.status_code == 504
+    assert "retrieve" in response.json()["detail"]
+
+
+def test_optional_stage_drop_is_recorded_and_cancelled(backend):
+    backend.profile_delay = 5.0
+    [response] = ask({"question": "How do I get a permit?", "user_id": "u1", "validation": "skip",
+                      "budget_ms": 300, "use_cache": False})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["timings_ms"]["profile_load"] == "timeout"
+    assert body["profile_used"] == {}
+    assert backend.profile_cancelled
+
+
+def test_cancelled_embedding_does_not_poison_later_requests(backend, encoder):
+    encoder.delay = 0.3
+    slow, = ask({"question": "First question", "budget_ms": 50, "use_cache": False})
+    assert slow.status_code == 504
+
+    encoder.delay = 0.0
+    fast, = ask({"question": "Second question", "validation": "skip", "use_cache": False})
+    assert fast.status_code == 200
+    assert fast.json()["improved_answer"] == "Apply at city hall."
+
+
+def test_deferred_validation_is_retrievable(backend):
+    async def run():
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            answer = await client.post("/rag/ask", json={"question": "How do I get a permit?",
+                                                         "validation": "deferred", "use_cache": False})
+            validation_id = answer.json()["validation_id"]
+            for _ in range(50):
+                result = await client.get(f"/rag/validation/{validation_id}")
+                if result.json()["status"] != "pending":
+                    return result
+                await asyncio.sleep(0.01)
+            return result
+
+    result = asyncio.run(run())
+    assert result.status_code == 200
+    assert result.json()["status"] == "done"
+    assert result.json()["is_accurate"] is True
+    assert result.json()["next_steps"] == "Bring ID."
+
+
+def test_unknown_validation_id_is_404(backend):
+    async def run():
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/rag/validation/missing")
+
+    assert asyncio.run(run()).status_code == 404
+
+
+def test_repeated_question_is_served_from_the_answer_cache(backend):
+    first, second = ask({"question": "How do I get a permit?", "validation": "skip"},
+                        {"question": "How do I get a permit?", "validation": "skip"})
+
+    assert first.json()["cache"] == {"hit": False}
+    assert second.json()["cache"]["hit"] is True
+    assert len([p for p in backend.prompts if "Apply for a permit" in p]) == 1
@@ -0,0 +1,157 @@
+# tests/test_bulk_writer.py
+
+import time
+from contextlib import contextmanager
+
+import pytest
+
+from utils import bulk_writer
+from utils.bulk_writer import BulkDocumentWriter
+from utils.corpus_version import get_corpus_version
+
+
+class FakeConnection:
+    def __init__(self):
+        self.commits = 0
+
+    def cursor(self):
+        return self
+
+    def commit(self):
+        self.commits += 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class RecordingWriter(BulkDocumentWriter):
+    """BulkDocumentWriter whose SQL steps record the rows they would write (no Postgres here)."""
+
+    def __init__(self, **kwargs):
+        self.written = []
+        self.chunked = []
+        self.fail_with = None
+        super().__init__(**kwargs)
+
+    def _write_documents(self, cur, rows):
+        if self.fail_with:
+            raise self.fail_with
+        self.written.append([r["url"] for r in rows])
+        return {r["url"]: i for i, r in enumerate(rows) if r["url"]}
+
+    def _write_chunks(self, cur, rows, doc_ids):
+        self.chunked.extend(r["url"] for r in rows if r["chunks"] is not None)
+
+
+@pytest.fixture
+def connection(monkeypatch):
+    conn = FakeConnection()
+
+    @contextmanager
+    def db_connection():
+        yield conn
+
+    monkeypatch.setattr(bulk_writer, "db_connection", db_connection)
+    return conn
+
+
+@pytest.fixture
+def make_writer(connection):
+    writers = []
+
+    def make(**kwargs):
+        results = []
+        writer = RecordingWriter(on_flush=results.append, **kwargs)
+        writer.results = results
+        writers.append(writer)
+        return writer
+
+    yield make
+    for writer in writers:
+        writer.close()
+
+
+def _doc(writer, url, text="text", chunks=None):
+    writer.add(title="t", description="d", text=text, url=url, embedding=[0.1, 0.2], chunks=chunks)
+
+
+def test_full_batch_flushes_in_one_transaction(make_writer, connection):
+    writer = make_writer(batch_size=3, flush_interval=60)
+    for i in range(3):
+        _doc(writer, f"https://example.com/{i}")
+
+    assert writer.written == [[f"https://example.com/{i}" for i in range(3)]]
+    assert connection.commits == 1
+    assert writer.results[0]["ok"] and writer.results[0]["rows"] == 3
+    assert writer.stats()["buffered"] == 0
+
+
+def test_partial_batch_waits_for_the_flush_interval(make_writer):
+    writer = make_writer(batch_size=100, flush_interval=0.2)
+    _doc(writer, "https://example.com/a")
+    assert writer.written == []
+
+    deadline = time.monotonic() + 3
+    while not writer.written and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert writer.written == [["https://example.com/a"]]
+
+
+def test_duplicate_urls_keep_the_last_copy(make_writer):
+    writer = make_writer(batch_size=100, flush_interval=60)
+    _doc(writer, "https://example.com/a", text="old")
+    _doc(writer, "https://example.com/b")
+    _doc(writer, "https://example.com/a", text="new")
+    # Rows without a URL are never merged
+    _doc(writer, None)
+    _doc(writer, None)
+
+    result = writer.flush()
+    assert result["rows"] == 4
+    assert sorted(result["urls"]) == ["https://example.com/a", "https://example.com/b"]
+    assert writer.written[0].count("https://example.com/a") == 1
+
+
+def test_only_rows_with_chunks_sync_chunks(make_writer):
+    writer = make_writer(batch_size=100, flush_interval=60)
+    _doc(writer, "https://example.com/a", chunks=[{"index": 0, "offset": 0, "hash": "h", "text": "t"}])
+    _doc(writer, "https://example.com/b")
+    writer.flush()
+
+    assert writer.chunked == ["https://example.com/a"]
+
+
+def test_successful_flush_bumps_the_corpus_version(make_writer):
+    writer = make_writer(batch_size=100, flush_interval=60)
+    before = get_corpus_version().token("example.com")
+    _doc(writer, "https://example.com/a")
+    writer.flush()
+
+    assert get_corpus_version().token("example.com") != before
+
+
+def test_failed_flush_is_reported_and_not_counted(make_writer, connection):
+    writer = make_writer(batch_size=100, flush_interval=60)
+    writer.fail_with = RuntimeError("connection lost")
+    before = get_corpus_version().token("example.com")
+    _doc(writer, "https://example.com/a")
+
+    result = writer.flush()
+    assert not result["ok"] and result["error"] == "connection lost"
+    assert writer.results == [result]
+    assert connection.commits == 0
+    assert get_corpus_version().token("example.com") == before
+    assert writer.stats()["failed_batches"] == 1
+    assert writer.stats()["rows_written"] == 0
+
+
+def test_close_writes_what_is_buffered(connection):
+    writer = RecordingWriter(batch_size=100, flush_interval=60)
+    _doc(writer, "https://example.com/a")
+    writer.close()
+
+    assert writer.written == [["https://example.com/a"]]
+    assert writer.flush() is None
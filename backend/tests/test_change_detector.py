@@ -0,0 +1,57 @@
+# tests/test_change_detector.py
+
+from processor import change_detector
+from processor.change_detector import ChangeStore, get_hash, LOOKUP_CHUNK
+
+
+def test_new_and_modified_pages_are_changed(tmp_path):
+    store = ChangeStore(str(tmp_path / "changes.sqlite"))
+    store.upsert_hashes("example.com", {"https://example.com/a": get_hash("a"), "https://example.com/b": get_hash("b")})
+
+    changed = store.changed("example.com", {
+        "https://example.com/a": get_hash("a"),
+        "https://example.com/b": get_hash("b, edited"),
+        "https://example.com/c": get_hash("c"),
+    })
+
+    assert changed == {"https://example.com/b", "https://example.com/c"}
+
+
+def test_hashes_are_kept_per_domain(tmp_path):
+    store = ChangeStore(str(tmp_path / "changes.sqlite"))
+    store.upsert_hashes("example.com", {"https://shared/page": get_hash("x")})
+
+    assert store.changed("example.com", {"https://shared/page": get_hash("x")}) == set()
+    assert store.changed("other.org", {"https://shared/page": get_hash("x")}) == {"https://shared/page"}
+
+
+def test_upsert_replaces_the_stored_hash(tmp_path):
+    store = ChangeStore(str(tmp_path / "changes.sqlite"))
+    store.upsert_hashes("example.com", {"https://example.com/a": get_hash("old")})
+    store.upsert_hashes("example.com", {"https://example.com/a": get_hash("new")})
+
+    assert store.get_hashes("example.com", ["https://example.com/a"]) == {"https://example.com/a": get_hash("new")}
+
+
+def test_lookups_span_several_chunks(tmp_path):
+    store = ChangeStore(str(tmp_path / "changes.sqlite"))
+    hashes = {f"https://example.com/{i}": get_hash(str(i)) for i in range(LOOKUP_CHUNK * 2 + 7)}
+    store.upsert_hashes("example.com", hashes)
+
+    assert store.get_hashes("example.com", hashes) == hashes
+    assert store.changed("example.com", hashes) == set()
+
+
+def test_hashes_survive_reopening(tmp_path):
+    path = str(tmp_path / "changes.sqlite")
+    ChangeStore(path).upsert_hashes("example.com", {"https://example.com/a": get_hash("a")})
+
+    assert ChangeStore(path).changed("example.com", {"https://example.com/a": get_hash("a")}) == set()
+
+
+def test_has_changed_records_the_new_hash(tmp_path, monkeypatch):
+    monkeypatch.setattr(change_detector, "_store", ChangeStore(str(tmp_path / "changes.sqlite")))
+
+    assert change_detector.has_changed("https://example.com/a", "first", "example.com")
+    assert not change_detector.has_changed("https://example.com/a", "first", "example.com")
+    assert change_detector.has_changed("https://example.com/a", "second", "example.com")
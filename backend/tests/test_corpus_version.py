@@ -0,0 +1,55 @@
+# tests/test_corpus_version.py
+
+from utils.corpus_version import CorpusVersion, document_domain
+
+
+def test_document_domain_keeps_the_host_as_written():
+    # Matches substring(url from '^[a-zA-Z]+://([^/:?#]+)') in the documents.domain column
+    assert document_domain("https://City.Example.gov/Permits?x=1") == "City.Example.gov"
+    assert document_domain("http://docs.example.com:8080/a") == "docs.example.com"
+    assert document_domain("https://example.com#top") == "example.com"
+    assert document_domain("mailto:someone@example.com") is None
+    assert document_domain(None) is None
+
+
+def test_metadata_domain_wins_like_coalesce():
+    assert document_domain("https://cdn.example.com/f.pdf", {"domain": "example.com"}) == "example.com"
+    # metadata->>'domain' is only NULL when the key is missing or JSON null
+    assert document_domain("https://cdn.example.com/f.pdf", {"domain": ""}) == ""
+    assert document_domain("https://cdn.example.com/f.pdf", {"domain": None}) == "cdn.example.com"
+
+
+def test_write_changes_the_token_of_its_scope_only():
+    version = CorpusVersion()
+    scoped = version.token("City.Example.gov")
+    other = version.token("other.example.org")
+
+    version.bump(domains=[document_domain("https://City.Example.gov/permits")])
+
+    assert version.token("City.Example.gov") != scoped
+    assert version.token("other.example.org") == other
+
+
+def test_write_without_domain_invalidates_every_scope():
+    version = CorpusVersion()
+    scoped = version.token("example.com")
+    unscoped = version.token()
+
+    version.bump(domains=[None])
+
+    assert version.token("example.com") != scoped
+    assert version.token() != unscoped
+
+
+def test_listeners_receive_urls_and_survive_failures():
+    version = CorpusVersion()
+    seen = []
+
+    def broken(domains, urls):
+        raise RuntimeError("listener bug")
+
+    version.add_listener(broken)
+    version.add_listener(lambda domains, urls: seen.append((domains, urls)))
+    version.bump(domains=["example.com"], urls=["https://example.com/a", None])
+
+    assert seen == [({"example.com"}, {"https://example.com/a"})]
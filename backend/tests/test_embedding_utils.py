@@ -0,0 +1,67 @@
+# tests/test_embedding_utils.py
+
+import asyncio
+
+import pytest
+
+from embedder import embedding_utils
+from embedder.embedding_cache import EmbeddingCache
+
+
+def test_concurrent_requests_share_one_encode(encoder):
+    async def ask():
+        return await asyncio.gather(*(embedding_utils.aembed_text("x" * n) for n in (1, 2, 3)))
+
+    assert asyncio.run(ask()) == [[1.0, 1.0], [2.0, 1.0], [3.0, 1.0]]
+    assert len(encoder.batches) == 1
+
+
+def test_request_cancelled_before_encoding_is_dropped(encoder):
+    async def cancel_while_batching():
+        task = asyncio.ensure_future(embedding_utils.aembed_text("dropped"))
+        await asyncio.sleep(0.005)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_while_batching())
+    assert embedding_utils.embed_text("later") == [5.0, 1.0]
+    assert ["dropped"] not in encoder.batches
+
+
+def test_request_cancelled_during_encoding_does_not_kill_the_batcher(encoder):
+    encoder.delay = 0.1
+
+    async def cancel_while_encoding():
+        task = asyncio.ensure_future(embedding_utils.aembed_text("abandoned"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_while_encoding())
+    encoder.delay = 0.0
+    assert embedding_utils.embed_text("later") == [5.0, 1.0]
+    assert embedding_utils._batcher._thread.is_alive()
+
+
+def test_failed_encode_reaches_the_caller(encoder):
+    def broken(texts):
+        raise RuntimeError("model unavailable")
+
+    embedding_utils._batcher.encode = broken
+    with pytest.raises(RuntimeError):
+        embedding_utils.embed_text("fails")
+
+    embedding_utils._batcher.encode = encoder
+    assert embedding_utils.embed_text("works") == [5.0, 1.0]
+
+
+def test_async_hits_are_served_from_the_disk_tier(encoder, tmp_path, monkeypatch):
+    path = str(tmp_path / "embeddings.sqlite")
+    monkeypatch.setattr(embedding_utils, "get_embedding_cache", lambda: EmbeddingCache(path=path))
+
+    assert asyncio.run(embedding_utils.aembed_text("stored")) == [6.0, 1.0]
+    # A fresh cache each call, so the second lookup can only come from SQLite
+    assert asyncio.run(embedding_utils.aembed_text("stored")) == [6.0, 1.0]
+    assert encoder.batches == [["stored"]]
@@ -0,0 +1,122 @@
+# tests/test_frontier.py
+
+import time
+
+from crawler.frontier import FrontierStore, url_key, QUEUED, FETCHED, FAILED
+
+DAY = 24 * 3600
+
+
+def _age(store, url, seconds):
+    """Pretend the URL was last fetched ``seconds`` ago."""
+    with store._lock:
+        store.conn.execute("UPDATE urls SET fetched_at = ? WHERE url_key = ?", (time.time() - seconds, url_key(url)))
+
+
+def _state(store, url):
+    with store._lock:
+        return store.conn.execute("SELECT state, depth FROM urls WHERE url_key = ?", (url_key(url),)).fetchone()
+
+
+def test_seeded_urls_are_requested_once(tmp_path):
+    store = FrontierStore("example.com", path=str(tmp_path / "f.sqlite"))
+
+    assert store.add("https://example.com/", 0)
+    assert not store.add("https://example.com/", 0)
+    assert store.add("https://example.com/about", 1)
+    assert store.stats() == {QUEUED: 2}
+    store.close()
+
+
+def test_rediscovery_keeps_the_shallowest_depth(tmp_path):
+    store = FrontierStore("example.com", path=str(tmp_path / "f.sqlite"))
+    store.add("https://example.com/deep", 3)
+    store.mark_failed("https://example.com/deep")
+
+    assert store.add("https://example.com/deep", 1)
+    assert _state(store, "https://example.com/deep") == (QUEUED, 1)
+    store.close()
+
+
+def test_fetched_urls_are_skipped_until_stale(tmp_path):
+    store = FrontierStore("example.com", path=str(tmp_path / "f.sqlite"), freshness_hours=24)
+    url = "https://example.com/page"
+    store.add(url, 0)
+    store.mark_fetched(url)
+
+    assert not store.add(url, 0)
+    _age(store, url, 2 * DAY)
+    # The revisit scheduler decides for known URLs when it is in charge
+    assert not store.add(url, 0, requeue_stale=False)
+    assert store.add(url, 0)
+    store.close()
+
+
+def test_requeue_stale_only_touches_urls_outside_the_window(tmp_path):
+    store = FrontierStore("example.com", path=str(tmp_path / "f.sqlite"), freshness_hours=24)
+    for url in ("https://example.com/fresh", "https://example.com/stale", "https://example.com/failed"):
+        store.add(url, 0)
+    store.mark_fetched("https://example.com/fresh")
+    store.mark_fetched("https://example.com/stale")
+    store.mark_failed("https://example.com/failed")
+    _age(store, "https://example.com/stale", 2 * DAY)
+    _age(store, "https://example.com/failed", 2 * DAY)
+
+    assert store.requeue_stale() == 2
+    assert _state(store, "https://example.com/fresh")[0] == FETCHED
+    assert _state(store, "https://example.com/failed")[0] == QUEUED
+    store.close()
+
+
+def test_interrupted_crawl_resumes_from_queued_urls(tmp_path):
+    path = str(tmp_path / "f.sqlite")
+    store = FrontierStore("example.com", path=path)
+    for i in range(5):
+        store.add(f"https://example.com/{i}", 1)
+    store.mark_fetched("https://example.com/0")
+    store.mark_failed("https://example.com/1")
+    store.close()
+
+    resumed = FrontierStore("example.com", path=path)
+    assert list(resumed.pending(batch_size=2)) == [(f"https://example.com/{i}", 1) for i in (2, 3, 4)]
+    assert resumed.stats() == {QUEUED: 3, FETCHED: 1, FAILED: 1}
+    resumed.close()
+
+
+def test_pending_skips_urls_added_during_iteration(tmp_path):
+    store = FrontierStore("example.com", path=str(tmp_path / "f.sqlite"))
+    store.add("https://example.com/a", 0)
+    seen = []
+    for url, depth in store.pending():
+        seen.append(url)
+        store.add("https://example.com/found-while-resuming", depth + 1)
+
+    assert seen == ["https://example.com/a"]
+    store.close()
+
+
+def test_validators_are_kept_when_a_fetch_has_none(tmp_path):
+    store = FrontierStore("example.com", path=str(tmp_path / "f.sqlite"))
+    url = "https://example.com/page"
+    store.add(url, 0)
+    store.save_validators({"urls": [url], "etag": '"v1"', "last_modified": "Mon, 01 Jan 2024 00:00:00 GMT"})
+    # A 304 carries no new validators
+    store.mark_fetched(url)
+
+    assert store.get_validators(url) == ('"v1"', "Mon, 01 Jan 2024 00:00:00 GMT")
+    assert store.get_validators("https://example.com/unknown") == (None, None)
+    store.close()
+
+
+def test_stores_of_one_domain_share_a_connection(tmp_path):
+    path = str(tmp_path / "f.sqlite")
+    first = FrontierStore("example.com", path=path)
+    second = FrontierStore("example.com", path=path)
+    assert first.db is second.db
+
+    first.add("https://example.com/a", 0)
+    first.close()
+    # Still open for the other holder
+    assert second.add("https://example.com/b", 0)
+    assert second.stats() == {QUEUED: 2}
+    second.close()
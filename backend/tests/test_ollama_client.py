@@ -0,0 +1,122 @@
+# tests/test_ollama_client.py
+
+import json
+import asyncio
+
+import httpx
+import pytest
+
+from llm.ollama_client import OllamaClient, LLMOverloaded, LLMTimeout
+
+
+class FakeOllama:
+    """Stands in for Ollama's /api/generate: answers with the prompt after ``delay`` seconds."""
+
+    def __init__(self, delay: float = 0.2):
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        payload = json.loads(request.content)
+        await asyncio.sleep(self.delay)
+        return httpx.Response(200, json={"response": f" echo: {payload['prompt']} ", "done": True})
+
+
+@pytest.fixture
+def fake():
+    return FakeOllama()
+
+
+@pytest.fixture
+def make_client(fake):
+    clients = []
+
+    def make(**kwargs):
+        client = OllamaClient(base_url="http://ollama.test", transport=httpx.MockTransport(fake), **kwargs)
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        client.close()
+
+
+def test_generate_returns_stripped_completion(make_client, fake):
+    client = make_client()
+    assert client.generate_sync("hello") == "echo: hello"
+    assert fake.calls == 1
+    assert client.stats()["generations"] == 1
+
+
+def test_identical_prompts_share_one_generation(make_client, fake):
+    client = make_client()
+
+    async def ask():
+        return await asyncio.gather(*(client.generate("same prompt") for _ in range(3)))
+
+    assert asyncio.run(ask()) == ["echo: same prompt"] * 3
+    stats = client.stats()
+    assert fake.calls == 1
+    assert stats["generations"] == 1
+    assert stats["coalesced"] == 2
+    assert stats["in_flight_prompts"] == 0
+
+
+def test_full_queue_raises_overloaded(make_client, fake):
+    client = make_client(max_concurrency=1, max_queue=0)
+
+    async def ask():
+        return await asyncio.gather(client.generate("first"), client.generate("second"),
+                                    return_exceptions=True)
+
+    results = asyncio.run(ask())
+    assert sum(isinstance(r, LLMOverloaded) for r in results) == 1
+    assert "echo: first" in results or "echo: second" in results
+    assert client.stats()["overloaded"] == 1
+    assert fake.calls == 1
+
+
+def test_queued_call_waits_for_a_slot(make_client, fake):
+    client = make_client(max_concurrency=1, max_queue=1)
+
+    async def ask():
+        return await asyncio.gather(client.generate("first"), client.generate("second"))
+
+    assert asyncio.run(ask()) == ["echo: first", "echo: second"]
+    assert client.stats()["overloaded"] == 0
+
+
+def test_deadline_raises_timeout_and_frees_the_slot(make_client, fake):
+    fake.delay = 1.0
+    client = make_client(max_concurrency=1)
+
+    with pytest.raises(LLMTimeout):
+        client.generate_sync("slow", timeout=0.05)
+
+    fake.delay = 0.0
+    # The abandoned generation was cancelled, so the only slot is free again
+    assert client.generate_sync("fast", timeout=1.0) == "echo: fast"
+    stats = client.stats()
+    assert stats["timeouts"] == 1
+    assert stats["active"] == 0
+    assert stats["in_flight_prompts"] == 0
+
+
+def test_caller_after_cancelled_flight_starts_a_new_generation(make_client, fake):
+    client = make_client()
+
+    async def race():
+        first = asyncio.ensure_future(client._generate("retry me", 5.0, {}))
+        await asyncio.sleep(0.05)
+        # The only waiter leaves, which cancels the shared generation
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        # Arrives before the cancelled flight's done-callback has run
+        return await client._generate("retry me", 5.0, {})
+
+    assert client._call(race()).result() == "echo: retry me"
+    assert fake.calls == 2
+    assert client.stats()["coalesced"] == 0
+    assert client.stats()["in_flight_prompts"] == 0
@@ -0,0 +1,71 @@
+# tests/test_pdf_form_filler.py
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from llm import pdf_form_filler
+from llm.ollama_client import LLMOverloaded
+
+
+FIELDS = [{'name': 'first_name', 'type': '/Tx'}, {'name': 'email', 'type': '/Tx'}, {'name': 'agree', 'type': '/Btn'}]
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    """Replaces the model with ``llm.batch`` (for batched prompts) and ``llm.field`` (per-field prompts)."""
+    fake = SimpleNamespace(batch=None, field=None, field_calls=[])
+
+    def generate(prompt, **kwargs):
+        if prompt.startswith("Generate realistic value for field"):
+            fake.field_calls.append(prompt)
+            return fake.field(prompt)
+        return fake.batch(prompt)
+
+    monkeypatch.setattr(pdf_form_filler, "generate_with_mistral", generate)
+    monkeypatch.setattr(pdf_form_filler, "get_ollama_client", lambda: SimpleNamespace(max_concurrency=2))
+    return fake
+
+
+def test_only_fields_missing_from_a_parsed_batch_are_retried(llm):
+    llm.batch = lambda prompt: json.dumps({'first_name': 'Ada', 'agree': 'Yes'})
+    llm.field = lambda prompt: 'ada@example.com'
+
+    assert pdf_form_filler.generate_form_values(FIELDS) == {
+        'first_name': 'Ada', 'agree': 'Yes', 'email': 'ada@example.com'
+    }
+    assert len(llm.field_calls) == 1
+    assert "'email'" in llm.field_calls[0]
+
+
+def test_unparseable_batch_is_not_retried_field_by_field(llm):
+    llm.batch = lambda prompt: "Sorry, I cannot help with that."
+    llm.field = lambda prompt: 'value'
+
+    assert pdf_form_filler.generate_form_values(FIELDS) == {}
+    assert llm.field_calls == []
+
+
+def test_overload_is_raised_without_retries(llm):
+    def overloaded(prompt):
+        raise LLMOverloaded("queue full")
+
+    llm.batch = overloaded
+    llm.field = lambda prompt: 'value'
+
+    with pytest.raises(LLMOverloaded):
+        pdf_form_filler.generate_form_values(FIELDS)
+    assert llm.field_calls == []
+
+
+def test_failing_field_retry_does_not_abort_the_form(llm):
+    llm.batch = lambda prompt: json.dumps({'first_name': 'Ada'})
+
+    def field(prompt):
+        if "'email'" in prompt:
+            raise RuntimeError("connection reset")
+        return 'Yes'
+
+    llm.field = field
+    assert pdf_form_filler.generate_form_values(FIELDS) == {'first_name': 'Ada', 'agree': 'Yes'}
@@ -0,0 +1,56 @@
+# tests/test_prompt_cache.py
+
+import time
+
+from llm.prompt_cache import PromptCache, prompt_key
+
+
+def _stored(cache, key):
+    return cache.conn.execute("SELECT last_used, hits FROM completions WHERE key = ?", (key,)).fetchone()
+
+
+def test_hits_are_buffered_until_the_batch_fills(tmp_path):
+    cache = PromptCache(str(tmp_path / "prompts.sqlite"), touch_batch=2, touch_secs=3600)
+    first, second = prompt_key("first", "m"), prompt_key("second", "m")
+    cache.put(first, "m", "one")
+    cache.put(second, "m", "two")
+
+    assert cache.get(first) == "one"
+    assert _stored(cache, first)[1] == 0
+    assert cache.stats()["pending_touches"] == 1
+
+    assert cache.get(second) == "two"
+    assert _stored(cache, first)[1] == 1
+    assert _stored(cache, second)[1] == 1
+    assert cache.stats()["pending_touches"] == 0
+    cache.close()
+
+
+def test_buffered_hits_count_for_eviction(tmp_path):
+    cache = PromptCache(str(tmp_path / "prompts.sqlite"), max_entries=3, touch_batch=100, touch_secs=3600)
+    keys = [prompt_key(str(i), "m") for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.put(key, "m", str(i))
+        time.sleep(0.01)
+
+    # Oldest entry, but used most recently
+    assert cache.get(keys[0]) == "0"
+    cache.put(prompt_key("new", "m"), "m", "new")
+
+    assert cache.get(keys[0]) == "0"
+    assert cache.get(keys[1]) is None
+    cache.close()
+
+
+def test_close_writes_pending_hits(tmp_path):
+    path = str(tmp_path / "prompts.sqlite")
+    cache = PromptCache(path, touch_batch=100, touch_secs=3600)
+    key = prompt_key("prompt", "m")
+    cache.put(key, "m", "completion")
+    cache.get(key)
+    cache.get(key)
+    cache.close()
+
+    reopened = PromptCache(path)
+    assert _stored(reopened, key)[1] == 2
+    reopened.close()
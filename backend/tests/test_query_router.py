@@ -0,0 +1,96 @@
+# tests/test_query_router.py
+
+import asyncio
+
+import pytest
+
+from embedder import embedding_utils
+from embedder.embedding_cache import EmbeddingCache
+from llm import pdf_form_filler
+from utils.query_router import QueryRouter
+
+AGENTS = [
+    {"name": "state-energy", "url": "http://energy", "description": "Solar and utilities", "centroid": [1.0, 0.0, 0.0]},
+    {"name": "state-planning", "url": "http://planning", "description": "Zoning and permits", "centroid": [0.0, 1.0, 0.0]},
+]
+
+
+@pytest.fixture
+def router():
+    return QueryRouter(AGENTS, threshold=0.6, margin=0.08, floor=0.4)
+
+
+def test_clear_match_routes_by_embedding(router):
+    decision = router.settle(router.classify([0.9, 0.1, 0.0]))
+
+    assert decision["agent"] == "state-energy"
+    assert decision["url"] == "http://energy"
+    assert not decision["ambiguous"]
+    assert decision["method"] == "embedding"
+
+
+def test_unrelated_question_stays_local(router):
+    decision = router.settle(router.classify([0.0, 0.0, 1.0]))
+
+    assert decision["agent"] is None and decision["url"] is None
+    assert not decision["ambiguous"]
+    assert decision["method"] == "none"
+
+
+def test_close_runner_up_is_ambiguous(router):
+    # Both agents score about 0.7: above the threshold, but within the margin
+    decision = router.classify([1.0, 0.95, 0.0])
+
+    assert decision["confidence"] >= 0.6
+    assert decision["margin"] < 0.08
+    assert decision["ambiguous"] and decision["agent"] is None
+
+
+def test_score_between_floor_and_threshold_is_ambiguous(router):
+    decision = router.classify([0.5, 0.0, 1.0])
+
+    assert 0.4 <= decision["confidence"] < 0.6
+    assert decision["ambiguous"]
+    assert decision["candidate"] == "state-energy"
+
+
+def test_llm_settles_ambiguous_decisions(router):
+    assert router.settle(router.classify([1.0, 0.95, 0.0]), "State-Planning")["agent"] == "state-planning"
+    assert router.settle(router.classify([1.0, 0.95, 0.0]), "NONE")["url"] is None
+    assert router.stats()["decisions"] == {"embedding": 0, "none": 0, "llm": 2}
+
+
+def test_aroute_asks_the_llm_only_when_ambiguous(router, monkeypatch):
+    prompts = []
+
+    async def generate(prompt, **options):
+        prompts.append(prompt)
+        return "state-planning"
+
+    monkeypatch.setattr(pdf_form_filler, "agenerate_with_mistral", generate)
+
+    clear = asyncio.run(router.aroute("solar rebates?", [1.0, 0.0, 0.0]))
+    ambiguous = asyncio.run(router.aroute("solar permits?", [1.0, 0.95, 0.0]))
+
+    assert clear["method"] == "embedding" and clear["agent"] == "state-energy"
+    assert ambiguous["method"] == "llm" and ambiguous["agent"] == "state-planning"
+    assert len(prompts) == 1 and "solar permits?" in prompts[0]
+
+
+def test_exemplars_are_embedded_once_at_load(monkeypatch):
+    encoded = []
+
+    def encode(texts, batch_size=None):
+        encoded.extend(texts)
+        return [[1.0, 0.0] if "solar" in text else [0.0, 1.0] for text in texts]
+
+    monkeypatch.setattr(embedding_utils, "_encode", encode)
+    monkeypatch.setattr(embedding_utils, "get_embedding_cache", lambda: EmbeddingCache(persist=False))
+    router = QueryRouter([
+        {"name": "energy", "url": "http://energy", "exemplars": ["solar rebates", "solar panels"]},
+        {"name": "planning", "url": "http://planning", "exemplars": ["deck permit"]},
+    ])
+
+    assert sorted(encoded) == ["deck permit", "solar panels", "solar rebates"]
+    assert router.stats()["vectors"] == 3
+    assert router.classify([0.0, 1.0])["agent"] == "planning"
@@ -0,0 +1,95 @@
+# tests/test_revisit_scheduler.py
+
+import math
+
+import pytest
+
+from crawler.frontier import FrontierStore, url_key
+from crawler.revisit_scheduler import (
+    RevisitScheduler, estimate_change_rate, DAY, MAX_REVISIT_DAYS, PRIOR_CHANGES_PER_DAY
+)
+
+
+def test_single_check_uses_the_prior():
+    assert estimate_change_rate(1, 0, 0) == PRIOR_CHANGES_PER_DAY
+
+
+def test_unchanged_page_has_zero_rate():
+    assert estimate_change_rate(11, 0, 10 * DAY) == 0
+
+
+def test_estimate_does_not_saturate_at_one_change_per_visit():
+    # Changed at every one of 10 daily visits: X/T would say 1/day
+    rate = estimate_change_rate(11, 10, 10 * DAY)
+    assert rate == pytest.approx(-math.log(0.5 / 10.5))
+    assert rate > 1.0
+    # More changes than revisits cannot be observed
+    assert estimate_change_rate(11, 50, 10 * DAY) == rate
+
+
+@pytest.fixture
+def domain(tmp_path):
+    path = str(tmp_path / "example.com.sqlite")
+    frontier = FrontierStore("example.com", path=path)
+    scheduler = RevisitScheduler("example.com", path=path, daily_budget=10)
+    yield frontier, scheduler
+    scheduler.close()
+    frontier.close()
+
+
+def _history(scheduler, url, checks, changes, days):
+    """Store ``checks`` observations of a URL spread over ``days``."""
+    with scheduler._lock:
+        scheduler.conn.execute(
+            "INSERT OR REPLACE INTO revisits (url_key, checks, changes, first_checked, last_checked) "
+            "VALUES (?, ?, ?, 0, ?)", (url_key(url), checks, changes, days * DAY)
+        )
+
+
+def _fetched(frontier, url, at):
+    frontier.add(url, 0)
+    with frontier._lock:
+        frontier.conn.execute("UPDATE urls SET state = 'fetched', fetched_at = ? WHERE url_key = ?",
+                              (at, url_key(url)))
+
+
+def test_first_check_is_a_baseline(domain):
+    _, scheduler = domain
+    scheduler.record("https://example.com/a", changed=True)
+    scheduler.record_many({"https://example.com/a": True, "https://example.com/b": False})
+
+    with scheduler._lock:
+        rows = dict((key, (checks, changes)) for key, checks, changes in scheduler.conn.execute(
+            "SELECT url_key, checks, changes FROM revisits"))
+    assert rows[url_key("https://example.com/a")] == (2, 1)
+    assert rows[url_key("https://example.com/b")] == (1, 0)
+    assert scheduler.has_history()
+
+
+def test_fast_changing_pages_are_revisited_sooner(domain):
+    frontier, scheduler = domain
+    _fetched(frontier, "https://example.com/news", at=0)
+    _fetched(frontier, "https://example.com/about", at=0)
+    _history(scheduler, "https://example.com/news", checks=11, changes=10, days=10)
+    _history(scheduler, "https://example.com/about", checks=11, changes=0, days=10)
+
+    due = scheduler.plan(now=2 * DAY)
+    assert [d["url"] for d in due] == ["https://example.com/news"]
+
+    due = scheduler.plan(now=(MAX_REVISIT_DAYS + 1) * DAY)
+    assert [d["url"] for d in due] == ["https://example.com/news", "https://example.com/about"]
+    assert due[1]["interval_hours"] == MAX_REVISIT_DAYS * 24
+
+
+def test_plan_is_capped_by_the_remaining_budget(domain):
+    frontier, scheduler = domain
+    now = 60 * DAY
+    for i in range(4):
+        _fetched(frontier, f"https://example.com/{i}", at=0)
+        _history(scheduler, f"https://example.com/{i}", checks=11, changes=5, days=10)
+    # Fetches in the last day count against the budget
+    for i in range(7):
+        _fetched(frontier, f"https://example.com/recent-{i}", at=now - 3600)
+
+    assert len(scheduler.plan(budget=10, now=now)) == 3
+    assert scheduler.plan(budget=5, now=now) == []
@@ -1,2 +1,2 @@
 # utils/__init__.py
-from .database import save_to_postgres, hybrid_search, get_document_by_id, vector_search
+from .database import save_to_postgres, hybrid_search, get_document_by_id, vector_search, chunk_search
@@ -0,0 +1,185 @@
+# backend/utils/answer_cache.py
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Tuple
+
+import numpy as np
+
+from .corpus_version import get_corpus_version
+
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "2000"))
+# Cosine similarity a new question needs to reuse a cached answer
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+# Backstop for corpus changes that add better sources without touching the cited ones
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+
+
+class AnswerCache:
+    """
+    Semantic cache of /rag/ask answers keyed by question embedding.
+
+    Each entry holds the unit-normalized question embedding, the answer
+    payload, the URLs of the sources it was generated from and the corpus
+    version at the time. ``lookup`` returns the most similar entry in the
+    same scope (search filters) if its cosine similarity reaches the
+    threshold; the embeddings are kept in one matrix so that is a single
+    matrix-vector product.
+
+    The cache listens to CorpusVersion: any write touching one of an entry's
+    source URLs drops the entry. Entries also expire after a TTL.
+    """
+
+    def __init__(self, max_size: int = ANSWER_CACHE_SIZE, threshold: float = ANSWER_CACHE_THRESHOLD,
+                 ttl: float = ANSWER_CACHE_TTL):
+        self.max_size = max_size
+        self.threshold = threshold
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._by_url = {}
+        self._next_id = 0
+        # Rebuilt lazily from _entries after any insert or removal
+        self._matrix = None
+        self._matrix_ids = []
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+        self.expired = 0
+        self.evictions = 0
+        get_corpus_version().add_listener(self._on_write)
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _remove(self, entry_id):
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        for url in entry["urls"]:
+            ids = self._by_url.get(url)
+            if ids is not None:
+                ids.discard(entry_id)
+                if not ids:
+                    del self._by_url[url]
+        self._matrix = None
+
+    def _index(self):
+        if self._matrix is None:
+            self._matrix_ids = list(self._entries)
+            self._matrix = (np.stack([self._entries[i]["embedding"] for i in self._matrix_ids])
+                            if self._matrix_ids else np.zeros((0, 0), dtype=np.float32))
+        return self._matrix, self._matrix_ids
+
+    def lookup(self, embedding, scope: Tuple = ()) -> Optional[Dict[str, Any]]:
+        """
+        Find a cached answer for a question.
+
+        Args:
+            embedding (list[float]): Question embedding
+            scope (tuple): Search filters the answer must have been produced under
+
+        Returns:
+            dict or None: ``{"result", "question", "similarity", "age_secs", "corpus_version"}``
+        """
+        query = self._normalize(embedding)
+        now = time.monotonic()
+        with self._lock:
+            matrix, ids = self._index()
+            if ids:
+                scores = matrix @ query
+                for position in np.argsort(-scores):
+                    score = float(scores[position])
+                    if score < self.threshold:
+                        break
+                    entry = self._entries[ids[position]]
+                    if entry["scope"] != scope:
+                        continue
+                    if now - entry["created"] >= self.ttl:
+                        self._remove(ids[position])
+                        self.expired += 1
+                        continue
+                    self._entries.move_to_end(ids[position])
+                    self.hits += 1
+                    return {
+                        "result": dict(entry["result"]),
+                        "question": entry["question"],
+                        "similarity": round(score, 4),
+                        "age_secs": round(now - entry["created"], 1),
+                        "corpus_version": entry["corpus_version"],
+                    }
+            self.misses += 1
+            return None
+
+    def put(self, question: str, embedding, result: Dict[str, Any], source_urls: List[str], scope: Tuple = ()):
+        """Cache an answer generated from the given sources."""
+        urls = set(u for u in source_urls if u)
+        if not urls:
+            # Nothing to invalidate it by
+            return
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = {
+                "question": question,
+                "embedding": self._normalize(embedding),
+                "result": dict(result),
+                "urls": urls,
+                "scope": scope,
+                "corpus_version": get_corpus_version().token(),
+                "created": time.monotonic(),
+            }
+            for url in urls:
+                self._by_url.setdefault(url, set()).add(entry_id)
+            self._matrix = None
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _on_write(self, domains: set, urls: set):
+        with self._lock:
+            stale = set()
+            for url in urls:
+                stale.update(self._by_url.get(url, ()))
+            for entry_id in stale:
+                self._remove(entry_id)
+            self.invalidated += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_url.clear()
+            self._matrix = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidated": self.invalidated,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "capacity": self.max_size,
+                "threshold": self.threshold,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> AnswerCache:
+    """Return the process-wide AnswerCache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AnswerCache()
+        return _cache
@@ -0,0 +1,156 @@
+# backend/utils/async_database.py
+
+import os
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Optional, List, Dict, Any
+
+from psycopg_pool import AsyncConnectionPool
+
+from .db_pool import DB_POOL_MIN, DB_POOL_MAX, DB_POOL_TIMEOUT, DB_HEALTHCHECK_IDLE_SECS
+from .vector_index import search_settings
+from .database import (
+    hybrid_query, hybrid_cache_key, vector_query, chunk_query, chunk_rows, document_query, rows_to_dicts
+)
+from .retrieval_cache import get_retrieval_cache
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_pool: Optional[AsyncConnectionPool] = None
+_pool_lock = asyncio.Lock()
+
+
+async def get_async_pool() -> AsyncConnectionPool:
+    """
+    Return the process-wide async pool, opening it on first use.
+
+    Uses the same DB_POOL_* limits as the threaded pool in utils.db_pool,
+    which keeps serving the crawler and bulk writer threads.
+    """
+    global _pool
+    if _pool is not None:
+        return _pool
+    async with _pool_lock:
+        if _pool is None:
+            try:
+                pool = AsyncConnectionPool(
+                    os.getenv("DATABASE_URL"),
+                    min_size=DB_POOL_MIN,
+                    max_size=DB_POOL_MAX,
+                    timeout=DB_POOL_TIMEOUT,
+                    max_idle=max(DB_HEALTHCHECK_IDLE_SECS, 60),
+                    check=AsyncConnectionPool.check_connection,
+                    open=False,
+                )
+                await pool.open()
+                _pool = pool
+                logger.info(f"✅ Async PostgreSQL pool ready (min={DB_POOL_MIN}, max={DB_POOL_MAX}).")
+            except Exception as e:
+                logger.error(f"❌ Failed to open async PostgreSQL pool: {e}")
+                raise
+    return _pool
+
+
+async def close_async_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+def async_pool_stats() -> Dict[str, Any]:
+    return _pool.get_stats() if _pool is not None else {}
+
+
+@asynccontextmanager
+async def async_db_connection():
+    """Check out a pooled async connection: ``async with async_db_connection() as conn: ...``"""
+    pool = await get_async_pool()
+    async with pool.connection() as conn:
+        yield conn
+
+
+async def _search(sql, params, ef_search=None, probes=None, filtered=False):
+    async with async_db_connection() as conn, conn.cursor() as cur:
+        for setting, setting_params in search_settings(ef_search, probes, params["prefetch"], filtered):
+            await cur.execute(setting, setting_params)
+        await cur.execute(sql, params)
+        return await cur.fetchall()
+
+
+async def hybrid_search(
+    query: str,
+    limit: int = 5,
+    semantic_weight: Optional[float] = None,
+    keyword_weight: Optional[float] = None,
+    fusion: Optional[str] = None,
+    candidates: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    fields: Optional[List[str]] = None,
+    snippet: bool = True,
+    domain: Optional[str] = None,
+    source_type: Optional[str] = None,
+    use_cache: bool = True
+):
+    """Async version of database.hybrid_search"""
+    cache = get_retrieval_cache()
+    key = hybrid_cache_key(query, limit=limit, semantic_weight=semantic_weight, keyword_weight=keyword_weight,
+                           fusion=fusion, candidates=candidates, ef_search=ef_search, probes=probes,
+                           fields=fields, snippet=snippet, domain=domain, source_type=source_type)
+    token = cache.token(domain)
+    if use_cache:
+        cached = cache.get(key, token)
+        if cached is not None:
+            return cached
+
+    from embedder.embedding_utils import aembed_text
+    embedding = await aembed_text(query)
+    sql, params, columns = hybrid_query(query, embedding, limit, semantic_weight, keyword_weight, fusion,
+                                        candidates, fields, snippet, domain, source_type)
+    try:
+        results = rows_to_dicts(columns, await _search(sql, params, ef_search, probes, bool(domain or source_type)))
+    except Exception as e:
+        logger.error(f"❌ Hybrid search error: {e}")
+        return []
+    cache.put(key, token, results)
+    return results
+
+
+async def vector_search(embedding: List[float], limit: int = 5, ef_search: Optional[int] = None,
+                        probes: Optional[int] = None, fields: Optional[List[str]] = None, snippet: bool = True,
+                        domain: Optional[str] = None, source_type: Optional[str] = None):
+    """Async version of database.vector_search"""
+    sql, params, columns = vector_query(embedding, limit, fields, snippet, domain, source_type)
+    try:
+        return rows_to_dicts(columns, await _search(sql, params, ef_search, probes, bool(domain or source_type)))
+    except Exception as e:
+        logger.error(f"❌ Vector search error: {e}")
+        return []
+
+
+async def chunk_search(embedding: List[float], limit: int = 5, ef_search: Optional[int] = None,
+                       probes: Optional[int] = None):
+    """Async version of database.chunk_search"""
+    sql, params = chunk_query(embedding, limit)
+    try:
+        return chunk_rows(await _search(sql, params, ef_search, probes))
+    except Exception as e:
+        logger.error(f"❌ Chunk search error: {e}")
+        return []
+
+
+async def get_document_by_id(doc_id: int, fields: Optional[List[str]] = None):
+    """Retrieve full document by ID (id, title, text unless other fields are requested)"""
+    sql, columns = document_query(fields)
+    try:
+        async with async_db_connection() as conn, conn.cursor() as cur:
+            await cur.execute(sql, (doc_id,))
+            result = await cur.fetchone()
+            return dict(zip(columns, result)) if result else None
+    except Exception as e:
+        logger.error(f"❌ Error fetching document: {e}")
+        return None
@@ -0,0 +1,126 @@
+# utils/async_user_utils.py
+
+import asyncio
+import logging
+from typing import Optional, Dict, Any
+
+from psycopg.types.json import Json
+from passlib.hash import bcrypt
+
+from .async_database import async_db_connection
+from .user_utils import (
+    CREATE_USER_SQL, USER_BY_EMAIL_SQL, USER_PROFILE_SQL, UPDATE_PROFILE_SQL,
+    DELETE_PROFILE_KEY_SQL, UPDATE_PASSWORD_SQL, user_row
+)
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Async versions of utils.user_utils. bcrypt is deliberately slow, so hashing
+# and verification run in a worker thread instead of on the event loop.
+
+
+async def create_user(email: str, password: str, profile: Optional[Dict[str, Any]] = None):
+    """
+    Create a new user with email and hashed password.
+    Optionally include initial profile data.
+    """
+    try:
+        pwd_hash = await asyncio.to_thread(bcrypt.hash, password)
+        async with async_db_connection() as conn, conn.cursor() as cur:
+            await cur.execute(CREATE_USER_SQL, (email, pwd_hash, Json(profile or {})))
+            result = await cur.fetchone()
+            await conn.commit()
+            return result[0] if result else None
+
+    except Exception as e:
+        logger.error(f"❌ Error creating user: {e}")
+        return None
+
+
+async def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
+    """Get user by email"""
+    try:
+        async with async_db_connection() as conn, conn.cursor() as cur:
+            await cur.execute(USER_BY_EMAIL_SQL, (email,))
+            return user_row(await cur.fetchone())
+
+    except Exception as e:
+        logger.error(f"❌ Error fetching user: {e}")
+        return None
+
+
+async def get_user_profile(user_id: int) -> Dict[str, Any]:
+    """Retrieve user profile by ID"""
+    try:
+        async with async_db_connection() as conn, conn.cursor() as cur:
+            await cur.execute(USER_PROFILE_SQL, (user_id,))
+            result = await cur.fetchone()
+            return result[0] if result else {}
+
+    except Exception as e:
+        logger.error(f"❌ Error fetching profile: {e}")
+        return {}
+
+
+async def update_user_profile(user_id: int, updates: Dict[str, Any]):
+    """
+    Update user profile field(s)
+
+    Example:
+      await update_user_profile(1, {"key": "address", "value": "7 Spinnaker Ln"})
+    """
+    key = updates.get("key")
+    value = updates.get("value")
+    if not key:
+        logger.warning("❌ Missing 'key' in update request")
+        return {"error": "Missing key"}
+
+    try:
+        async with async_db_connection() as conn, conn.cursor() as cur:
+            await cur.execute(UPDATE_PROFILE_SQL, ('{' + key + '}', Json(value), user_id))
+            result = await cur.fetchone()
+            await conn.commit()
+            return {"status": "success", "profile": result[0] if result else None}
+
+    except Exception as e:
+        logger.error(f"❌ Error updating profile: {e}")
+        return {"error": str(e)}
+
+
+async def delete_profile_key(user_id: int, key: str):
+    """Remove a key from user profile"""
+    try:
+        async with async_db_connection() as conn, conn.cursor() as cur:
+            await cur.execute(DELETE_PROFILE_KEY_SQL, ('{' + key + '}', user_id))
+            result = await cur.fetchone()
+            await conn.commit()
+            return {"status": "deleted", "profile": result[0] if result else None}
+
+    except Exception as e:
+        logger.error(f"❌ Error deleting profile key: {e}")
+        return {"error": str(e)}
+
+
+async def verify_password(email: str, password: str, stored_hash: Optional[str] = None) -> bool:
+    """Verify user password"""
+    if not stored_hash:
+        user = await get_user_by_email(email)
+        if not user:
+            return False
+        stored_hash = user["password_hash"]
+
+    return await asyncio.to_thread(bcrypt.verify, password, stored_hash)
+
+
+async def update_user_password(user_id: int, new_password: str):
+    """Update user password"""
+    try:
+        pwd_hash = await asyncio.to_thread(bcrypt.hash, new_password)
+        async with async_db_connection() as conn, conn.cursor() as cur:
+            await cur.execute(UPDATE_PASSWORD_SQL, (pwd_hash, user_id))
+            await conn.commit()
+            return {"status": "success"}
+    except Exception as e:
+        return {"error": str(e)}
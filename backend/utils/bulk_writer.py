@@ -0,0 +1,227 @@
+# backend/utils/bulk_writer.py
+
+import os
+import time
+import logging
+import threading
+from typing import Optional, List, Dict, Any, Callable
+
+from psycopg2.extras import Json, execute_values
+
+from .db_pool import db_connection
+from .corpus_version import bump_documents
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BULK_WRITE_BATCH_SIZE = int(os.getenv("BULK_WRITE_BATCH_SIZE", "200"))
+BULK_WRITE_FLUSH_SECS = float(os.getenv("BULK_WRITE_FLUSH_SECS", "2.0"))
+
+DOCUMENT_COLUMNS = "(url, title, description, text, embedding, pdf_paths, source_type, metadata)"
+DOCUMENT_TEMPLATE = "(%s, %s, %s, %s, %s::vector, %s, %s, %s)"
+CHUNK_TEMPLATE = "(%s, %s, %s, %s, %s, %s::vector)"
+
+
+class BulkDocumentWriter:
+    """
+    Buffers documents and writes them with multi-row upserts.
+
+    Rows are flushed when ``batch_size`` documents are buffered or when the
+    oldest buffered row is ``flush_interval`` seconds old, whichever comes
+    first. Each flush is one transaction: a multi-row
+    ``INSERT ... ON CONFLICT (url) DO UPDATE`` for the documents, followed by
+    one bulk sync of their chunks. Every flush produces a result dict
+    (rows, urls, ok, error, seconds) that is returned and passed to
+    ``on_flush``.
+    """
+
+    def __init__(self, batch_size: int = BULK_WRITE_BATCH_SIZE, flush_interval: float = BULK_WRITE_FLUSH_SECS,
+                 on_flush: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+        self._buffer = []
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._closed = threading.Event()
+
+        self.batches = 0
+        self.failed_batches = 0
+        self.rows_written = 0
+        self.last_error = None
+
+        self._timer = threading.Thread(target=self._run_timer, name="bulk-writer", daemon=True)
+        self._timer.start()
+
+    def add(
+        self,
+        title: str,
+        description: str,
+        text: str,
+        url: Optional[str],
+        embedding: Optional[List[float]],
+        pdf_paths: Optional[List[str]] = None,
+        source_type: str = 'web',
+        metadata: Optional[Dict[str, Any]] = None,
+        chunks: Optional[List[Dict[str, Any]]] = None
+    ):
+        """Buffer one document. Arguments are the same as save_to_postgres."""
+        with self._lock:
+            self._buffer.append({
+                "url": url,
+                "title": title,
+                "description": description,
+                "text": text,
+                "embedding": embedding,
+                "pdf_paths": pdf_paths or [],
+                "source_type": source_type,
+                "metadata": metadata,
+                "chunks": chunks,
+            })
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self.flush()
+
+    def _run_timer(self):
+        while not self._closed.wait(min(self.flush_interval, 0.5)):
+            with self._lock:
+                due = self._oldest is not None and time.monotonic() - self._oldest >= self.flush_interval
+            if due:
+                self.flush()
+
+    def flush(self) -> Optional[Dict[str, Any]]:
+        """Write everything buffered so far. Returns the batch result, or None if empty."""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._buffer, self._oldest = self._buffer, [], None
+            if not rows:
+                return None
+
+            # ON CONFLICT cannot touch the same row twice in one statement: keep the last copy per URL
+            by_url = {}
+            for row in rows:
+                by_url[row["url"] if row["url"] is not None else id(row)] = row
+            rows = list(by_url.values())
+
+            start = time.monotonic()
+            result = {"rows": len(rows), "urls": [r["url"] for r in rows if r["url"]], "ok": True, "error": None}
+            try:
+                with db_connection() as conn, conn.cursor() as cur:
+                    doc_ids = self._write_documents(cur, rows)
+                    self._write_chunks(cur, rows, doc_ids)
+                    conn.commit()
+                bump_documents(rows)
+                self.rows_written += len(rows)
+                logger.info(f"✅ Bulk wrote {len(rows)} documents")
+            except Exception as e:
+                result["ok"] = False
+                result["error"] = str(e)
+                self.failed_batches += 1
+                self.last_error = str(e)
+                logger.error(f"❌ Bulk write of {len(rows)} documents failed: {e}")
+            self.batches += 1
+            result["seconds"] = round(time.monotonic() - start, 4)
+
+        if self.on_flush:
+            try:
+                self.on_flush(result)
+            except Exception as e:
+                logger.error(f"❌ Bulk writer flush callback failed: {e}")
+        return result
+
+    def _write_documents(self, cur, rows) -> Dict[str, int]:
+        returned = execute_values(cur, f"""
+            INSERT INTO documents {DOCUMENT_COLUMNS}
+            VALUES %s
+            ON CONFLICT (url) DO UPDATE SET
+              title = EXCLUDED.title,
+              description = EXCLUDED.description,
+              text = EXCLUDED.text,
+              embedding = EXCLUDED.embedding,
+              pdf_paths = EXCLUDED.pdf_paths,
+              metadata = EXCLUDED.metadata,
+              source_type = EXCLUDED.source_type
+            RETURNING id, url
+        """, [
+            (r["url"], r["title"], r["description"], r["text"], r["embedding"], r["pdf_paths"],
+             r["source_type"], Json(r["metadata"]) if r["metadata"] else None)
+            for r in rows
+        ], template=DOCUMENT_TEMPLATE, page_size=len(rows), fetch=True)
+        return {url: doc_id for doc_id, url in returned if url is not None}
+
+    def _write_chunks(self, cur, rows, doc_ids):
+        """Bulk version of database._sync_chunks for every row that carries chunks."""
+        chunked = [(doc_ids[r["url"]], r["chunks"]) for r in rows if r["chunks"] is not None and r["url"] in doc_ids]
+        if not chunked:
+            return
+        ids = [doc_id for doc_id, _ in chunked]
+        keep_ids = [doc_id for doc_id, chunks in chunked for _ in chunks]
+        keep_hashes = [c["hash"] for _, chunks in chunked for c in chunks]
+
+        cur.execute("""
+            DELETE FROM document_chunks c
+            WHERE c.document_id = ANY(%s::INT[])
+              AND (c.document_id, c.content_hash) NOT IN (
+                SELECT * FROM unnest(%s::INT[], %s::TEXT[])
+              )
+        """, (ids, keep_ids, keep_hashes))
+
+        chunk_rows = [
+            (doc_id, c["index"], c["offset"], c["hash"], c["text"], c.get("embedding"))
+            for doc_id, chunks in chunked for c in chunks
+        ]
+        if chunk_rows:
+            execute_values(cur, """
+                INSERT INTO document_chunks (document_id, chunk_index, char_offset, content_hash, text, embedding)
+                VALUES %s
+                ON CONFLICT (document_id, content_hash) DO UPDATE SET
+                  chunk_index = EXCLUDED.chunk_index,
+                  char_offset = EXCLUDED.char_offset,
+                  embedding = COALESCE(EXCLUDED.embedding, document_chunks.embedding)
+            """, chunk_rows, template=CHUNK_TEMPLATE, page_size=1000)
+
+        cur.execute("""
+            UPDATE documents d
+            SET embedding = a.embedding
+            FROM (
+              SELECT document_id, AVG(embedding) AS embedding
+              FROM document_chunks
+              WHERE document_id = ANY(%s::INT[])
+              GROUP BY document_id
+            ) a
+            WHERE d.id = a.document_id
+        """, (ids,))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            buffered = len(self._buffer)
+        return {
+            "buffered": buffered,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "rows_written": self.rows_written,
+            "last_error": self.last_error,
+        }
+
+    def close(self):
+        """Stop the flush timer and write whatever is still buffered."""
+        self._closed.set()
+        self._timer.join()
+        self.flush()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_bulk_writer() -> BulkDocumentWriter:
+    """Return the process-wide BulkDocumentWriter."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = BulkDocumentWriter()
+        return _writer
@@ -0,0 +1,100 @@
+# backend/utils/corpus_version.py
+
+import re
+import json
+import logging
+import threading
+from typing import Optional, Iterable, Callable, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+# Same pattern as the documents.domain column (Db/init.sql), so the host keeps its case
+URL_HOST_PATTERN = re.compile(r'^[a-zA-Z]+://([^/:?#]+)')
+
+
+def document_domain(url: Optional[str], metadata: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """
+    Domain a document is filed under, computed exactly like the generated
+    documents.domain column: ``metadata->>'domain'``, else the URL host as written.
+    """
+    if metadata and metadata.get("domain") is not None:
+        domain = metadata["domain"]
+        return domain if isinstance(domain, str) else json.dumps(domain)
+    if url:
+        match = URL_HOST_PATTERN.match(url)
+        return match.group(1) if match else None
+    return None
+
+
+class CorpusVersion:
+    """
+    Monotonic version counters for the document corpus.
+
+    Every write path bumps the counter of the domains it touched. Readers
+    take a ``token`` before querying and cache results under it; any later
+    write to the same scope changes the token, so stale entries can never be
+    served. Unscoped tokens change on every write, and writes without a
+    known domain invalidate every scope.
+
+    Listeners registered with ``add_listener`` are called with the sets of
+    domains and URLs of every write, for caches that invalidate by source.
+
+    Counters are per process; ingestion runs inside the API process, and
+    caches pair this with a TTL for writes made elsewhere.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._total = 0
+        self._wildcard = 0
+        self._domains = {}
+        self._listeners = []
+
+    def token(self, domain: Optional[str] = None):
+        with self._lock:
+            if domain:
+                return (self._domains.get(domain, 0), self._wildcard)
+            return self._total
+
+    def bump(self, domains: Iterable[Optional[str]] = (), urls: Iterable[str] = ()):
+        domains = set(domains)
+        urls = set(u for u in urls if u)
+        with self._lock:
+            self._total += 1
+            for domain in domains:
+                if domain:
+                    self._domains[domain] = self._domains.get(domain, 0) + 1
+                else:
+                    self._wildcard += 1
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(domains, urls)
+            except Exception as e:
+                logger.error(f"❌ Corpus version listener failed: {e}")
+
+    def add_listener(self, listener: Callable[[set, set], None]):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"version": self._total, "domains": len(self._domains)}
+
+
+_version = CorpusVersion()
+
+
+def get_corpus_version() -> CorpusVersion:
+    """Return the process-wide CorpusVersion."""
+    return _version
+
+
+def bump_documents(docs: Iterable[Dict[str, Any]]):
+    """Record a write of documents given as dicts with 'url' and optional 'metadata'."""
+    docs = list(docs)
+    if docs:
+        _version.bump(
+            domains=[document_domain(d.get("url"), d.get("metadata")) for d in docs],
+            urls=[d.get("url") for d in docs],
+        )
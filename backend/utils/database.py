@@ -3,23 +3,89 @@
 import os
 import logging
 import psycopg2
-from psycopg2.extras import Json
+from psycopg2.extras import Json, execute_values
 from typing import Optional, List, Dict, Any
 
+from .db_pool import db_connection
+from .vector_index import apply_search_params, ann_sql, prefetch_count
+from .corpus_version import bump_documents
+from .retrieval_cache import get_retrieval_cache, RetrievalCache
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def get_db():
-    """Get a database connection"""
-    try:
-        conn = psycopg2.connect(os.getenv("DATABASE_URL"))
-        logger.info("✅ PostgreSQL connection established.")
-        return conn
-    except Exception as e:
-        logger.error(f"❌ Failed to connect to PostgreSQL: {e}")
-        raise
+# Hybrid retrieval settings (see hybrid_search)
+HYBRID_SEMANTIC_WEIGHT = float(os.getenv("HYBRID_SEMANTIC_WEIGHT", "0.6"))
+HYBRID_KEYWORD_WEIGHT = float(os.getenv("HYBRID_KEYWORD_WEIGHT", "0.4"))
+HYBRID_FUSION = os.getenv("HYBRID_FUSION", "rrf")
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "50"))
+
+# Columns a search caller may request; full text only when asked for
+DOCUMENT_FIELDS = ("id", "title", "url", "domain", "description", "text", "source_type", "metadata", "pdf_paths",
+                   "created_at")
+DEFAULT_SEARCH_FIELDS = ("id", "title", "url")
+# Longest snippet returned per hit
+SNIPPET_CHARS = int(os.getenv("SNIPPET_CHARS", "500"))
+# ts_headline re-parses the text it is given, so only the head of a document is highlighted
+HEADLINE_SCAN_CHARS = int(os.getenv("HEADLINE_SCAN_CHARS", "20000"))
+
+
+def projection(fields=None) -> List[str]:
+    """Validate requested document fields; defaults to DEFAULT_SEARCH_FIELDS."""
+    fields = list(fields or DEFAULT_SEARCH_FIELDS)
+    unknown = [f for f in fields if f not in DOCUMENT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown document fields: {', '.join(unknown)}")
+    return fields
+
+
+def snippet_sql(with_query: bool) -> str:
+    """
+    Server-side snippet for document ``d``: the text of its chunk closest to
+    the query embedding, falling back to a ts_headline excerpt (when there is
+    query text) or the head of the document. Never longer than SNIPPET_CHARS.
+    Headlines carry no <b> markers: snippets go into prompts and responses as plain text.
+    """
+    if with_query:
+        fallback = """ts_headline('english', left(d.text, %(headline_chars)s::int),
+                                  websearch_to_tsquery('english', %(query)s),
+                                  'StartSel="", StopSel="", FragmentDelimiter=" ... ", '
+                                  'MaxFragments=2, MinWords=15, MaxWords=40')"""
+    else:
+        fallback = "d.text"
+    return f"""left(COALESCE(
+                (SELECT c.text FROM document_chunks c
+                 WHERE c.document_id = d.id AND c.embedding IS NOT NULL
+                 ORDER BY c.embedding <=> %(embedding)s::vector
+                 LIMIT 1),
+                {fallback}
+            ), %(snippet_chars)s::int)"""
+
 
+def filter_clause(domain: Optional[str] = None, source_type: Optional[str] = None, prefix: str = "WHERE"):
+    """
+    ``WHERE`` clause and parameters scoping a search to one domain and/or source type.
+
+    Both columns have btree indexes and large domains get partial vector
+    indexes (see vector_index.ensure_domain_indexes), so scoped ANN and
+    full-text stages only touch the matching slice.
+    """
+    conditions, params = [], {}
+    if domain:
+        conditions.append("domain = %(domain)s")
+        params["domain"] = domain
+    if source_type:
+        conditions.append("source_type = %(source_type)s")
+        params["source_type"] = source_type
+    if not conditions:
+        return "", params
+    return f"{prefix} " + " AND ".join(conditions), params
+
+
+def rows_to_dicts(columns: List[str], results) -> List[Dict[str, Any]]:
+    return [dict(zip(columns, r)) for r in results]
 
 def save_to_postgres(
     title: str,
@@ -29,8 +95,9 @@ def save_to_postgres(
     embedding: List[float],
     pdf_paths: Optional[List[str]] = None,
     source_type: str = 'web',
-    metadata: Optional[Dict[str, Any]] = None
-):
+    metadata: Optional[Dict[str, Any]] = None,
+    chunks: Optional[List[Dict[str, Any]]] = None
+) -> Optional[int]:
     """
     Save document content to PostgreSQL with vector support
     
@@ -39,165 +106,378 @@ def save_to_postgres(
         description (str): Short summary
         text (str): Full extracted text
         url (str): Source URL or None
-        embedding (List[float]): Vector embedding
+        embedding (List[float]): Vector embedding. May be None when chunks are
+            given; the document vector is then the mean of its chunk vectors.
         pdf_paths (List[str], optional): File paths of associated PDFs
         source_type (str): 'web', 'pdf', 'manual', etc.
         metadata (dict, optional): Extra info like domain, author, etc.
+        chunks (List[dict], optional): The document's current chunks, each with
+            'index', 'offset', 'hash', 'text' and 'embedding'. Chunks whose hash
+            is already stored may pass embedding=None to keep the stored vector.
+
+    Returns:
+        int: Document id, or None on error
     """
-    conn = None
-    cur = None
     try:
-        conn = get_db()
-        cur = conn.cursor()
+        with db_connection() as conn, conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO documents (
+                  url, title, description, text, embedding, pdf_paths, source_type, metadata
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (url) DO UPDATE SET
+                  title = EXCLUDED.title,
+                  description = EXCLUDED.description,
+                  text = EXCLUDED.text,
+                  embedding = EXCLUDED.embedding,
+                  pdf_paths = EXCLUDED.pdf_paths,
+                  metadata = EXCLUDED.metadata,
+                  source_type = EXCLUDED.source_type
+                RETURNING id
+            """, (
+                url,
+                title,
+                description,
+                text,
+                embedding,
+                pdf_paths or [],
+                source_type,
+                Json(metadata) if metadata else None
+            ))
+            doc_id = cur.fetchone()[0]
+            if chunks is not None:
+                _sync_chunks(cur, doc_id, chunks)
+            conn.commit()
+            bump_documents([{"url": url, "metadata": metadata}])
+            logger.info(f"✅ Saved document: {title} ({url})")
+            return doc_id
 
+    except Exception as e:
+        logger.error(f"❌ Database error: {e}")
+        return None
+
+
+def _sync_chunks(cur, doc_id: int, chunks: List[Dict[str, Any]]):
+    """
+    Bring document_chunks in line with a document's current chunks.
+
+    Chunks are keyed by content hash: unchanged chunks only get their position
+    updated, new ones are inserted with their embedding, and chunks that no
+    longer occur are deleted. The document vector is then recomputed as the
+    mean of its chunk vectors, which covers the whole text instead of the
+    model's truncated input window.
+    """
+    hashes = [c['hash'] for c in chunks]
+    cur.execute(
+        "DELETE FROM document_chunks WHERE document_id = %s AND NOT (content_hash = ANY(%s::TEXT[]))",
+        (doc_id, hashes)
+    )
+    if chunks:
+        execute_values(cur, """
+            INSERT INTO document_chunks (document_id, chunk_index, char_offset, content_hash, text, embedding)
+            VALUES %s
+            ON CONFLICT (document_id, content_hash) DO UPDATE SET
+              chunk_index = EXCLUDED.chunk_index,
+              char_offset = EXCLUDED.char_offset,
+              embedding = COALESCE(EXCLUDED.embedding, document_chunks.embedding)
+        """, [
+            (doc_id, c['index'], c['offset'], c['hash'], c['text'], c.get('embedding'))
+            for c in chunks
+        ], template="(%s, %s, %s, %s, %s, %s::vector)")
         cur.execute("""
-            INSERT INTO documents (
-              url, title, description, text, embedding, pdf_paths, source_type, metadata
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (url) DO UPDATE SET
-              title = EXCLUDED.title,
-              description = EXCLUDED.description,
-              text = EXCLUDED.text,
-              embedding = EXCLUDED.embedding,
-              pdf_paths = EXCLUDED.pdf_paths,
-              metadata = EXCLUDED.metadata,
-              source_type = EXCLUDED.source_type
-        """, (
-            url,
-            title,
-            description,
-            text,
-            embedding,
-            pdf_paths or [],
-            source_type,
-            Json(metadata) if metadata else None
-        ))
-        conn.commit()
-        logger.info(f"✅ Saved document: {title} ({url})")
+            UPDATE documents
+            SET embedding = (SELECT AVG(embedding) FROM document_chunks WHERE document_id = %s)
+            WHERE id = %s
+        """, (doc_id, doc_id))
+
 
+def get_chunk_hashes(urls: List[str]) -> Dict[str, set]:
+    """Content hashes of the chunks stored for each document URL, in one query"""
+    found = {url: set() for url in urls}
+    if not urls:
+        return found
+    try:
+        with db_connection() as conn, conn.cursor() as cur:
+            cur.execute("""
+                SELECT d.url, c.content_hash
+                FROM document_chunks c JOIN documents d ON d.id = c.document_id
+                WHERE d.url = ANY(%s::TEXT[])
+            """, (list(urls),))
+            for url, content_hash in cur.fetchall():
+                found[url].add(content_hash)
+        return found
     except Exception as e:
-        logger.error(f"❌ Database error: {e}")
-        if conn:
-            conn.rollback()
-    finally:
-        if cur:
-            cur.close()
-        if conn:
-            conn.close()
+        logger.error(f"❌ Error fetching chunk hashes: {e}")
+        return found
+
+
+def hybrid_cache_key(query: str, **options) -> tuple:
+    """Retrieval cache key for a hybrid_search call. Shared with utils.async_database."""
+    return RetrievalCache.key(query, kind="hybrid", **options)
+
+
+def hybrid_query(
+    query: str,
+    embedding: List[float],
+    limit: int = 5,
+    semantic_weight: Optional[float] = None,
+    keyword_weight: Optional[float] = None,
+    fusion: Optional[str] = None,
+    candidates: Optional[int] = None,
+    fields: Optional[List[str]] = None,
+    snippet: bool = True,
+    domain: Optional[str] = None,
+    source_type: Optional[str] = None
+):
+    """SQL, parameters and result columns for hybrid_search. Shared with utils.async_database."""
+    fields = projection(fields)
+    where, filter_params = filter_clause(domain, source_type)
+    keyword_filter, _ = filter_clause(domain, source_type, prefix="AND")
+    params = {
+        "query": query,
+        "embedding": embedding,
+        "semantic_weight": HYBRID_SEMANTIC_WEIGHT if semantic_weight is None else semantic_weight,
+        "keyword_weight": HYBRID_KEYWORD_WEIGHT if keyword_weight is None else keyword_weight,
+        "rrf_k": HYBRID_RRF_K,
+        "candidates": max(candidates or HYBRID_CANDIDATES, limit),
+        "limit": limit,
+        "snippet_chars": SNIPPET_CHARS,
+        "headline_chars": HEADLINE_SCAN_CHARS,
+        **filter_params,
+    }
+    params["prefetch"] = prefetch_count(params["candidates"])
+    columns = fields + ["keyword_score", "semantic_score", "hybrid_score"] + (["snippet"] if snippet else [])
+    select = ", ".join([f"d.{f}" for f in fields] + ["f.keyword_score", "f.semantic_score", "f.hybrid_score"]
+                       + ([snippet_sql(with_query=True)] if snippet else []))
+    fusion = fusion or HYBRID_FUSION
+    if fusion == "rrf":
+        score_sql = """
+            COALESCE(%(semantic_weight)s / (%(rrf_k)s + sem.rank), 0) +
+            COALESCE(%(keyword_weight)s / (%(rrf_k)s + kw.rank), 0)
+        """
+    elif fusion == "weighted":
+        score_sql = """
+            COALESCE(sem.score, 0) * %(semantic_weight)s +
+            COALESCE(kw.score / NULLIF(MAX(kw.score) OVER (), 0), 0) * %(keyword_weight)s
+        """
+    else:
+        raise ValueError(f"Unknown fusion method: {fusion}")
+
+    sql = f"""
+        WITH semantic AS (
+            SELECT id,
+                   1 - (embedding <=> %(embedding)s::vector) AS score,
+                   ROW_NUMBER() OVER (ORDER BY embedding <=> %(embedding)s::vector) AS rank
+            FROM ({ann_sql("documents", where=where)}) ann
+        ),
+        keyword AS (
+            SELECT id, score, ROW_NUMBER() OVER (ORDER BY score DESC) AS rank
+            FROM (
+                SELECT id, ts_rank_cd(text_tsv, q) AS score
+                FROM documents, websearch_to_tsquery('english', %(query)s) q
+                WHERE text_tsv @@ q {keyword_filter}
+                ORDER BY score DESC
+                LIMIT %(candidates)s
+            ) fts
+        ),
+        fused AS (
+            SELECT COALESCE(sem.id, kw.id) AS id,
+                   kw.score AS keyword_score,
+                   sem.score AS semantic_score,
+                   {score_sql} AS hybrid_score
+            FROM semantic sem FULL OUTER JOIN keyword kw ON kw.id = sem.id
+        )
+        SELECT {select}
+        FROM (
+            SELECT * FROM fused
+            ORDER BY hybrid_score DESC
+            LIMIT %(limit)s
+        ) f JOIN documents d ON d.id = f.id
+        ORDER BY f.hybrid_score DESC
+    """
+    return sql, params, columns
 
 
-def hybrid_search(query: str, limit: int = 5):
+def hybrid_search(
+    query: str,
+    limit: int = 5,
+    semantic_weight: Optional[float] = None,
+    keyword_weight: Optional[float] = None,
+    fusion: Optional[str] = None,
+    candidates: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    probes: Optional[int] = None,
+    fields: Optional[List[str]] = None,
+    snippet: bool = True,
+    domain: Optional[str] = None,
+    source_type: Optional[str] = None,
+    use_cache: bool = True
+):
     """
     Hybrid search using keyword + semantic similarity
-    
+
+    Runs two index-backed top-k queries, an ANN search on the embedding
+    (pgvector) and a full-text search on the stored ``text_tsv`` column (GIN),
+    and fuses the two candidate lists:
+
+    - ``rrf``: reciprocal-rank fusion, weight / (HYBRID_RRF_K + rank)
+    - ``weighted``: weighted sum of cosine similarity and the keyword rank
+      normalized by the best keyword score among the candidates
+
+    Neither stage scans the whole table, so latency stays flat as the corpus
+    grows. Weights, fusion method and candidate count default to the
+    HYBRID_* environment settings; ``ef_search``/``probes`` tune the ANN
+    stage (see vector_index.apply_search_params).
+
+    Only the requested ``fields`` (default id, title, url) are returned, plus
+    a query-relevant ``snippet`` of at most SNIPPET_CHARS computed in
+    Postgres. Fetch the full text with get_document_by_id when it is needed.
+    ``domain`` and ``source_type`` restrict both stages to that slice of the
+    corpus (see filter_clause).
+
+    Results are cached per (normalized query, options) and invalidated by
+    any write to the searched scope (see utils.retrieval_cache); repeat
+    queries skip both the embedding and Postgres.
+
     Returns list of matching documents ranked by hybrid score.
     """
+    cache = get_retrieval_cache()
+    key = hybrid_cache_key(query, limit=limit, semantic_weight=semantic_weight, keyword_weight=keyword_weight,
+                           fusion=fusion, candidates=candidates, ef_search=ef_search, probes=probes,
+                           fields=fields, snippet=snippet, domain=domain, source_type=source_type)
+    token = cache.token(domain)
+    if use_cache:
+        cached = cache.get(key, token)
+        if cached is not None:
+            return cached
+
     from embedder.embedding_utils import embed_text
-    embedding = embed_text(query)
+    sql, params, columns = hybrid_query(query, embed_text(query), limit, semantic_weight, keyword_weight, fusion,
+                                        candidates, fields, snippet, domain, source_type)
 
-    conn = None
-    cur = None
     try:
-        conn = get_db()
-        cur = conn.cursor()
-
-        cur.execute("""
-            SELECT id, title, text,
-                   ts_rank(to_tsvector(text), plainto_tsquery(%s)) AS keyword_score,
-                   1 - (embedding <=> %s::vector) AS semantic_score,
-                   (ts_rank(to_tsvector(text), plainto_tsquery(%s)) * 0.4 +
-                    (1 - (embedding <=> %s::vector)) * 0.6 AS hybrid_score
-            FROM documents
-            ORDER BY hybrid_score DESC
-            LIMIT %s
-        """, (query, embedding, query, embedding, limit))
-
-        results = cur.fetchall()
-        cur.close()
-        conn.close()
-
-        return [{
-            "id": r[0],
-            "title": r[1],
-            "text": r[2],
-            "keyword_score": r[3],
-            "semantic_score": r[4],
-            "hybrid_score": r[5]
-        } for r in results]
+        with db_connection() as conn, conn.cursor() as cur:
+            apply_search_params(cur, ef_search, probes, min_ef_search=params["prefetch"],
+                                filtered=bool(domain or source_type))
+            cur.execute(sql, params)
+            results = rows_to_dicts(columns, cur.fetchall())
+        cache.put(key, token, results)
+        return results
 
     except Exception as e:
         logger.error(f"❌ Hybrid search error: {e}")
         return []
 
 
-def get_document_by_id(doc_id: int):
-    """Retrieve full document by ID"""
-    conn = None
-    cur = None
-    try:
-        conn = get_db()
-        cur = conn.cursor()
+DOCUMENT_BY_ID_FIELDS = ("id", "title", "text")
+
 
-        cur.execute("SELECT id, title, text FROM documents WHERE id = %s", (doc_id,))
-        result = cur.fetchone()
-        cur.close()
-        conn.close()
+def document_query(fields: Optional[List[str]] = None):
+    """SQL and result columns for get_document_by_id. Shared with utils.async_database."""
+    columns = projection(fields or DOCUMENT_BY_ID_FIELDS)
+    return f"SELECT {', '.join(columns)} FROM documents WHERE id = %s", columns
 
-        return {
-            "id": result[0],
-            "title": result[1],
-            "text": result[2]
-        } if result else None
+
+def get_document_by_id(doc_id: int, fields: Optional[List[str]] = None):
+    """Retrieve full document by ID (id, title, text unless other fields are requested)"""
+    sql, columns = document_query(fields)
+    try:
+        with db_connection() as conn, conn.cursor() as cur:
+            cur.execute(sql, (doc_id,))
+            result = cur.fetchone()
+            return dict(zip(columns, result)) if result else None
 
     except Exception as e:
         logger.error(f"❌ Error fetching document: {e}")
         return None
 
 
-def vector_search(embedding: List[float], limit: int = 5):
-    """Search documents using vector similarity"""
-    conn = None
-    cur = None
-    try:
-        conn = get_db()
-        cur = conn.cursor()
+def vector_query(embedding: List[float], limit: int = 5, fields: Optional[List[str]] = None, snippet: bool = True,
+                 domain: Optional[str] = None, source_type: Optional[str] = None):
+    """SQL, parameters and result columns for vector_search. Shared with utils.async_database."""
+    fields = projection(fields)
+    where, filter_params = filter_clause(domain, source_type)
+    params = {"embedding": embedding, "candidates": limit, "prefetch": prefetch_count(limit),
+              "snippet_chars": SNIPPET_CHARS, **filter_params}
+    columns = fields + ["similarity"] + (["snippet"] if snippet else [])
+    select = ", ".join([f"d.{f}" for f in fields] + ["1 - (ann.embedding <=> %(embedding)s::vector) AS similarity"]
+                       + ([snippet_sql(with_query=False)] if snippet else []))
+    sql = f"""
+        SELECT {select}
+        FROM ({ann_sql("documents", where=where)}) ann JOIN documents d ON d.id = ann.id
+        ORDER BY similarity DESC
+    """
+    return sql, params, columns
 
-        cur.execute("""
-            SELECT id, title, text, 1 - (embedding <=> %s::vector) AS similarity
-            FROM documents
-            ORDER BY embedding <-> %s::vector
-            LIMIT %s
-        """, (embedding, embedding, limit))
-
-        results = cur.fetchall()
-        cur.close()
-        conn.close()
-
-        return [{
-            "id": r[0],
-            "title": r[1],
-            "text": r[2],
-            "similarity": r[3]
-        } for r in results]
+
+def vector_search(embedding: List[float], limit: int = 5, ef_search: Optional[int] = None,
+                  probes: Optional[int] = None, fields: Optional[List[str]] = None, snippet: bool = True,
+                  domain: Optional[str] = None, source_type: Optional[str] = None):
+    """
+    Search documents using vector similarity, optionally scoped to a domain
+    and/or source type. Returns the requested fields plus similarity and snippet.
+    """
+    sql, params, columns = vector_query(embedding, limit, fields, snippet, domain, source_type)
+    try:
+        with db_connection() as conn, conn.cursor() as cur:
+            apply_search_params(cur, ef_search, probes, min_ef_search=params["prefetch"],
+                                filtered=bool(domain or source_type))
+            cur.execute(sql, params)
+            return rows_to_dicts(columns, cur.fetchall())
 
     except Exception as e:
         logger.error(f"❌ Vector search error: {e}")
         return []
 
 
+def chunk_query(embedding: List[float], limit: int = 5):
+    """SQL and parameters for chunk_search. Shared with utils.async_database."""
+    params = {"embedding": embedding, "candidates": limit, "prefetch": prefetch_count(limit)}
+    sql = f"""
+        SELECT c.document_id, d.title, d.url, c.chunk_index, c.char_offset, c.text,
+               1 - (ann.embedding <=> %(embedding)s::vector) AS similarity
+        FROM ({ann_sql("document_chunks")}) ann
+        JOIN document_chunks c ON c.id = ann.id
+        JOIN documents d ON d.id = c.document_id
+        ORDER BY similarity DESC
+    """
+    return sql, params
+
+
+def chunk_rows(results) -> List[Dict[str, Any]]:
+    return [{
+        "document_id": r[0],
+        "title": r[1],
+        "url": r[2],
+        "chunk_index": r[3],
+        "char_offset": r[4],
+        "text": r[5],
+        "similarity": r[6]
+    } for r in results]
+
+
+def chunk_search(embedding: List[float], limit: int = 5, ef_search: Optional[int] = None,
+                 probes: Optional[int] = None):
+    """Search document chunks using vector similarity"""
+    sql, params = chunk_query(embedding, limit)
+    try:
+        with db_connection() as conn, conn.cursor() as cur:
+            apply_search_params(cur, ef_search, probes, min_ef_search=params["prefetch"])
+            cur.execute(sql, params)
+            return chunk_rows(cur.fetchall())
+
+    except Exception as e:
+        logger.error(f"❌ Chunk search error: {e}")
+        return []
+
+
 # ---------------- User Profile Utilities ----------------
 def get_user_profile(user_id: int) -> Optional[Dict[str, Any]]:
     """Retrieve user profile by user ID"""
-    conn = None
-    cur = None
     try:
-        conn = get_db()
-        cur = conn.cursor()
-        cur.execute("SELECT profile FROM users WHERE id = %s", (user_id,))
-        result = cur.fetchone()
-        cur.close()
-        conn.close()
-        return result[0] if result else None
+        with db_connection() as conn, conn.cursor() as cur:
+            cur.execute("SELECT profile FROM users WHERE id = %s", (user_id,))
+            result = cur.fetchone()
+            return result[0] if result else None
     except Exception as e:
         logger.error(f"❌ Error fetching user profile: {e}")
         return None
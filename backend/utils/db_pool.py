@@ -0,0 +1,160 @@
+# backend/utils/db_pool.py
+
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import pool as pg_pool
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+# Seconds to wait for a free connection before giving up
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+# Connections idle longer than this are pinged before being handed out
+DB_HEALTHCHECK_IDLE_SECS = float(os.getenv("DB_HEALTHCHECK_IDLE_SECS", "30"))
+
+
+class PoolTimeout(Exception):
+    """No pooled connection became free within the checkout timeout."""
+
+
+class ConnectionPool:
+    """
+    Thread-safe PostgreSQL connection pool with blocking checkout.
+
+    Wraps psycopg2's ThreadedConnectionPool, which raises as soon as it is
+    exhausted, with a semaphore so callers queue for up to ``timeout``
+    seconds instead. Connections that sat idle are health-checked with
+    ``SELECT 1`` and replaced if broken. Checkout wait times are recorded
+    for the /metrics endpoint.
+    """
+
+    def __init__(self, dsn, minconn=DB_POOL_MIN, maxconn=DB_POOL_MAX, timeout=DB_POOL_TIMEOUT,
+                 healthcheck_idle=DB_HEALTHCHECK_IDLE_SECS):
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.healthcheck_idle = healthcheck_idle
+        self._pool = pg_pool.ThreadedConnectionPool(minconn, maxconn, dsn)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._last_used = {}
+
+        self.in_use = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.replaced = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        logger.info(f"✅ PostgreSQL pool ready (min={minconn}, max={maxconn}).")
+
+    def _healthy(self, conn):
+        if conn.closed:
+            return False
+        idle = time.monotonic() - self._last_used.get(id(conn), 0)
+        if idle < self.healthcheck_idle:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _checkout(self):
+        conn = self._pool.getconn()
+        if not self._healthy(conn):
+            logger.warning("⚠️ Replacing broken PostgreSQL connection.")
+            self._pool.putconn(conn, close=True)
+            self.replaced += 1
+            conn = self._pool.getconn()
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection; it is rolled back if left mid-transaction and returned on exit."""
+        start = time.monotonic()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise PoolTimeout(f"No database connection available within {self.timeout}s")
+        waited = time.monotonic() - start
+
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            if waited > 0.001:
+                self.waits += 1
+
+        conn = None
+        try:
+            conn = self._checkout()
+            yield conn
+        finally:
+            if conn is not None:
+                broken = bool(conn.closed)
+                if not broken and conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                    try:
+                        conn.rollback()
+                    except psycopg2.Error:
+                        broken = True
+                if broken:
+                    self._last_used.pop(id(conn), None)
+                else:
+                    self._last_used[id(conn)] = time.monotonic()
+                self._pool.putconn(conn, close=broken)
+            with self._lock:
+                self.in_use -= 1
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_size": self.maxconn,
+                "in_use": self.in_use,
+                "saturation": round(self.in_use / self.maxconn, 3),
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "replaced_connections": self.replaced,
+                "avg_wait_ms": round(1000 * self.total_wait / self.checkouts, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(1000 * self.max_wait, 3),
+            }
+
+    def close(self):
+        self._pool.closeall()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide ConnectionPool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            try:
+                _pool = ConnectionPool(os.getenv("DATABASE_URL"))
+            except Exception as e:
+                logger.error(f"❌ Failed to connect to PostgreSQL: {e}")
+                raise
+        return _pool
+
+
+@contextmanager
+def db_connection():
+    """Check out a pooled connection: ``with db_connection() as conn: ...``"""
+    with get_pool().connection() as conn:
+        yield conn
@@ -1,20 +1,12 @@
 # backend/utils/delegation_model.py
 
-from llm.pdf_form_filler import generate_with_mistral
+from utils.ontology_router import route_query_to_agent
 
-def should_delegate_query(query: str) -> bool:
-    prompt = f"""
-    You are a decision-making assistant.
-
-    The user asked: "{query}"
-
-    Based on your knowledge, do you think this question requires input from a higher-level agency?
-    For example:
-    - It's about state/national laws
-    - It's about specialized departments (e.g., energy, taxation)
-    - It involves forms or tools only available externally
 
-    Answer ONLY with YES or NO.
+def should_delegate_query(query: str) -> bool:
+    """
+    Whether a higher-level agency should answer this question, i.e. whether
+    the query router finds an agent for it. The LLM is only consulted when
+    the router's scores are ambiguous.
     """
-    response = generate_with_mistral(prompt).strip().lower()
-    return response == "yes"
+    return route_query_to_agent(query) is not None
@@ -1,19 +1,14 @@
 # backend/utils/ontology_router.py
 
-def route_query_to_agent(query: str) -> str:
+from utils.query_router import get_query_router
+
+
+def route_query_to_agent(query: str, embedding=None) -> str:
     """
-    Routes query to appropriate agent based on keywords.
+    Routes query to the closest agent by embedding similarity (see utils.query_router).
     Returns endpoint URL or None if no match.
     """
-    query = query.lower()
-    
-    if any(word in query for word in ["solar", "energy", "electricity"]):
-        return "http://state-energy-agent:8080"
-    
-    elif any(word in query for word in ["zoning", "building", "permit"]):
-        return "http://state-planning-agent:8080"
-    
-    elif any(word in query for word in ["tax", "revenue", "income"]):
-        return "http://state-taxes-agent:8080"
-
-    return None
+    if embedding is None:
+        from embedder.embedding_utils import embed_text
+        embedding = embed_text(query)
+    return get_query_router().route(query, embedding)["url"]
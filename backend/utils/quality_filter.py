@@ -1,8 +1,10 @@
 # utils/quality_filter.py
 
+import requests
+
 from processor.cleaner import extract_content
 from embedder.embedding_utils import embed_text
-from utils.database import save_to_postgres
+from utils.bulk_writer import get_bulk_writer
 
 def is_quality_result(url, min_length=200):
     try:
@@ -12,9 +14,9 @@ def is_quality_result(url, min_length=200):
         if not cleaned or len(cleaned['text'].split()) < min_length:
             return False
 
-        # Embed and save
+        # Embed and queue for the next bulk flush
         embedding = embed_text(cleaned['text'])
-        save_to_postgres(
+        get_bulk_writer().add(
             title=cleaned['title'],
             description=cleaned['description'],
             text=cleaned['text'],
@@ -0,0 +1,187 @@
+# backend/utils/query_router.py
+
+import os
+import json
+import time
+import logging
+import threading
+from typing import Optional, List, Dict, Any
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Agents with a URL, a description and exemplar questions and/or a precomputed centroid
+ROUTER_AGENTS_PATH = os.getenv(
+    "ROUTER_AGENTS_PATH", os.path.join(os.path.dirname(__file__), "agent_routes.json")
+)
+# Best agent score at or above which the query is routed without asking the LLM
+ROUTER_THRESHOLD = float(os.getenv("ROUTER_THRESHOLD", "0.6"))
+# Lead the best agent needs over the runner-up to count as unambiguous
+ROUTER_MARGIN = float(os.getenv("ROUTER_MARGIN", "0.08"))
+# Below this the query is not about any agent and stays local
+ROUTER_FLOOR = float(os.getenv("ROUTER_FLOOR", "0.4"))
+
+ROUTER_PROMPT = """
+You are a routing assistant.
+
+The user asked: "{query}"
+
+These agencies can answer questions on their topics:
+{agents}
+
+Does this question require one of these agencies? Answer ONLY with the agency name, or NONE.
+"""
+
+
+def _normalize(vectors) -> np.ndarray:
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class QueryRouter:
+    """
+    Routes questions to external agents by embedding similarity.
+
+    Every agent is represented by unit vectors: its exemplar questions
+    (embedded once at load) and/or a centroid given in the config. An
+    agent's score is its best cosine similarity to the query, so routing is
+    one matrix-vector product over all agents' vectors.
+
+    - best score >= threshold and ahead of the runner-up by margin: route
+    - best score < floor: no agent
+    - anything in between is ambiguous and is settled by the LLM
+    """
+
+    def __init__(self, agents: List[Dict[str, Any]], threshold: float = ROUTER_THRESHOLD,
+                 margin: float = ROUTER_MARGIN, floor: float = ROUTER_FLOOR):
+        self.agents = agents
+        self.threshold = threshold
+        self.margin = margin
+        self.floor = floor
+        self._lock = threading.Lock()
+        self.decisions = {"embedding": 0, "none": 0, "llm": 0}
+
+        vectors, owners = [], []
+        exemplars = [(i, text) for i, agent in enumerate(agents) for text in agent.get("exemplars", [])]
+        if exemplars:
+            from embedder.embedding_utils import embed_batch
+            for (i, _), vector in zip(exemplars, embed_batch([text for _, text in exemplars])):
+                vectors.append(vector)
+                owners.append(i)
+        for i, agent in enumerate(agents):
+            if agent.get("centroid"):
+                vectors.append(agent["centroid"])
+                owners.append(i)
+        self._vectors = _normalize(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+        self._owners = np.asarray(owners, dtype=np.int64)
+
+    @classmethod
+    def from_config(cls, path: str = ROUTER_AGENTS_PATH) -> "QueryRouter":
+        with open(path, "r", encoding="utf-8") as f:
+            agents = json.load(f)["agents"]
+        router = cls(agents)
+        logger.info(f"✅ Query router loaded {len(agents)} agents ({len(router._owners)} vectors).")
+        return router
+
+    def scores(self, embedding) -> Dict[str, float]:
+        """Best cosine similarity of the query to each agent."""
+        if not len(self._owners):
+            return {}
+        similarities = self._vectors @ _normalize(embedding)[0]
+        best = np.full(len(self.agents), -1.0, dtype=np.float32)
+        np.maximum.at(best, self._owners, similarities)
+        return {agent["name"]: float(score) for agent, score in zip(self.agents, best)}
+
+    def classify(self, embedding) -> Dict[str, Any]:
+        """
+        Route by embedding alone.
+
+        Returns:
+            dict: ``agent`` (name or None), ``url``, ``confidence`` (best score),
+            ``margin`` over the runner-up, ``ambiguous`` and ``elapsed_ms``
+        """
+        begin = time.perf_counter()
+        ranked = sorted(self.scores(embedding).items(), key=lambda item: item[1], reverse=True)
+        best_name, best = ranked[0] if ranked else (None, 0.0)
+        margin = best - ranked[1][1] if len(ranked) > 1 else best
+        decision = {"agent": None, "url": None, "confidence": round(best, 4), "margin": round(margin, 4),
+                    "candidate": best_name, "ambiguous": False}
+        if best >= self.threshold and margin >= self.margin:
+            decision.update(agent=best_name, url=self._url(best_name))
+        elif best >= self.floor:
+            decision["ambiguous"] = True
+        decision["elapsed_ms"] = round(1000 * (time.perf_counter() - begin), 3)
+        return decision
+
+    def _url(self, name: Optional[str]) -> Optional[str]:
+        for agent in self.agents:
+            if agent["name"] == name:
+                return agent["url"]
+        return None
+
+    def llm_prompt(self, query: str) -> str:
+        agents = "\n".join(f"- {a['name']}: {a.get('description', '')}" for a in self.agents)
+        return ROUTER_PROMPT.format(query=query, agents=agents)
+
+    def parse_llm_choice(self, response: str) -> Optional[str]:
+        response = response.strip().lower()
+        for agent in self.agents:
+            if agent["name"].lower() in response:
+                return agent["name"]
+        return None
+
+    def settle(self, decision: Dict[str, Any], response: Optional[str] = None) -> Dict[str, Any]:
+        """Apply the LLM's answer (if it was asked) to a decision and record how it was decided."""
+        if response is not None:
+            name = self.parse_llm_choice(response)
+            decision.update(agent=name, url=self._url(name), method="llm")
+        else:
+            decision["method"] = "embedding" if decision["agent"] else "none"
+        with self._lock:
+            self.decisions[decision["method"]] += 1
+        return decision
+
+    def route(self, query: str, embedding) -> Dict[str, Any]:
+        """Classify by embedding, asking the LLM only when the scores are ambiguous."""
+        decision = self.classify(embedding)
+        response = None
+        if decision["ambiguous"]:
+            from llm.pdf_form_filler import generate_with_mistral, DETERMINISTIC
+            response = generate_with_mistral(self.llm_prompt(query), cache=True, **DETERMINISTIC)
+        return self.settle(decision, response)
+
+    async def aroute(self, query: str, embedding) -> Dict[str, Any]:
+        """Async route()."""
+        decision = self.classify(embedding)
+        response = None
+        if decision["ambiguous"]:
+            from llm.pdf_form_filler import agenerate_with_mistral, DETERMINISTIC
+            response = await agenerate_with_mistral(self.llm_prompt(query), cache=True, **DETERMINISTIC)
+        return self.settle(decision, response)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "agents": len(self.agents),
+                "vectors": len(self._owners),
+                "threshold": self.threshold,
+                "margin": self.margin,
+                "floor": self.floor,
+                "decisions": dict(self.decisions),
+            }
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_query_router() -> QueryRouter:
+    """Return the process-wide QueryRouter, loading ROUTER_AGENTS_PATH on first use."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = QueryRouter.from_config()
+        return _router
@@ -0,0 +1,110 @@
+# backend/utils/retrieval_cache.py
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any
+
+from .corpus_version import get_corpus_version
+
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "1000"))
+# Upper bound on staleness for writes this process did not see
+RETRIEVAL_CACHE_TTL = float(os.getenv("RETRIEVAL_CACHE_TTL", "300"))
+
+
+def normalize_query(query: str) -> str:
+    # Both the embedding model and to_tsvector are case-insensitive
+    return " ".join(query.lower().split())
+
+
+class RetrievalCache:
+    """
+    Bounded LRU of search results with a TTL, validated against CorpusVersion.
+
+    Entries are stored with the corpus version token taken before the query
+    ran. A lookup only hits if the token for the same scope is unchanged and
+    the entry has not expired, so writes invalidate without any explicit
+    purge. Results are copied on the way in and out so callers may mutate them.
+    """
+
+    def __init__(self, max_size: int = RETRIEVAL_CACHE_SIZE, ttl: float = RETRIEVAL_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.expired = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(query: str, **options) -> tuple:
+        """Cache key from the normalized query and every option that affects the result."""
+        frozen = tuple(sorted((k, tuple(v) if isinstance(v, list) else v) for k, v in options.items()))
+        return (normalize_query(query), frozen)
+
+    def token(self, domain: Optional[str] = None):
+        return get_corpus_version().token(domain)
+
+    def get(self, key: tuple, token) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            entry_token, expires, results = entry
+            if entry_token != token:
+                del self._entries[key]
+                self.stale += 1
+                self.misses += 1
+                return None
+            if time.monotonic() >= expires:
+                del self._entries[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return [dict(r) for r in results]
+
+    def put(self, key: tuple, token, results: List[Dict[str, Any]]):
+        with self._lock:
+            self._entries[key] = (token, time.monotonic() + self.ttl, [dict(r) for r in results])
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "stale": self.stale,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "capacity": self.max_size,
+                "corpus": get_corpus_version().stats(),
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_retrieval_cache() -> RetrievalCache:
+    """Return the process-wide RetrievalCache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = RetrievalCache()
+        return _cache
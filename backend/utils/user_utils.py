@@ -8,13 +8,49 @@ import psycopg2
 from psycopg2.extras import Json
 from passlib.hash import bcrypt
 
-from .database import get_db
+from .db_pool import db_connection
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-
+# Statements shared with utils.async_user_utils
+CREATE_USER_SQL = """
+    INSERT INTO users (email, password_hash, profile)
+    VALUES (%s, %s, %s)
+    ON CONFLICT (email) DO NOTHING
+    RETURNING id
+"""
+USER_BY_EMAIL_SQL = "SELECT id, email, password_hash, profile FROM users WHERE email = %s"
+USER_PROFILE_SQL = "SELECT profile FROM users WHERE id = %s"
+UPDATE_PROFILE_SQL = """
+    UPDATE users
+    SET profile = jsonb_set(profile, %s::TEXT[], %s::JSONB, true)
+    WHERE id = %s
+    RETURNING profile
+"""
+DELETE_PROFILE_KEY_SQL = """
+    UPDATE users
+    SET profile = profile #- %s::TEXT[]
+    WHERE id = %s
+    RETURNING profile
+"""
+UPDATE_PASSWORD_SQL = """
+    UPDATE users
+    SET password_hash = %s
+    WHERE id = %s
+"""
+
+
+def user_row(result) -> Optional[Dict[str, Any]]:
+    if not result:
+        return None
+    return {
+        "id": result[0],
+        "email": result[1],
+        "password_hash": result[2],
+        "profile": result[3] or {}
+    }
 
 
 def create_user(email: str, password: str, profile: Optional[Dict[str, Any]] = None):
@@ -22,80 +58,41 @@ def create_user(email: str, password: str, profile: Optional[Dict[str, Any]] = N
     Create a new user with email and hashed password.
     Optionally include initial profile data.
     """
-    conn = None
-    cur = None
     try:
-        conn = get_db()
-        cur = conn.cursor()
+        with db_connection() as conn, conn.cursor() as cur:
+            pwd_hash = bcrypt.hash(password)
 
-        pwd_hash = bcrypt.hash(password)
+            cur.execute(CREATE_USER_SQL, (email, pwd_hash, Json(profile) if profile else '{}'))
 
-        cur.execute("""
-            INSERT INTO users (email, password_hash, profile)
-            VALUES (%s, %s, %s)
-            ON CONFLICT (email) DO NOTHING
-            RETURNING id
-        """, (email, pwd_hash, Json(profile) if profile else '{}'))
-
-        result = cur.fetchone()
-        conn.commit()
-        return result[0] if result else None
+            result = cur.fetchone()
+            conn.commit()
+            return result[0] if result else None
 
     except Exception as e:
-        conn.rollback()
         logger.error(f"❌ Error creating user: {e}")
         return None
-    finally:
-        if cur:
-            cur.close()
-        if conn:
-            conn.close()
 
 
 def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
     """Get user by email"""
-    conn = None
-    cur = None
     try:
-        conn = get_db()
-        cur = conn.cursor()
-
-        cur.execute("SELECT id, email, password_hash, profile FROM users WHERE email = %s", (email,))
-        result = cur.fetchone()
-        if not result:
-            return None
-
-        return {
-            "id": result[0],
-            "email": result[1],
-            "password_hash": result[2],
-            "profile": result[3] or {}
-        }
+        with db_connection() as conn, conn.cursor() as cur:
+            cur.execute(USER_BY_EMAIL_SQL, (email,))
+            return user_row(cur.fetchone())
 
     except Exception as e:
         logger.error(f"❌ Error fetching user: {e}")
         return None
-    finally:
-        if cur:
-            cur.close()
-        if conn:
-            conn.close()
 
 
 def get_user_profile(user_id: int) -> Dict[str, Any]:
     """Retrieve user profile by ID"""
-    conn = None
-    cur = None
     try:
-        conn = get_db()
-        cur = conn.cursor()
-
-        cur.execute("SELECT profile FROM users WHERE id = %s", (user_id,))
-        result = cur.fetchone()
-        cur.close()
-        conn.close()
+        with db_connection() as conn, conn.cursor() as cur:
+            cur.execute(USER_PROFILE_SQL, (user_id,))
+            result = cur.fetchone()
 
-        return result[0] if result else {}
+            return result[0] if result else {}
 
     except Exception as e:
         logger.error(f"❌ Error fetching profile: {e}")
@@ -109,68 +106,38 @@ def update_user_profile(user_id: int, updates: Dict[str, Any]):
     Example:
       update_user_profile(1, {"key": "address", "value": "7 Spinnaker Ln"})
     """
-    conn = None
-    cur = None
     try:
-        conn = get_db()
-        cur = conn.cursor()
+        with db_connection() as conn, conn.cursor() as cur:
+            key = updates.get("key")
+            value = updates.get("value")
 
-        key = updates.get("key")
-        value = updates.get("value")
+            if not key:
+                logger.warning("❌ Missing 'key' in update request")
+                return {"error": "Missing key"}
 
-        if not key:
-            logger.warning("❌ Missing 'key' in update request")
-            return {"error": "Missing key"}
+            cur.execute(UPDATE_PROFILE_SQL, ('{' + key + '}', Json(value), user_id))
 
-        cur.execute("""
-            UPDATE users
-            SET profile = jsonb_set(profile, %s::TEXT[], %s::JSONB, true)
-            WHERE id = %s
-            RETURNING profile
-        """, ('{' + key + '}', Json(value), user_id))
-
-        conn.commit()
-        result = cur.fetchone()
-        return {"status": "success", "profile": result[0]}
+            conn.commit()
+            result = cur.fetchone()
+            return {"status": "success", "profile": result[0]}
 
     except Exception as e:
-        conn.rollback()
         logger.error(f"❌ Error updating profile: {e}")
         return {"error": str(e)}
-    finally:
-        if cur:
-            cur.close()
-        if conn:
-            conn.close()
 
 
 def delete_profile_key(user_id: int, key: str):
     """Remove a key from user profile"""
-    conn = None
-    cur = None
     try:
-        conn = get_db()
-        cur = conn.cursor()
-
-        cur.execute("""
-            UPDATE users
-            SET profile = profile #- %s::TEXT[]
-            WHERE id = %s
-            RETURNING profile
-        """, ('{' + key + '}', user_id))
+        with db_connection() as conn, conn.cursor() as cur:
+            cur.execute(DELETE_PROFILE_KEY_SQL, ('{' + key + '}', user_id))
 
-        conn.commit()
-        result = cur.fetchone()
-        return {"status": "deleted", "profile": result[0]}
+            conn.commit()
+            result = cur.fetchone()
+            return {"status": "deleted", "profile": result[0]}
 
     except Exception as e:
-        conn.rollback()
         return {"error": str(e)}
-    finally:
-        if cur:
-            cur.close()
-        if conn:
-            conn.close()
 
 
 def verify_password(email: str, password: str, stored_hash: Optional[str] = None) -> bool:
@@ -186,25 +153,11 @@ def verify_password(email: str, password: str, stored_hash: Optional[str] = None
 
 def update_user_password(user_id: int, new_password: str):
     """Update user password"""
-    conn = None
-    cur = None
     try:
-        conn = get_db()
-        cur = conn.cursor()
-
-        pwd_hash = bcrypt.hash(new_password)
-        cur.execute("""
-            UPDATE users
-            SET password_hash = %s
-            WHERE id = %s
-        """, (pwd_hash, user_id))
-        conn.commit()
-        return {"status": "success"}
+        with db_connection() as conn, conn.cursor() as cur:
+            pwd_hash = bcrypt.hash(new_password)
+            cur.execute(UPDATE_PASSWORD_SQL, (pwd_hash, user_id))
+            conn.commit()
+            return {"status": "success"}
     except Exception as e:
-        conn.rollback()
         return {"error": str(e)}
-    finally:
-        if cur:
-            cur.close()
-        if conn:
-            conn.close()
@@ -0,0 +1,347 @@
+# backend/utils/vector_index.py
+
+import os
+import re
+import math
+import hashlib
+import time
+import logging
+import threading
+from typing import Optional, Dict, Any
+
+from .db_pool import db_connection
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# "hnsw" (default) or "ivfflat"
+VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "hnsw")
+# HNSW build parameters (pgvector defaults)
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "64"))
+# Per-query defaults; unset means the server default (ef_search=40, probes=1)
+PG_DEFAULT_EF_SEARCH = 40
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "0")) or None
+IVFFLAT_PROBES = int(os.getenv("IVFFLAT_PROBES", "0")) or None
+# IVFFlat centroids are trained at build time, so wait for data before building
+IVFFLAT_MIN_ROWS = int(os.getenv("IVFFLAT_MIN_ROWS", "1000"))
+# Rebuild IVFFlat when the ideal list count drifts this far from the built one
+IVFFLAT_RETUNE_FACTOR = float(os.getenv("IVFFLAT_RETUNE_FACTOR", "2.0"))
+# Domains with at least this many embedded documents get their own partial vector index
+DOMAIN_INDEX_MIN_ROWS = int(os.getenv("DOMAIN_INDEX_MIN_ROWS", "5000"))
+DOMAIN_INDEX_PREFIX = "idx_embedding_d_"
+# pgvector 0.8 iterative index scans keep filtered ANN queries from returning too few rows ("off" to disable)
+VECTOR_ITERATIVE_SCAN = os.getenv("VECTOR_ITERATIVE_SCAN", "relaxed_order")
+# Seconds between background index checks
+VECTOR_INDEX_CHECK_SECS = float(os.getenv("VECTOR_INDEX_CHECK_SECS", "3600"))
+
+# Index a compact copy of the embedding: "none", "halfvec" (2x smaller) or "binary" (32x smaller).
+# Full-precision vectors stay in the table and rerank the over-fetched candidates.
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "none")
+# Quantized scans fetch this many times the requested candidates before reranking
+VECTOR_OVERFETCH = int(os.getenv("VECTOR_OVERFETCH", "4"))
+EMBEDDING_DIM = 384
+
+# Index expression, query expression, opclass and distance operator per quantization.
+# All search paths rank by cosine distance (<=>); binary codes are compared by Hamming distance (<~>).
+QUANTIZATIONS = {
+    "none": {
+        "expr": "{column}",
+        "query": "%(embedding)s::vector",
+        "opclass": "vector_cosine_ops",
+        "op": "<=>",
+    },
+    "halfvec": {
+        "expr": f"({{column}}::halfvec({EMBEDDING_DIM}))",
+        "query": f"%(embedding)s::vector::halfvec({EMBEDDING_DIM})",
+        "opclass": "halfvec_cosine_ops",
+        "op": "<=>",
+    },
+    "binary": {
+        "expr": f"(binary_quantize({{column}})::bit({EMBEDDING_DIM}))",
+        "query": f"binary_quantize(%(embedding)s::vector)::bit({EMBEDDING_DIM})",
+        "opclass": "bit_hamming_ops",
+        "op": "<~>",
+    },
+}
+
+# index name -> (table, column)
+VECTOR_INDEXES = {
+    "idx_embedding": ("documents", "embedding"),
+    "idx_chunk_embedding": ("document_chunks", "embedding"),
+}
+
+
+def ivfflat_lists(rows: int) -> int:
+    """pgvector's guideline: rows / 1000 up to 1M rows, sqrt(rows) beyond."""
+    if rows <= 1_000_000:
+        return max(1, rows // 1000)
+    return int(math.sqrt(rows))
+
+
+def describe_index(cur, name: str) -> Optional[Dict[str, Any]]:
+    """Return the access method, opclass and IVFFlat list count of an index, or None if missing."""
+    cur.execute("SELECT indexdef FROM pg_indexes WHERE indexname = %s", (name,))
+    row = cur.fetchone()
+    if not row:
+        return None
+    definition = row[0]
+    method = re.search(r"USING (\w+)", definition)
+    opclass = re.search(r"(\w+_ops)\b", definition)
+    lists = re.search(r"lists\s*=\s*'?(\d+)", definition)
+    return {
+        "definition": definition,
+        "method": method.group(1) if method else None,
+        "opclass": opclass.group(1) if opclass else None,
+        "lists": int(lists.group(1)) if lists else None,
+    }
+
+
+def index_sql(name, table, column, index_type, rows, quantization=None, concurrently=True, where=None):
+    """CREATE INDEX statement for a vector column under the given index type and quantization."""
+    spec = QUANTIZATIONS[quantization or VECTOR_QUANTIZATION]
+    target = f"{spec['expr'].format(column=column)} {spec['opclass']}"
+    create = "CREATE INDEX CONCURRENTLY" if concurrently else "CREATE INDEX"
+    predicate = f" WHERE {where}" if where else ""
+    if index_type == "hnsw":
+        return (f"{create} {name} ON {table} USING hnsw ({target}) "
+                f"WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION}){predicate}")
+    if index_type == "ivfflat":
+        return f"{create} {name} ON {table} USING ivfflat ({target}) WITH (lists = {ivfflat_lists(rows)}){predicate}"
+    raise ValueError(f"Unknown vector index type: {index_type}")
+
+
+def _rebuild_reason(current, index_type, rows):
+    opclass = QUANTIZATIONS[VECTOR_QUANTIZATION]["opclass"]
+    if current is None:
+        return "missing"
+    if current["method"] != index_type:
+        return f"{current['method']} -> {index_type}"
+    if current["opclass"] != opclass:
+        return f"{current['opclass']} -> {opclass}"
+    if index_type == "ivfflat":
+        target = ivfflat_lists(rows)
+        built = current["lists"] or 1
+        if max(target, built) / min(target, built) >= IVFFLAT_RETUNE_FACTOR:
+            return f"lists {built} -> {target}"
+    return None
+
+
+def _rebuild(cur, name, table, column, index_type, rows, current, reason, where=None):
+    """Build ``name`` CONCURRENTLY under a temporary name and swap it in."""
+    start = time.monotonic()
+    tmp = f"{name}_rebuild"
+    cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {tmp}")
+    cur.execute(index_sql(tmp, table, column, index_type, rows, where=where))
+    if current is not None:
+        cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    cur.execute(f"ALTER INDEX {tmp} RENAME TO {name}")
+    seconds = round(time.monotonic() - start, 2)
+    logger.info(f"✅ Built {index_type} index {name} on {rows} rows in {seconds}s ({reason})")
+    return {"index": name, "action": "rebuilt", "reason": reason, "rows": rows, "seconds": seconds}
+
+
+def ensure_vector_index(name: str, index_type: Optional[str] = None, force: bool = False) -> Dict[str, Any]:
+    """
+    Make sure a vector index exists with the configured type and quantization.
+
+    The index is rebuilt when it is missing, uses another access method or
+    opclass (including a VECTOR_QUANTIZATION change), or (IVFFlat) was built
+    with a list count that no longer fits the row count. Rebuilds use
+    CREATE INDEX CONCURRENTLY under a temporary name and swap it in, so reads
+    and writes continue meanwhile.
+
+    Args:
+        name (str): Key of VECTOR_INDEXES
+        index_type (str, optional): "hnsw" or "ivfflat"; defaults to VECTOR_INDEX_TYPE
+        force (bool): Rebuild even if the index already matches
+
+    Returns:
+        dict: index name, action taken and reason
+    """
+    table, column = VECTOR_INDEXES[name]
+    index_type = index_type or VECTOR_INDEX_TYPE
+
+    with db_connection() as conn:
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                cur.execute(f"SELECT count(*) FROM {table} WHERE {column} IS NOT NULL")
+                rows = cur.fetchone()[0]
+                current = describe_index(cur, name)
+                reason = "forced" if force else _rebuild_reason(current, index_type, rows)
+
+                if reason is None:
+                    return {"index": name, "action": "none", "rows": rows}
+                if index_type == "ivfflat" and rows < IVFFLAT_MIN_ROWS:
+                    # Too little data to train useful centroids; exact scans are fast at this size anyway
+                    return {"index": name, "action": "deferred", "reason": reason, "rows": rows}
+                return _rebuild(cur, name, table, column, index_type, rows, current, reason)
+        finally:
+            conn.autocommit = False
+
+
+def domain_index_name(domain: str) -> str:
+    return f"{DOMAIN_INDEX_PREFIX}{hashlib.blake2b(domain.encode('utf-8'), digest_size=6).hexdigest()}"
+
+
+def ensure_domain_indexes(index_type: Optional[str] = None, force: bool = False):
+    """
+    Keep a partial vector index (``WHERE domain = '...'``) for every domain
+    with at least DOMAIN_INDEX_MIN_ROWS embedded documents.
+
+    Scoped searches on those domains walk a graph (or lists) containing only
+    that domain's rows instead of filtering the global index. Partial indexes
+    for domains that fell below the threshold are dropped.
+
+    Returns:
+        list: one result dict per domain index touched
+    """
+    index_type = index_type or VECTOR_INDEX_TYPE
+    results = []
+    with db_connection() as conn:
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT domain, count(*) FROM documents
+                    WHERE domain IS NOT NULL AND embedding IS NOT NULL
+                    GROUP BY domain HAVING count(*) >= %s
+                """, (DOMAIN_INDEX_MIN_ROWS,))
+                wanted = {domain_index_name(domain): (domain, rows) for domain, rows in cur.fetchall()}
+                cur.execute("SELECT indexname FROM pg_indexes WHERE tablename = 'documents' AND indexname LIKE %s",
+                            (DOMAIN_INDEX_PREFIX + "%",))
+                existing = {r[0] for r in cur.fetchall()}
+
+                for name in sorted(existing - wanted.keys()):
+                    if name.endswith("_rebuild"):
+                        continue
+                    cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+                    results.append({"index": name, "action": "dropped"})
+
+                for name, (domain, rows) in wanted.items():
+                    current = describe_index(cur, name)
+                    reason = "forced" if force else _rebuild_reason(current, index_type, rows)
+                    if reason is None:
+                        continue
+                    where = "domain = " + cur.mogrify("%s", (domain,)).decode()
+                    result = _rebuild(cur, name, "documents", "embedding", index_type, rows, current, reason, where)
+                    result["domain"] = domain
+                    results.append(result)
+        finally:
+            conn.autocommit = False
+    return results
+
+
+def ensure_vector_indexes(index_type: Optional[str] = None, force: bool = False):
+    """Run ensure_vector_index for every vector index, then the per-domain ones. Errors are logged, not raised."""
+    results = []
+    for name in VECTOR_INDEXES:
+        try:
+            results.append(ensure_vector_index(name, index_type=index_type, force=force))
+        except Exception as e:
+            logger.error(f"❌ Vector index check for {name} failed: {e}")
+            results.append({"index": name, "action": "error", "error": str(e)})
+    try:
+        results.extend(ensure_domain_indexes(index_type=index_type, force=force))
+    except Exception as e:
+        logger.error(f"❌ Domain vector index check failed: {e}")
+        results.append({"index": DOMAIN_INDEX_PREFIX + "*", "action": "error", "error": str(e)})
+    return results
+
+
+def search_settings(ef_search: Optional[int] = None, probes: Optional[int] = None, min_ef_search: int = 0,
+                    filtered: bool = False):
+    """
+    Statements that set per-query recall knobs for the current transaction.
+
+    ``hnsw.ef_search`` caps how many rows an HNSW scan can return, so it is
+    raised to at least ``min_ef_search`` (the LIMIT of the query).
+    ``ivfflat.probes`` trades latency for recall on IVFFlat indexes. Both
+    settings are transaction-local and vanish when the connection goes back
+    to the pool. Filtered searches also enable iterative scans, so an index
+    keeps scanning until enough rows pass the filter.
+
+    Returns:
+        list: (sql, params) pairs to execute before the search query
+    """
+    statements = []
+    ef_search = max(ef_search or HNSW_EF_SEARCH or PG_DEFAULT_EF_SEARCH, min_ef_search)
+    if ef_search != PG_DEFAULT_EF_SEARCH:
+        statements.append(("SELECT set_config('hnsw.ef_search', %s, true)", (str(ef_search),)))
+    probes = probes or IVFFLAT_PROBES
+    if probes:
+        statements.append(("SELECT set_config('ivfflat.probes', %s, true)", (str(probes),)))
+    if filtered and VECTOR_ITERATIVE_SCAN != "off":
+        for setting in ("hnsw.iterative_scan", "ivfflat.iterative_scan"):
+            statements.append(("SELECT set_config(%s, %s, true)", (setting, VECTOR_ITERATIVE_SCAN)))
+    return statements
+
+
+def apply_search_params(cur, ef_search: Optional[int] = None, probes: Optional[int] = None, min_ef_search: int = 0,
+                        filtered: bool = False):
+    """Apply search_settings on a cursor."""
+    for sql, params in search_settings(ef_search, probes, min_ef_search, filtered):
+        cur.execute(sql, params)
+
+
+def prefetch_count(candidates: int, quantization: Optional[str] = None, overfetch: Optional[int] = None) -> int:
+    """Rows the quantized index scan must return so that reranking still yields ``candidates``."""
+    if (quantization or VECTOR_QUANTIZATION) == "none":
+        return candidates
+    return candidates * (overfetch or VECTOR_OVERFETCH)
+
+
+def ann_sql(table: str, column: str = "embedding", quantization: Optional[str] = None, where: str = "") -> str:
+    """
+    Subquery returning the approximate nearest ``%(candidates)s`` rows as (id, embedding).
+
+    Without quantization this is a plain index-ordered scan. With halfvec or
+    binary quantization it scans the compact index for ``%(prefetch)s`` rows
+    (see prefetch_count) and reranks them by full-precision cosine distance.
+    Expects the ``embedding``, ``candidates`` and ``prefetch`` parameters.
+    ``where`` is an optional ``WHERE ...`` clause restricting the scan.
+    """
+    quantization = quantization or VECTOR_QUANTIZATION
+    if quantization == "none":
+        return f"""
+            SELECT id, {column} AS embedding FROM {table}
+            {where}
+            ORDER BY {column} <=> %(embedding)s::vector
+            LIMIT %(candidates)s
+        """
+    spec = QUANTIZATIONS[quantization]
+    return f"""
+        SELECT id, embedding FROM (
+            SELECT id, {column} AS embedding FROM {table}
+            {where}
+            ORDER BY {spec['expr'].format(column=column)} {spec['op']} {spec['query']}
+            LIMIT %(prefetch)s
+        ) quantized
+        ORDER BY embedding <=> %(embedding)s::vector
+        LIMIT %(candidates)s
+    """
+
+
+def start_index_maintenance(interval: float = VECTOR_INDEX_CHECK_SECS) -> threading.Thread:
+    """Check the vector indexes now and then every ``interval`` seconds in a daemon thread."""
+    def run():
+        while True:
+            ensure_vector_indexes()
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, name="vector-index-maintenance", daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build or retune the pgvector indexes.")
+    parser.add_argument("--type", choices=["hnsw", "ivfflat"], default=None)
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the index already matches")
+    args = parser.parse_args()
+    for result in ensure_vector_indexes(index_type=args.type, force=args.force):
+        print(result)